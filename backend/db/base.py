@@ -0,0 +1,112 @@
+"""
+SQLite backend tuned for concurrent web and background-worker use
+
+Extends Django's sqlite3 backend with the OPTIONS Django 5.1 added, so the
+settings carry over unchanged when the stock backend supports them:
+
+    'init_command'       semicolon-separated statements run on every new
+                         connection (PRAGMA journal_mode=WAL, synchronous, ...)
+    'transaction_mode'   'DEFERRED', 'IMMEDIATE' or 'EXCLUSIVE' for the BEGIN
+                         that opens an atomic() block
+
+With 'IMMEDIATE', a transaction takes SQLite's write lock when it starts
+rather than on its first write. This avoids the "database is locked" error
+SQLite raises without waiting when a reading transaction tries to upgrade
+to a writer. Writers within a process also queue on a lock per database
+file instead of polling SQLite's busy handler.
+
+The standard 'timeout' option (seconds) is the busy timeout for writers in
+other processes, and bounds the wait for the in-process lock.
+"""
+import threading
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+
+BACKEND_OPTIONS = ('init_command', 'transaction_mode')
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+DEFAULT_TIMEOUT = 5.0
+
+_write_locks = {}
+_write_locks_lock = threading.Lock()
+
+
+def _write_lock(name):
+    with _write_locks_lock:
+        return _write_locks.setdefault(str(name), threading.Lock())
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._holds_write_lock = False
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"transaction_mode must be one of {', '.join(TRANSACTION_MODES)}, not {mode!r}"
+            )
+        return mode and mode.upper()
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        for option in BACKEND_OPTIONS:
+            kwargs.pop(option, None)
+        return kwargs
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        init_command = self.settings_dict['OPTIONS'].get('init_command')
+        if init_command:
+            for statement in init_command.split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        if mode is None:
+            return super()._start_transaction_under_autocommit()
+
+        if mode != 'DEFERRED' and not self.is_in_memory_db():
+            self._acquire_write_lock()
+        try:
+            self.cursor().execute(f'BEGIN {mode}')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _acquire_write_lock(self):
+        timeout = self.settings_dict['OPTIONS'].get('timeout', DEFAULT_TIMEOUT)
+        # On timeout, carry on and let SQLite's busy handling decide
+        self._holds_write_lock = _write_lock(self.settings_dict['NAME']).acquire(timeout=timeout)
+
+    def _release_write_lock(self):
+        if self._holds_write_lock:
+            self._holds_write_lock = False
+            _write_lock(self.settings_dict['NAME']).release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
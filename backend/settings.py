@@ -78,10 +78,30 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# SQLite tuned for concurrent uploads and analytics (see backend/db/base.py):
+# WAL lets readers run alongside the single writer, write transactions take
+# the lock up front (BEGIN IMMEDIATE) and wait up to 'timeout' seconds for it,
+# and connections are kept for CONN_MAX_AGE seconds instead of per request.
+# Tests use a file, not an in-memory database, so threads share it as in production.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'backend.db',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=268435456;'
+                'PRAGMA cache_size=-16000'
+            ),
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -146,6 +166,8 @@ REST_FRAMEWORK = {
 }
 
 # Cache Settings
+# Dataset artifacts do not use Django's cache framework; they live in the
+# shared, size-bounded cache store (CACHE_STORE_* below)
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -170,3 +192,101 @@ DEFAULT_FROM_EMAIL = 'noreply@chemicalequipment.com'
 # Telegram Settings (for alerts)
 TELEGRAM_BOT_TOKEN = ''  # Add your bot token here
 # To get a bot token: Message @BotFather on Telegram
+
+# CSV Ingestion Settings
+# Uploads are parsed in chunks of CSV_INGEST_CHUNK_SIZE rows and inserted
+# with bulk_create batches of CSV_INGEST_BATCH_SIZE, keeping memory flat
+CSV_INGEST_CHUNK_SIZE = 10000
+CSV_INGEST_BATCH_SIZE = 2000
+
+# Raw text/csv upload bodies may be gzip-encoded (Content-Encoding: gzip);
+# they are refused once the decompressed CSV exceeds this size
+UPLOAD_MAX_DECOMPRESSED_BYTES = 2 * 1024 ** 3
+
+# Background Job Settings
+# Uploads larger than ASYNC_UPLOAD_THRESHOLD_BYTES (or sent with ?async=true)
+# are spooled to UPLOAD_SPOOL_DIR and processed by a local worker pool;
+# clients poll GET /api/jobs/<id>/ for stage-level progress. A pending or
+# running job that records no progress for JOB_STALE_SECONDS (for example
+# after a restart) is marked failed.
+BACKGROUND_JOB_WORKERS = 2
+JOB_STALE_SECONDS = 15 * 60
+ASYNC_UPLOAD_THRESHOLD_BYTES = 5 * 1024 * 1024
+UPLOAD_SPOOL_DIR = MEDIA_ROOT / 'uploads'
+
+# Columnar Store Settings
+# Each dataset's numeric columns are also kept as memory-mapped .npy files
+# here so analytics can skip the ORM; the Equipment table stays authoritative
+COLUMN_STORE_DIR = MEDIA_ROOT / 'columns'
+
+# Dataset Retention Settings
+# After each upload a background run keeps the newest
+# DATASET_RETENTION_KEEP_LATEST datasets and drops any older than
+# DATASET_RETENTION_MAX_AGE_DAYS (None disables either limit). The same
+# policy can be applied on a schedule with `manage.py apply_retention`.
+DATASET_RETENTION_KEEP_LATEST = 5
+DATASET_RETENTION_MAX_AGE_DAYS = None
+DATASET_RETENTION_BATCH_SIZE = 100
+
+# Notification Outbox Settings
+# Alerts write Notification rows; a background dispatcher sends due rows in
+# batches of NOTIFICATION_BATCH_SIZE over pooled connections and retries
+# failures with exponential backoff (NOTIFICATION_RETRY_BACKOFF_SECONDS * 2^n)
+# up to NOTIFICATION_MAX_ATTEMPTS. After each run the dispatcher sets a timer
+# for the next retry that falls due; `manage.py dispatch_notifications
+# --interval N` also sends them from a separate process.
+NOTIFICATION_TRANSPORT = 'live'  # 'stub' records sends in memory (tests/dev)
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_BACKOFF_SECONDS = 30
+NOTIFICATION_MAX_WORKERS = 4
+NOTIFICATION_HTTP_TIMEOUT = 10
+NOTIFICATION_STALE_CLAIM_SECONDS = 300
+
+# Anomaly Detection Settings
+# Results are computed once per dataset (in the background after upload) and
+# stored next to its column store. Overrides here, e.g.
+# {'contamination': 0.05}, change the detector version stamp and cause stored
+# results to be recomputed on next access.
+ANOMALY_DETECTION = {}
+
+# Baseline Anomaly Model Settings
+# `manage.py retrain_anomaly_baseline` fits IsolationForest models on up to
+# ANOMALY_BASELINE_MAX_ROWS historical rows: one fleet-wide model, plus one per
+# equipment type with at least ANOMALY_BASELINE_MIN_TYPE_ROWS rows. Training
+# runs in ANOMALY_BASELINE_N_JOBS processes (-1 = all cores). Once a baseline
+# exists, uploads are scored against it instead of fitting a new forest.
+ANOMALY_MODEL_DIR = MEDIA_ROOT / 'models'
+ANOMALY_BASELINE_MAX_ROWS = 200000
+ANOMALY_BASELINE_MIN_TYPE_ROWS = 50
+ANOMALY_BASELINE_N_JOBS = -1
+ANOMALY_BASELINE_KEEP = 3
+
+# Equipment Listing Settings
+# Dataset detail embeds the first EQUIPMENT_PAGE_SIZE rows; the rest is served
+# by the cursor-paginated /api/datasets/<id>/equipment/ endpoint
+EQUIPMENT_PAGE_SIZE = 100
+EQUIPMENT_MAX_PAGE_SIZE = 1000
+# Page size cap when equipment is requested as a columnar frame
+# (Accept: application/vnd.equipment.columnar or ?format=columnar)
+EQUIPMENT_COLUMNAR_MAX_PAGE_SIZE = 50000
+
+# Shared Cache Store Settings
+# Reports, anomaly results, health summaries and chart images are cached as
+# files under CACHE_STORE_DIR with a SQLite index shared by all worker
+# processes. Least recently used entries are evicted once the total exceeds
+# CACHE_STORE_MAX_BYTES; a dataset's entries are dropped when it is deleted.
+# Hit/miss counters are served to admins at /api/cache/stats/.
+CACHE_STORE_DIR = MEDIA_ROOT / 'cache'
+CACHE_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Report Settings
+# PDF reports are rendered on the background worker pool right after upload
+# and kept in the cache store; GET /api/datasets/<id>/report/ answers 202
+# with a job to poll until the report is ready
+# Datasets with more than REPORT_MAX_TABLE_ROWS rows get per-type aggregates
+# and the REPORT_TOP_ANOMALIES most severe anomalies instead of a full
+# listing; tables are laid out in chunks of REPORT_TABLE_CHUNK_ROWS rows
+REPORT_MAX_TABLE_ROWS = 5000
+REPORT_TOP_ANOMALIES = 100
+REPORT_TABLE_CHUNK_ROWS = 500
@@ -2,20 +2,202 @@
 API Client for Chemical Equipment Visualizer Desktop App
 """
 import requests
+import gzip
 import json
+import os
+import shutil
+import struct
+import tempfile
+import time
+from urllib.parse import quote
+
+import numpy as np
+from requests.structures import CaseInsensitiveDict
+
+from response_cache import ResponseCache
+
+
+COLUMNAR_MEDIA_TYPE = 'application/vnd.equipment.columnar'
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Compressed upload bodies stay in memory up to this size, then spill to disk
+UPLOAD_SPOOL_BYTES = 8 * 1024 * 1024
+
+# Give up waiting on a background job after this many seconds
+JOB_WAIT_TIMEOUT = 30 * 60
+
+
+def decode_columnar(payload):
+    """
+    Decode a columnar frame (see equipment/renderers.py on the server)
+    Returns (meta, {column name: NumPy array}). Numeric columns are zero-copy
+    views over the payload; type comes back as an object array of labels.
+    """
+    if payload[:4] != b'EQCF':
+        raise ValueError('Not a columnar frame')
+    version, _, header_len = struct.unpack_from('<HHI', payload, 4)
+    if version != 1:
+        raise ValueError(f'Unsupported columnar frame version {version}')
+
+    header = json.loads(payload[12:12 + header_len])
+    body = memoryview(payload)[12 + header_len:]
+
+    def buffer(span, dtype):
+        start, length = span
+        return np.frombuffer(body[start:start + length], dtype=dtype)
+
+    columns = {}
+    for column in header['columns']:
+        if column['kind'] == 'numeric':
+            columns[column['name']] = buffer(column['buffer'], column['dtype'])
+        elif column['kind'] == 'category':
+            labels = np.array(column['labels'], dtype=object)
+            columns[column['name']] = labels[buffer(column['buffer'], column['dtype'])]
+        else:
+            offsets = buffer(column['offsets'], '<i4').tolist()
+            start, length = column['data']
+            text = bytes(body[start:start + length])
+            columns[column['name']] = np.array(
+                [text[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)], dtype=object
+            )
+    return header['meta'], columns
+
+
+class OfflineError(Exception):
+    """Raised in offline mode for anything the local cache cannot answer"""
+
+
+class UploadBody:
+    """
+    A CSV file as a streamed request body, optionally gzip-compressed
+    requests reads it in blocks, so the file is never loaded whole, and
+    progress_callback(sent, total) is called about every chunk_size bytes.
+    With compress=True the file is first gzipped chunk by chunk into a
+    spooled temporary file: the server needs the body's length up front
+    (Django does not accept chunked request bodies).
+    """
+    
+    def __init__(self, file_path, compress=False, progress_callback=None, chunk_size=UPLOAD_CHUNK_SIZE):
+        self.progress_callback = progress_callback
+        self.chunk_size = chunk_size
+        self.sent = 0
+        self._reported = 0
+        
+        if compress:
+            self.file = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES)
+            with open(file_path, 'rb') as source, gzip.GzipFile(fileobj=self.file, mode='wb', mtime=0) as target:
+                shutil.copyfileobj(source, target, chunk_size)
+            self.total = self.file.tell()
+            self.file.seek(0)
+        else:
+            self.file = open(file_path, 'rb')
+            self.total = os.path.getsize(file_path)
+    
+    def __len__(self):
+        # Lets requests send a Content-Length instead of a chunked body
+        return self.total - self.sent
+    
+    def read(self, size=-1):
+        data = self.file.read(size if size and size > 0 else self.chunk_size)
+        self.sent += len(data)
+        if self.progress_callback and data and (self.sent - self._reported >= self.chunk_size or self.sent == self.total):
+            self._reported = self.sent
+            self.progress_callback(self.sent, self.total)
+        return data
+    
+    def close(self):
+        self.file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
 
 
 class APIClient:
-    def __init__(self, base_url='http://localhost:8000/api'):
+    """
+    Client for the backend REST API
+    Methods block until the server answers; the main window calls them from
+    its worker pool (see workers.py). One requests.Session is shared by
+    those threads so its connection pool is reused.
+    
+    Responses are kept in a persistent on-disk cache (response_cache.py).
+    With offline=True every GET is answered from that cache alone and
+    anything else raises OfflineError. Once signed in, responses go to the
+    user's own namespace of that cache, which logout() clears.
+    """
+    
+    def __init__(self, base_url='http://localhost:8000/api', cache=None, offline=False):
         self.base_url = base_url
         self.token = None
         self.session = requests.Session()
+        self.base_cache = cache if cache is not None else ResponseCache()
+        self.cache = self.base_cache
+        self.offline = offline
+    
+    def _get(self, url, params=None, headers=None, keep_offline=False):
+        """
+        GET with client-side revalidation
+        A cached response is revalidated with If-None-Match / If-Modified-Since;
+        on 304 the cached body is returned without being re-downloaded.
+        Responses without validators are only stored when keep_offline is set,
+        as the last known copy for offline mode; online they are always refetched.
+        """
+        headers = dict(headers or {})
+        prepared = requests.Request('GET', url, params=params).prepare()
+        key = (prepared.url, headers.get('Accept', ''))
+        
+        cached = self.cache.get(key)
+        if self.offline:
+            if cached is None:
+                raise OfflineError(f'Not available offline: {prepared.url}')
+            response = requests.Response()
+            response.status_code = 200
+            response.url = prepared.url
+            response.headers = CaseInsensitiveDict(cached['headers'])
+            response._content = cached['content']
+            response.from_cache = True
+            return response
+        
+        if cached:
+            if cached['etag']:
+                headers['If-None-Match'] = cached['etag']
+            if cached['last_modified']:
+                headers['If-Modified-Since'] = cached['last_modified']
+        
+        response = self.session.get(prepared.url, headers=headers)
+        if response.status_code == 304 and cached:
+            # Rebuild a full 200 response from the cached copy
+            response.status_code = 200
+            response._content = cached['content']
+            response.headers.update({k: v for k, v in cached['headers'].items() if k not in response.headers})
+            response.from_cache = True
+            return response
+        
+        response.from_cache = False
+        if response.status_code == 200 and (
+            keep_offline or response.headers.get('ETag') or response.headers.get('Last-Modified')
+        ):
+            self.cache.put(key, response)
+        return response
+    
+    def _require_online(self, action):
+        if self.offline:
+            raise OfflineError(f'{action} needs a connection to the server')
     
     def set_token(self, token):
         """Set authentication token"""
         self.token = token
         self.session.headers.update({'Authorization': f'Token {token}'})
     
+    def _signed_in(self, data):
+        """Use the token and cache namespace of the user the server just authenticated"""
+        self.set_token(data['token'])
+        self.cache = self.base_cache.for_user(data['user_id'])
+        return data
+    
     def clear_token(self):
         """Clear authentication token"""
         self.token = None
@@ -24,70 +206,185 @@ class APIClient:
     
     def login(self, username, password):
         """Login user and get token"""
+        self._require_online('Login')
         url = f'{self.base_url}/auth/login/'
         response = requests.post(url, json={'username': username, 'password': password})
         response.raise_for_status()
-        data = response.json()
-        self.set_token(data['token'])
-        return data
+        return self._signed_in(response.json())
     
     def register(self, username, password, email=''):
         """Register new user"""
+        self._require_online('Registration')
         url = f'{self.base_url}/auth/register/'
         response = requests.post(url, json={'username': username, 'password': password, 'email': email})
         response.raise_for_status()
-        data = response.json()
-        self.set_token(data['token'])
-        return data
+        return self._signed_in(response.json())
     
     def logout(self):
         """Logout user"""
         url = f'{self.base_url}/auth/logout/'
         try:
-            self.session.post(url)
+            if not self.offline:
+                self.session.post(url)
         except:
             pass
         finally:
+            # Nothing this user fetched is left behind for the next one
+            self.cache.clear()
+            self.cache = self.base_cache
             self.clear_token()
     
     def get_datasets(self):
-        """Get list of datasets"""
+        """Get list of datasets (offline: the last list fetched)"""
         url = f'{self.base_url}/datasets/'
-        response = self.session.get(url)
+        response = self._get(url, keep_offline=True)
         response.raise_for_status()
         return response.json()
     
     def get_dataset(self, dataset_id):
-        """Get specific dataset with equipment"""
+        """Get specific dataset with the first page of its equipment"""
         url = f'{self.base_url}/datasets/{dataset_id}/'
-        response = self.session.get(url)
+        response = self._get(url)
+        response.raise_for_status()
+        return response.json()
+    
+    def get_equipment(self, dataset_id, cursor_url=None, fields=None, **params):
+        """
+        Get one page of a dataset's equipment
+        params may include page_size, ordering, type and min_/max_<parameter>;
+        pass the previous page's 'next' URL as cursor_url to continue
+        """
+        if cursor_url:
+            response = self._get(cursor_url)
+        else:
+            if fields:
+                params['fields'] = ','.join(fields)
+            url = f'{self.base_url}/datasets/{dataset_id}/equipment/'
+            response = self._get(url, params=params)
         response.raise_for_status()
         return response.json()
     
+    def get_dataset_columns(self, dataset_id, fields=None, **params):
+        """
+        Get a dataset and its first page of equipment as NumPy columns
+        Returns (dataset meta dict, {field: array})
+        """
+        if fields:
+            params['fields'] = ','.join(fields)
+        url = f'{self.base_url}/datasets/{dataset_id}/'
+        response = self._get(url, params=params, headers={'Accept': COLUMNAR_MEDIA_TYPE})
+        response.raise_for_status()
+        return decode_columnar(response.content)
+    
+    def get_equipment_columns(self, dataset_id, cursor_url=None, fields=None, **params):
+        """
+        Get one page of equipment as NumPy columns (pages may hold up to 50k rows)
+        Returns (meta with the 'next' link, {field: array})
+        """
+        if cursor_url:
+            response = self._get(cursor_url, headers={'Accept': COLUMNAR_MEDIA_TYPE})
+        else:
+            if fields:
+                params['fields'] = ','.join(fields)
+            url = f'{self.base_url}/datasets/{dataset_id}/equipment/'
+            response = self._get(url, params=params, headers={'Accept': COLUMNAR_MEDIA_TYPE})
+        response.raise_for_status()
+        return decode_columnar(response.content)
+    
+    def get_all_equipment_columns(self, dataset_id, fields=None, page_size=50000, **params):
+        """Fetch every page of equipment and concatenate the columns"""
+        meta, columns = self.get_equipment_columns(dataset_id, fields=fields, page_size=page_size, **params)
+        pages = [columns]
+        while meta.get('next'):
+            meta, columns = self.get_equipment_columns(dataset_id, cursor_url=meta['next'])
+            pages.append(columns)
+        return {name: np.concatenate([page[name] for page in pages]) for name in pages[0]}
+    
     def get_summary(self, dataset_id):
         """Get dataset summary statistics"""
         url = f'{self.base_url}/datasets/{dataset_id}/summary/'
-        response = self.session.get(url)
+        response = self._get(url)
         response.raise_for_status()
         return response.json()
     
-    def upload_csv(self, file_path, progress_callback=None):
-        """Upload CSV file"""
+    def upload_csv(self, file_path, progress_callback=None, compress=True):
+        """
+        Upload CSV file
+        The file is streamed as a raw text/csv body, gzip-encoded unless
+        compress=False; progress_callback(sent, total) reports body bytes sent
+        """
+        self._require_online('Uploading')
         url = f'{self.base_url}/datasets/upload/'
+        headers = {
+            'Content-Type': 'text/csv',
+            'Content-Disposition': f"attachment; filename*=UTF-8''{quote(os.path.basename(file_path))}",
+        }
+        if compress:
+            headers['Content-Encoding'] = 'gzip'
+        
+        with UploadBody(file_path, compress=compress, progress_callback=progress_callback) as body:
+            response = self.session.post(url, data=body, headers=headers)
+        
+        response.raise_for_status()
+        data = response.json()
         
-        with open(file_path, 'rb') as f:
-            files = {'file': f}
-            response = self.session.post(url, files=files)
+        # Large files are processed in the background: wait for the job
+        if response.status_code == 202:
+            job = self.wait_for_job(data['id'])
+            data = {
+                'id': job['dataset'],
+                'file_name': job['file_name'],
+                'summary': self.get_summary(job['dataset']),
+            }
+            data.update(job['result'])
         
+        return data
+    
+    def get_job(self, job_id):
+        """Get background job status"""
+        self._require_online('Checking a background job')
+        url = f'{self.base_url}/jobs/{job_id}/'
+        response = self.session.get(url)
         response.raise_for_status()
         return response.json()
     
+    def wait_for_job(self, job_id, poll_interval=1.0, timeout=JOB_WAIT_TIMEOUT):
+        """Poll a background job until it finishes; raise if it failed or timeout passes (None waits forever)"""
+        started = time.monotonic()
+        while True:
+            job = self.get_job(job_id)
+            if job['status'] == 'succeeded':
+                return job
+            if job['status'] == 'failed':
+                raise Exception(job['error'] or 'Background job failed')
+            if timeout is not None and time.monotonic() - started > timeout:
+                raise TimeoutError(f'Job {job_id} did not finish within {timeout} seconds')
+            time.sleep(poll_interval)
+    
+    def get_chart(self, dataset_id, kind, width=None, height=None, dpi=None):
+        """
+        Get a server-rendered chart as PNG bytes
+        kind is one of 'types', 'pie', 'histograms' or 'ranges'; the images
+        are the same cached files the PDF report embeds.
+        """
+        url = f'{self.base_url}/datasets/{dataset_id}/charts/{kind}.png'
+        params = {key: value for key, value in (('width', width), ('height', height), ('dpi', dpi)) if value is not None}
+        response = self._get(url, params=params, headers={'Accept': 'image/png'})
+        response.raise_for_status()
+        return response.content
+    
     def download_report(self, dataset_id, save_path):
         """Download PDF report"""
         url = f'{self.base_url}/datasets/{dataset_id}/report/'
-        response = self.session.get(url)
+        response = self._get(url)
         response.raise_for_status()
         
+        # Still rendering: wait for the report job, then fetch the file
+        if response.status_code == 202:
+            self.wait_for_job(response.json()['id'])
+            response = self._get(url)
+            response.raise_for_status()
+        
         with open(save_path, 'wb') as f:
             f.write(response.content)
         
@@ -0,0 +1,127 @@
+"""
+Rendering benchmark for the analytics charts
+Draws the four analytics subplots off-screen (Agg, the renderer behind the
+Qt canvas) for synthetic datasets and reports, per size:
+
+    full/all points   previous behaviour: clear the figure, plot every row
+    full/decimated    DashboardFigure.update plus a full draw
+    zoom/full draw    one 1.5x zoom on the trends chart, whole figure redrawn
+    zoom/blit         the same zoom through DashboardFigure.zoom_trends
+
+Usage: python benchmark_charts.py [--sizes 1000 100000 1000000] [--repeat 3]
+"""
+import argparse
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from charts import PARAMETER_LABELS, TREND_SERIES, DashboardFigure
+
+
+TYPES = ('Pump', 'Compressor', 'Valve', 'Heat Exchanger', 'Reactor', 'Condenser')
+
+
+def synthetic_data(rows, seed=0):
+    """A summary dict and trend columns shaped like the API's"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'flowrate': rng.normal(120, 30, rows),
+        'pressure': rng.normal(6, 1.5, rows),
+        'temperature': rng.normal(110, 25, rows),
+    }
+    summary = {'type_distribution': dict(zip(TYPES, np.bincount(rng.integers(0, len(TYPES), rows),
+                                                             minlength=len(TYPES)).tolist()))}
+    for label in PARAMETER_LABELS:
+        values = columns[label.lower()]
+        summary.update({
+            f'avg_{label.lower()}': float(values.mean()),
+            f'min_{label.lower()}': float(values.min()),
+            f'max_{label.lower()}': float(values.max()),
+        })
+    return summary, columns
+
+
+def draw_all_points(figure, summary, columns):
+    """The previous update_charts: rebuild the figure and plot every row"""
+    figure.clear()
+    ax1, ax2, ax3, ax4 = (figure.add_subplot(2, 2, i) for i in range(1, 5))
+
+    type_dist = summary['type_distribution']
+    ax1.bar(type_dist.keys(), type_dist.values(), color='steelblue')
+    ax1.tick_params(axis='x', rotation=45)
+
+    x = np.arange(len(columns['flowrate']))
+    for field, label, marker, color in TREND_SERIES:
+        ax2.plot(x, columns[field], f'{marker}-', label=label, color=color)
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    ax3.pie(type_dist.values(), labels=type_dist.keys(), autopct='%1.1f%%', startangle=90)
+
+    avgs, mins, maxs = (
+        np.array([summary[f'{stat}_{label.lower()}'] for label in PARAMETER_LABELS])
+        for stat in ('avg', 'min', 'max')
+    )
+    ax4.bar(range(3), avgs, color='steelblue', label='Average')
+    ax4.errorbar(range(3), avgs, yerr=[avgs - mins, maxs - avgs], fmt='none', color='red', capsize=5)
+    ax4.legend()
+    ax4.grid(True, alpha=0.3)
+
+    figure.tight_layout()
+    figure.canvas.draw()
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    options = parser.parse_args()
+
+    print(f'{"points":>9} {"full/all points":>16} {"full/decimated":>15} {"zoom/full draw":>15} {"zoom/blit":>10}')
+    for rows in options.sizes:
+        summary, columns = synthetic_data(rows)
+
+        figure = Figure(figsize=(12, 8))
+        FigureCanvasAgg(figure)
+        legacy = best_of(options.repeat, lambda: draw_all_points(figure, summary, columns))
+
+        figure = Figure(figsize=(12, 8))
+        canvas = FigureCanvasAgg(figure)
+        dashboard = DashboardFigure(figure)
+
+        def update():
+            dashboard.update(summary, columns)
+            canvas.draw()
+
+        decimated = best_of(options.repeat, update)
+
+        def zoom_full():
+            dashboard.set_trends(columns)
+            lo, hi = dashboard.trends_ax.get_xlim()
+            dashboard.trends_ax.set_xlim(lo, lo + (hi - lo) / 1.5)
+            canvas.draw()
+
+        zoom_draw = best_of(options.repeat, zoom_full)
+
+        dashboard.set_trends(columns)
+        canvas.draw()
+        dashboard.zoom_trends(1.5)  # captures the background once
+        zoom_blit = best_of(options.repeat, lambda: dashboard.zoom_trends(1.05))
+
+        print(f'{rows:>9,} {legacy * 1000:>14.0f}ms {decimated * 1000:>13.0f}ms '
+              f'{zoom_draw * 1000:>13.0f}ms {zoom_blit * 1000:>8.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+"""
+Analytics charts for the desktop app
+The four subplots are created once and updated in place on each dataset
+load. The Parameter Trends line chart never hands matplotlib more than about
+two points per horizontal pixel: each series is reduced to a min/max envelope
+(per pixel column, the lowest and highest value), which keeps spikes visible
+however many rows there are. Zooming or panning re-decimates the visible range
+into the existing Line2D artists; mouse-wheel zoom redraws only the trends
+subplot by blitting it over a cached background.
+"""
+import numpy as np
+
+
+TREND_SERIES = (
+    ('flowrate', 'Flowrate', 'o', '#4caf50'),
+    ('pressure', 'Pressure', 's', '#ff9800'),
+    ('temperature', 'Temperature', '^', '#f44336'),
+)
+PARAMETER_LABELS = ('Flowrate', 'Pressure', 'Temperature')
+
+# Markers are only drawn when this few points are visible
+MARKER_LIMIT = 200
+
+# X-axis zoom factor per mouse-wheel step on the trends chart
+ZOOM_STEP = 1.5
+
+
+def minmax_decimate(x, y, bins):
+    """
+    Reduce a series to at most 2 * bins points
+    Splits it into bins consecutive runs and keeps each run's minimum and
+    maximum at the run's first x, so a line through the result covers the
+    same vertical extent as the full series at one run per pixel. Series
+    already small enough are returned unchanged.
+    """
+    n = len(y)
+    if n <= 2 * bins:
+        return x, y
+
+    starts = np.linspace(0, n, bins, endpoint=False).astype(np.intp)
+    out_x = np.repeat(x[starts], 2)
+    out_y = np.empty(2 * bins, dtype=y.dtype)
+    out_y[0::2] = np.minimum.reduceat(y, starts)
+    out_y[1::2] = np.maximum.reduceat(y, starts)
+    return out_x, out_y
+
+
+class DashboardFigure:
+    """The analytics tab's four subplots on an existing figure and canvas"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.canvas = figure.canvas
+        (self.types_ax, self.trends_ax), (self.pie_ax, self.ranges_ax) = figure.subplots(2, 2)
+
+        self.trend_x = np.empty(0)
+        self.trend_y = {}
+        self.trend_lines = {}
+        for field, label, marker, color in TREND_SERIES:
+            self.trend_lines[field], = self.trends_ax.plot([], [], marker=marker, label=label, color=color)
+        self.trends_ax.set_xlabel('Equipment')
+        self.trends_ax.set_ylabel('Value')
+        self.trends_ax.set_title('Parameter Trends')
+        self.trends_ax.grid(True, alpha=0.3)
+        self.trends_ax.callbacks.connect('xlim_changed', lambda ax: self.refresh_trends())
+
+        self._background = None
+        self._capturing = False
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+        self.canvas.mpl_connect('scroll_event', self._on_scroll)
+
+    def update(self, summary, columns):
+        """Redraw every subplot for a dataset; columns holds the trend series"""
+        type_dist = summary.get('type_distribution', {})
+
+        # Chart 1: Equipment Type Distribution (Bar)
+        ax = self.types_ax
+        ax.clear()
+        if type_dist:
+            ax.bar(type_dist.keys(), type_dist.values(), color='steelblue')
+            ax.set_xlabel('Equipment Type')
+            ax.set_ylabel('Count')
+            ax.set_title('Equipment Type Distribution')
+            ax.tick_params(axis='x', rotation=45)
+
+        # Chart 2: Parameter Trends (Line)
+        self.set_trends(columns)
+
+        # Chart 3: Type Distribution (Pie)
+        ax = self.pie_ax
+        ax.clear()
+        if type_dist:
+            ax.pie(type_dist.values(), labels=type_dist.keys(), autopct='%1.1f%%', startangle=90)
+            ax.set_title('Type Distribution')
+
+        # Chart 4: Parameter Ranges
+        ax = self.ranges_ax
+        ax.clear()
+        avgs, mins, maxs = (
+            np.array([summary[f'{stat}_{label.lower()}'] for label in PARAMETER_LABELS])
+            for stat in ('avg', 'min', 'max')
+        )
+        x = np.arange(len(PARAMETER_LABELS))
+        ax.bar(x, avgs, color='steelblue', label='Average')
+        ax.errorbar(x, avgs, yerr=[avgs - mins, maxs - avgs], fmt='none', color='red', capsize=5,
+                    label='Min/Max Range')
+        ax.set_xticks(x)
+        ax.set_xticklabels(PARAMETER_LABELS)
+        ax.set_ylabel('Value')
+        ax.set_title('Parameter Ranges')
+        ax.legend()
+        ax.grid(True, alpha=0.3)
+
+        self.figure.tight_layout()
+
+    def set_trends(self, columns):
+        """Replace the trend series (e.g. after more rows were loaded) and show all of them"""
+        n = len(columns[TREND_SERIES[0][0]]) if columns else 0
+        self.trend_x = np.arange(n, dtype=np.float64)
+        self.trend_y = {field: np.asarray(columns[field], dtype=np.float64) for field, *_ in TREND_SERIES} if n else {}
+
+        ax = self.trends_ax
+        if n:
+            low = min(values.min() for values in self.trend_y.values())
+            high = max(values.max() for values in self.trend_y.values())
+            pad = (high - low) * 0.05 or 1.0
+            ax.set_ylim(low - pad, high + pad)
+            ax.legend(loc='upper right')
+        elif ax.get_legend() is not None:
+            ax.get_legend().remove()
+        # Triggers refresh_trends through the xlim_changed callback
+        ax.set_xlim(0, max(n - 1, 1))
+
+    def refresh_trends(self):
+        """Decimate the visible part of each series into its existing line"""
+        ax = self.trends_ax
+        lo, hi = ax.get_xlim()
+        start = max(int(np.floor(lo)), 0)
+        stop = min(int(np.ceil(hi)) + 1, len(self.trend_x))
+        bins = max(int(ax.bbox.width), 1)
+
+        x = self.trend_x[start:stop]
+        for field, _label, marker, _color in TREND_SERIES:
+            line = self.trend_lines[field]
+            if field not in self.trend_y:
+                line.set_data([], [])
+                continue
+            line.set_data(*minmax_decimate(x, self.trend_y[field][start:stop], bins))
+            line.set_marker(marker if len(x) <= MARKER_LIMIT else 'None')
+
+    def zoom_trends(self, factor, center=None):
+        """Zoom the trends x axis by factor around center, redrawing only that subplot"""
+        if not len(self.trend_x):
+            return
+        lo, hi = self.trends_ax.get_xlim()
+        center = (lo + hi) / 2 if center is None else center
+        lo = max(center - (center - lo) / factor, 0)
+        hi = min(center + (hi - center) / factor, max(len(self.trend_x) - 1, 1))
+        if hi - lo < 2:
+            return
+        self.trends_ax.set_xlim(lo, hi)
+        self.blit_trends()
+
+    def blit_trends(self):
+        """Draw just the trends subplot over the cached rest of the figure"""
+        if self._background is None:
+            self._capture_background()
+        self.canvas.restore_region(self._background)
+        self.trends_ax.draw(self.canvas.get_renderer())
+        self.canvas.blit(self._trends_region())
+
+    def _trends_region(self):
+        # The subplot's whole grid cell, so tick labels and titles are included
+        return self.trends_ax.get_subplotspec().get_position(self.figure).transformed(self.figure.transFigure)
+
+    def _capture_background(self):
+        self._capturing = True
+        self.trends_ax.set_visible(False)
+        try:
+            self.canvas.draw()
+        finally:
+            self.trends_ax.set_visible(True)
+            self._capturing = False
+        self._background = self.canvas.copy_from_bbox(self._trends_region())
+
+    def _on_draw(self, event):
+        # Any other full draw may have moved things; capture again when needed
+        if not self._capturing:
+            self._background = None
+
+    def _on_scroll(self, event):
+        if event.inaxes is self.trends_ax:
+            self.zoom_trends(ZOOM_STEP if event.button == 'up' else 1 / ZOOM_STEP, event.xdata)
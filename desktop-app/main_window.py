@@ -2,9 +2,10 @@
 Main Window for Chemical Equipment Visualizer Desktop App
 """
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                             QPushButton, QLabel, QTableWidget, QTableWidgetItem,
+                             QPushButton, QLabel, QTableView,
                              QFileDialog, QMessageBox, QTabWidget, QTextEdit,
-                             QSplitter, QGroupBox, QGridLayout, QHeaderView)
+                             QSplitter, QGroupBox, QGridLayout, QHeaderView,
+                             QProgressBar)
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont, QColor
 import matplotlib
@@ -12,14 +13,28 @@ matplotlib.use('Qt5Agg')
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
 from matplotlib.figure import Figure
+import numpy as np
 import os
 import sys
 
+from charts import DashboardFigure
+from table_models import ColumnarTableModel
+from workers import DataLoader
+
+
+EQUIPMENT_FIELDS = ['name', 'type', 'flowrate', 'pressure', 'temperature']
+EQUIPMENT_FORMATS = {'flowrate': '.2f', 'pressure': '.2f', 'temperature': '.2f'}
+
+# Rows per columnar page fetched for the equipment table
+EQUIPMENT_PAGE_ROWS = 5000
+
 
 class UploadThread(QThread):
     """Thread for uploading CSV files"""
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
+    # Bytes sent and total body size (object: files may exceed 2 GB)
+    progress = pyqtSignal(object, object)
     
     def __init__(self, api_client, file_path):
         super().__init__()
@@ -28,7 +43,7 @@ class UploadThread(QThread):
     
     def run(self):
         try:
-            result = self.api_client.upload_csv(self.file_path)
+            result = self.api_client.upload_csv(self.file_path, progress_callback=self.progress.emit)
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -41,6 +56,8 @@ class MainWindow(QMainWindow):
         self.user_data = user_data
         self.current_dataset = None
         self.current_summary = None
+        self.equipment_next = None
+        self.loader = DataLoader(parent=self)
         self.init_ui()
         self.load_datasets()
     
@@ -138,6 +155,11 @@ class MainWindow(QMainWindow):
         refresh_action = view_menu.addAction('Refresh Datasets')
         refresh_action.triggered.connect(self.load_datasets)
         
+        offline_action = view_menu.addAction('Work Offline')
+        offline_action.setCheckable(True)
+        offline_action.setChecked(self.api_client.offline)
+        offline_action.toggled.connect(self.set_offline)
+        
         # Help menu
         help_menu = menubar.addMenu('Help')
         
@@ -204,6 +226,12 @@ class MainWindow(QMainWindow):
         btn_layout.addStretch()
         
         upload_layout.addLayout(btn_layout)
+        
+        self.upload_progress = QProgressBar()
+        self.upload_progress.setRange(0, 100)
+        self.upload_progress.hide()
+        upload_layout.addWidget(self.upload_progress)
+        
         upload_group.setLayout(upload_layout)
         layout.addWidget(upload_group)
         
@@ -245,12 +273,17 @@ class MainWindow(QMainWindow):
         layout.addLayout(toolbar)
         
         # Dataset table
-        self.dataset_table = QTableWidget()
-        self.dataset_table.setColumnCount(4)
-        self.dataset_table.setHorizontalHeaderLabels(['ID', 'File Name', 'Upload Date', 'Equipment Count'])
+        self.dataset_model = ColumnarTableModel(
+            ['id', 'file_name', 'upload_date', 'equipment_count'],
+            ['ID', 'File Name', 'Upload Date', 'Equipment Count'],
+            parent=self,
+        )
+        self.dataset_table = QTableView()
+        self.dataset_table.setModel(self.dataset_model)
         self.dataset_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.dataset_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.dataset_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.dataset_table.setSelectionBehavior(QTableView.SelectRows)
+        self.dataset_table.setSelectionMode(QTableView.SingleSelection)
+        self.dataset_table.setSortingEnabled(True)
         self.dataset_table.doubleClicked.connect(self.view_dataset_details)
         layout.addWidget(self.dataset_table)
         
@@ -281,10 +314,19 @@ class MainWindow(QMainWindow):
         equipment_group = QGroupBox('Equipment Details')
         equipment_layout = QVBoxLayout()
         
-        self.equipment_table = QTableWidget()
-        self.equipment_table.setColumnCount(5)
-        self.equipment_table.setHorizontalHeaderLabels(['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+        # Backed by NumPy columns; more pages load as the table is scrolled
+        self.equipment_model = ColumnarTableModel(EQUIPMENT_FIELDS, formats=EQUIPMENT_FORMATS, parent=self)
+        self.equipment_model.more_requested.connect(self.load_more_equipment)
+        self.equipment_model.sort_requested.connect(self.load_sorted_equipment)
+        
+        self.equipment_table = QTableView()
+        self.equipment_table.setModel(self.equipment_model)
         self.equipment_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        # Fixed row heights: the view never measures rows it does not paint
+        self.equipment_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        # The server sends rows ordered by name
+        self.equipment_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        self.equipment_table.setSortingEnabled(True)
         equipment_layout.addWidget(self.equipment_table)
         
         equipment_group.setLayout(equipment_layout)
@@ -314,6 +356,9 @@ class MainWindow(QMainWindow):
         self.figure = Figure(figsize=(12, 8))
         self.canvas = FigureCanvas(self.figure)
         self.toolbar = NavigationToolbar(self.canvas, self)
+        # Subplots are created once and updated in place; scroll over the
+        # trends chart to zoom it
+        self.dashboard = DashboardFigure(self.figure)
         
         layout.addWidget(self.toolbar)
         layout.addWidget(self.canvas)
@@ -354,14 +399,28 @@ class MainWindow(QMainWindow):
         self.statusBar().showMessage('Uploading file...')
         self.upload_status.append(f'Uploading: {os.path.basename(file_path)}...')
         
+        self.upload_progress.setValue(0)
+        self.upload_progress.show()
+        
         # Create and start upload thread
         self.upload_thread = UploadThread(self.api_client, file_path)
+        self.upload_thread.progress.connect(self.on_upload_progress)
         self.upload_thread.finished.connect(self.on_upload_success)
         self.upload_thread.error.connect(self.on_upload_error)
         self.upload_thread.start()
     
+    def on_upload_progress(self, sent, total):
+        """Show how much of the (compressed) file has been sent"""
+        percent = int(sent * 100 / total) if total else 100
+        self.upload_progress.setValue(percent)
+        if sent < total:
+            self.statusBar().showMessage(f'Uploading file... {percent}% ({sent / 1024 ** 2:.1f} of {total / 1024 ** 2:.1f} MB)')
+        else:
+            self.statusBar().showMessage('Upload sent, processing on the server...')
+    
     def on_upload_success(self, data):
         """Handle successful upload"""
+        self.upload_progress.hide()
         self.statusBar().showMessage('Upload successful!')
         self.upload_status.append(f'✅ Successfully uploaded: {data.get("file_name")}')
         self.upload_status.append(f'   Equipment count: {data.get("summary", {}).get("total_count", 0)}')
@@ -373,53 +432,86 @@ class MainWindow(QMainWindow):
     
     def on_upload_error(self, error):
         """Handle upload error"""
+        self.upload_progress.hide()
         self.statusBar().showMessage('Upload failed')
         self.upload_status.append(f'❌ Upload failed: {error}')
         self.upload_status.append('')
         QMessageBox.critical(self, 'Upload Failed', f'Failed to upload file:\n{error}')
     
     def load_datasets(self):
-        """Load datasets from API"""
-        try:
-            datasets = self.api_client.get_datasets()
-            self.populate_dataset_table(datasets)
-            self.statusBar().showMessage(f'Loaded {len(datasets)} datasets')
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Failed to load datasets:\n{str(e)}')
+        """Load datasets from API in the background"""
+        self.statusBar().showMessage('Loading datasets...')
+        self.loader.load(
+            'datasets',
+            {'datasets': self.api_client.get_datasets},
+            self.on_datasets_loaded,
+            lambda error: QMessageBox.critical(self, 'Error', f'Failed to load datasets:\n{error}'),
+        )
+    
+    def on_datasets_loaded(self, results):
+        """Show the dataset list once it arrives"""
+        datasets = results['datasets']
+        self.populate_dataset_table(datasets)
+        self.statusBar().showMessage(f'Loaded {len(datasets)} datasets')
+    
+    def set_offline(self, offline):
+        """Switch between the server and cache-only reads"""
+        self.api_client.offline = offline
+        self.statusBar().showMessage('Working offline: showing cached data only' if offline else 'Back online')
+        self.load_datasets()
     
     def populate_dataset_table(self, datasets):
         """Populate dataset table"""
-        self.dataset_table.setRowCount(len(datasets))
-        
-        for row, dataset in enumerate(datasets):
-            self.dataset_table.setItem(row, 0, QTableWidgetItem(str(dataset['id'])))
-            self.dataset_table.setItem(row, 1, QTableWidgetItem(dataset['file_name']))
-            self.dataset_table.setItem(row, 2, QTableWidgetItem(dataset['upload_date']))
-            self.dataset_table.setItem(row, 3, QTableWidgetItem(str(dataset['equipment_count'])))
+        self.dataset_model.set_columns({
+            field: np.array([dataset[field] for dataset in datasets], dtype=object)
+            for field in self.dataset_model.fields
+        })
     
     def view_dataset_details(self):
         """View selected dataset details"""
-        selected_rows = self.dataset_table.selectedItems()
+        selected_rows = self.dataset_table.selectionModel().selectedRows()
         if not selected_rows:
             QMessageBox.warning(self, 'No Selection', 'Please select a dataset to view')
             return
         
-        dataset_id = int(self.dataset_table.item(selected_rows[0].row(), 0).text())
+        dataset_id = int(self.dataset_model.value(selected_rows[0].row(), 'id'))
         self.load_dataset_details(dataset_id)
     
     def load_dataset_details(self, dataset_id):
-        """Load dataset details"""
-        try:
-            self.current_dataset = self.api_client.get_dataset(dataset_id)
-            self.current_summary = self.api_client.get_summary(dataset_id)
-            
-            self.update_analytics()
-            self.update_charts()
-            self.tabs.setCurrentIndex(2)  # Switch to analytics tab
-            
-            self.statusBar().showMessage(f'Loaded dataset: {self.current_dataset["file_name"]}')
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Failed to load dataset:\n{str(e)}')
+        """
+        Load a dataset and its summary in parallel
+        Picking another dataset before they arrive cancels this load.
+        """
+        self.statusBar().showMessage(f'Loading dataset {dataset_id}...')
+        self.loader.cancel('equipment')
+        self.loader.load(
+            'details',
+            {
+                'dataset': lambda: self.api_client.get_dataset_columns(
+                    dataset_id, fields=EQUIPMENT_FIELDS, page_size=EQUIPMENT_PAGE_ROWS
+                ),
+                'summary': lambda: self.api_client.get_summary(dataset_id),
+            },
+            self.on_dataset_details_loaded,
+            lambda error: QMessageBox.critical(self, 'Error', f'Failed to load dataset:\n{error}'),
+        )
+    
+    def on_dataset_details_loaded(self, results):
+        """Show a dataset once both the dataset and its summary are in"""
+        self.current_dataset, columns = results['dataset']
+        self.current_summary = results['summary']
+        
+        # A page still loading for the previous dataset must not land here
+        self.loader.cancel('equipment')
+        self.equipment_next = self.current_dataset.get('equipment_next')
+        self.equipment_model.set_columns(columns, has_more=bool(self.equipment_next), sort=('name', False))
+        self.equipment_table.horizontalHeader().setSortIndicator(0, Qt.AscendingOrder)
+        
+        self.update_analytics()
+        self.update_charts()
+        self.tabs.setCurrentIndex(2)  # Switch to analytics tab
+        
+        self.statusBar().showMessage(f'Loaded dataset: {self.current_dataset["file_name"]}')
     
     def update_analytics(self):
         """Update analytics tab with current dataset"""
@@ -431,98 +523,68 @@ class MainWindow(QMainWindow):
         self.flowrate_card.findChild(QLabel, 'value_label').setText(f"{self.current_summary['avg_flowrate']:.2f}")
         self.pressure_card.findChild(QLabel, 'value_label').setText(f"{self.current_summary['avg_pressure']:.2f}")
         self.temp_card.findChild(QLabel, 'value_label').setText(f"{self.current_summary['avg_temperature']:.2f}")
-        
-        # Update equipment table
-        equipment_items = self.current_dataset.get('equipment_items', [])
-        self.equipment_table.setRowCount(len(equipment_items))
-        
-        for row, item in enumerate(equipment_items):
-            self.equipment_table.setItem(row, 0, QTableWidgetItem(item['name']))
-            self.equipment_table.setItem(row, 1, QTableWidgetItem(item['type']))
-            self.equipment_table.setItem(row, 2, QTableWidgetItem(f"{item['flowrate']:.2f}"))
-            self.equipment_table.setItem(row, 3, QTableWidgetItem(f"{item['pressure']:.2f}"))
-            self.equipment_table.setItem(row, 4, QTableWidgetItem(f"{item['temperature']:.2f}"))
+    
+    def load_more_equipment(self):
+        """Fetch the next page of equipment when the table is scrolled to the end"""
+        dataset_id, next_url = self.current_dataset['id'], self.equipment_next
+        self.loader.load(
+            'equipment',
+            {'page': lambda: self.api_client.get_equipment_columns(dataset_id, cursor_url=next_url)},
+            self.on_equipment_page_loaded,
+            self.on_equipment_page_failed,
+        )
+    
+    def on_equipment_page_loaded(self, results):
+        meta, columns = results['page']
+        self.equipment_next = meta.get('next')
+        self.equipment_model.append_columns(columns, has_more=bool(self.equipment_next))
+        self.update_trend_chart()
+    
+    def load_sorted_equipment(self, field, descending):
+        """Reload the equipment table in a new order when not every row is loaded"""
+        dataset_id = self.current_dataset['id']
+        ordering = f'-{field}' if descending else field
+        self.statusBar().showMessage(f'Sorting by {field}...')
+        self.loader.load(
+            'equipment',
+            {'page': lambda: self.api_client.get_equipment_columns(
+                dataset_id, fields=EQUIPMENT_FIELDS, page_size=EQUIPMENT_PAGE_ROWS, ordering=ordering
+            )},
+            lambda results: self.on_equipment_sorted(results, field, descending),
+            self.on_equipment_page_failed,
+        )
+    
+    def on_equipment_sorted(self, results, field, descending):
+        meta, columns = results['page']
+        self.equipment_next = meta.get('next')
+        self.equipment_model.set_columns(columns, has_more=bool(self.equipment_next), sort=(field, descending))
+        self.update_trend_chart()
+        self.statusBar().showMessage(f'Sorted by {field}')
+    
+    def on_equipment_page_failed(self, error):
+        self.equipment_model.fetch_failed()
+        self.statusBar().showMessage(f'Failed to load equipment: {error}')
     
     def update_charts(self):
         """Update charts with current dataset"""
         if not self.current_summary or not self.current_dataset:
             return
         
-        self.figure.clear()
-        
-        # Create subplots
-        ax1 = self.figure.add_subplot(2, 2, 1)
-        ax2 = self.figure.add_subplot(2, 2, 2)
-        ax3 = self.figure.add_subplot(2, 2, 3)
-        ax4 = self.figure.add_subplot(2, 2, 4)
-        
-        # Chart 1: Equipment Type Distribution (Bar)
-        type_dist = self.current_summary.get('type_distribution', {})
-        if type_dist:
-            ax1.bar(type_dist.keys(), type_dist.values(), color='steelblue')
-            ax1.set_xlabel('Equipment Type')
-            ax1.set_ylabel('Count')
-            ax1.set_title('Equipment Type Distribution')
-            ax1.tick_params(axis='x', rotation=45)
-        
-        # Chart 2: Parameter Trends (Line)
-        equipment_items = self.current_dataset.get('equipment_items', [])
-        if equipment_items:
-            names = [item['name'][:10] for item in equipment_items]  # Truncate names
-            flowrates = [item['flowrate'] for item in equipment_items]
-            pressures = [item['pressure'] for item in equipment_items]
-            temperatures = [item['temperature'] for item in equipment_items]
-            
-            x = range(len(names))
-            ax2.plot(x, flowrates, 'o-', label='Flowrate', color='#4caf50')
-            ax2.plot(x, pressures, 's-', label='Pressure', color='#ff9800')
-            ax2.plot(x, temperatures, '^-', label='Temperature', color='#f44336')
-            ax2.set_xlabel('Equipment')
-            ax2.set_ylabel('Value')
-            ax2.set_title('Parameter Trends')
-            ax2.legend()
-            ax2.grid(True, alpha=0.3)
-        
-        # Chart 3: Type Distribution (Pie)
-        if type_dist:
-            ax3.pie(type_dist.values(), labels=type_dist.keys(), autopct='%1.1f%%', startangle=90)
-            ax3.set_title('Type Distribution')
-        
-        # Chart 4: Parameter Ranges
-        if self.current_summary:
-            params = ['Flowrate', 'Pressure', 'Temperature']
-            avgs = [
-                self.current_summary['avg_flowrate'],
-                self.current_summary['avg_pressure'],
-                self.current_summary['avg_temperature']
-            ]
-            mins = [
-                self.current_summary['min_flowrate'],
-                self.current_summary['min_pressure'],
-                self.current_summary['min_temperature']
-            ]
-            maxs = [
-                self.current_summary['max_flowrate'],
-                self.current_summary['max_pressure'],
-                self.current_summary['max_temperature']
-            ]
-            
-            x = range(len(params))
-            ax4.bar(x, avgs, color='steelblue', label='Average')
-            ax4.errorbar(x, avgs, yerr=[
-                [avgs[i] - mins[i] for i in range(len(avgs))],
-                [maxs[i] - avgs[i] for i in range(len(avgs))]
-            ], fmt='none', color='red', capsize=5, label='Min/Max Range')
-            ax4.set_xticks(x)
-            ax4.set_xticklabels(params)
-            ax4.set_ylabel('Value')
-            ax4.set_title('Parameter Ranges')
-            ax4.legend()
-            ax4.grid(True, alpha=0.3)
-        
-        self.figure.tight_layout()
+        self.dashboard.update(self.current_summary, self.trend_columns())
         self.canvas.draw()
     
+    def update_trend_chart(self):
+        """Show newly loaded or reordered equipment rows in the trends chart"""
+        if not self.current_summary or not self.current_dataset:
+            return
+        
+        self.dashboard.set_trends(self.trend_columns())
+        self.canvas.draw_idle()
+    
+    def trend_columns(self):
+        """Parameter columns of the equipment loaded so far, in table order"""
+        return {field: self.equipment_model.column(field) for field in ('flowrate', 'pressure', 'temperature')}
+    
     def download_report(self):
         """Download PDF report"""
         if not self.current_dataset:
@@ -539,22 +601,31 @@ class MainWindow(QMainWindow):
         if not file_path:
             return
         
-        try:
-            self.api_client.download_report(self.current_dataset['id'], file_path)
-            QMessageBox.information(self, 'Success', f'Report saved to:\n{file_path}')
-            
-            # Ask to open
-            reply = QMessageBox.question(
-                self, 'Open Report',
-                'Do you want to open the report?',
-                QMessageBox.Yes | QMessageBox.No
-            )
-            
-            if reply == QMessageBox.Yes:
-                os.startfile(file_path) if sys.platform == 'win32' else os.system(f'open "{file_path}"')
+        # Large reports render on the server first, so wait off the GUI thread
+        dataset_id = self.current_dataset['id']
+        self.statusBar().showMessage('Preparing report...')
+        self.loader.load(
+            'report',
+            {'path': lambda: self.api_client.download_report(dataset_id, file_path)},
+            self.on_report_downloaded,
+            lambda error: QMessageBox.critical(self, 'Error', f'Failed to download report:\n{error}'),
+        )
+    
+    def on_report_downloaded(self, results):
+        """Offer to open a downloaded report"""
+        file_path = results['path']
+        self.statusBar().showMessage('Report downloaded')
+        QMessageBox.information(self, 'Success', f'Report saved to:\n{file_path}')
         
-        except Exception as e:
-            QMessageBox.critical(self, 'Error', f'Failed to download report:\n{str(e)}')
+        # Ask to open
+        reply = QMessageBox.question(
+            self, 'Open Report',
+            'Do you want to open the report?',
+            QMessageBox.Yes | QMessageBox.No
+        )
+        
+        if reply == QMessageBox.Yes:
+            os.startfile(file_path) if sys.platform == 'win32' else os.system(f'open "{file_path}"')
     
     def show_about(self):
         """Show about dialog"""
@@ -583,5 +654,11 @@ class MainWindow(QMainWindow):
         )
         
         if reply == QMessageBox.Yes:
+            self.loader.cancel_all()
             self.api_client.logout()
             self.close()
+    
+    def closeEvent(self, event):
+        """Stop background loads before the window goes away"""
+        self.loader.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,181 @@
+"""
+Persistent response cache for the desktop API client
+GET responses that carry validators (ETag / Last-Modified) are kept under the
+user's cache directory: bodies as files, plus a small SQLite index holding
+each entry's validators, headers, size and last access. Uploaded datasets
+never change, so dataset details, summaries, charts and PDF reports stay
+valid across app restarts; the client revalidates them with a conditional
+GET and gets a bodiless 304 back. The dataset list has no validators; its
+latest copy is kept only so offline mode has something to show. The index
+enforces a size budget, evicting least recently used entries first, and lets
+the client answer from the cache alone while offline. Each signed-in user
+gets a separate cache under users/<id>, emptied again when they log out, so
+nothing one account fetched is served to another on a shared machine.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+APP_DIR_NAME = 'ChemicalEquipmentViz'
+
+DEFAULT_MAX_BYTES = 512 * 1024 ** 2
+
+INDEX_FILE = 'index.sqlite3'
+
+# After an eviction pass the cache is at most this fraction of the budget
+EVICT_TO = 0.9
+
+# Last-access times are only rewritten when older than this many seconds
+TOUCH_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    accept TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    headers TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def default_cache_dir():
+    """The platform's per-user cache directory for this app"""
+    if sys.platform == 'win32':
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local'
+    elif sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    else:
+        base = os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache'
+    return Path(base) / APP_DIR_NAME / 'responses'
+
+
+class ResponseCache:
+    """
+    On-disk LRU of GET responses with their validators
+    Keys are (full URL, Accept header). Safe to share between the app's
+    worker threads; each thread gets its own index connection.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = Path(root) if root is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def for_user(self, user_id):
+        """A cache of the same budget for one user's responses, apart from everyone else's"""
+        return ResponseCache(self.root / 'users' / str(user_id), self.max_bytes)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.root / INDEX_FILE, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def _digest(key):
+        url, accept = key
+        return hashlib.sha1(f'{accept}\n{url}'.encode('utf-8')).hexdigest()
+
+    def _path(self, digest):
+        return self.root / digest[:2] / digest
+
+    def get(self, key):
+        """Return {'etag', 'last_modified', 'headers', 'content'} for key, or None"""
+        connection = self._connection()
+        digest = self._digest(key)
+        row = connection.execute(
+            'SELECT etag, last_modified, headers, accessed_at FROM responses WHERE key = ?', (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        etag, last_modified, headers, accessed_at = row
+        try:
+            content = self._path(digest).read_bytes()
+        except FileNotFoundError:
+            self._forget(connection, digest)
+            return None
+
+        now = time.time()
+        if accessed_at < now - TOUCH_INTERVAL:
+            connection.execute('UPDATE responses SET accessed_at = ? WHERE key = ?', (now, digest))
+        return {
+            'etag': etag,
+            'last_modified': last_modified,
+            'headers': json.loads(headers),
+            'content': content,
+        }
+
+    def put(self, key, response):
+        """Store a 200 response's body, validators and headers, then enforce the size budget"""
+        connection = self._connection()
+        digest = self._digest(key)
+        content = response.content
+
+        path = self._path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{digest}.{threading.get_ident()}.tmp')
+        try:
+            tmp_path.write_bytes(content)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        now = time.time()
+        url, accept = key
+        connection.execute(
+            'INSERT OR REPLACE INTO responses '
+            '(key, url, accept, etag, last_modified, headers, size, stored_at, accessed_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (digest, url, accept, response.headers.get('ETag'), response.headers.get('Last-Modified'),
+             json.dumps(dict(response.headers)), len(content), now, now),
+        )
+        self._evict(connection, keep=digest)
+
+    def delete(self, key):
+        self._forget(self._connection(), self._digest(key))
+
+    def _forget(self, connection, digest):
+        connection.execute('DELETE FROM responses WHERE key = ?', (digest,))
+        self._path(digest).unlink(missing_ok=True)
+
+    def _evict(self, connection, keep=None):
+        """Remove least recently used entries until the cache fits its budget"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TO
+        for digest, size in connection.execute('SELECT key, size FROM responses ORDER BY accessed_at').fetchall():
+            if total <= target:
+                break
+            if digest == keep:
+                continue
+            self._forget(connection, digest)
+            total -= size
+
+    def size(self):
+        """(entries, bytes) currently cached"""
+        return tuple(self._connection().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses').fetchone())
+
+    def clear(self):
+        connection = self._connection()
+        for (digest,) in connection.execute('SELECT key FROM responses').fetchall():
+            self._forget(connection, digest)
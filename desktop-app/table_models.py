@@ -0,0 +1,151 @@
+"""
+Table models for the desktop app
+Rows are kept as columnar NumPy arrays (as decoded by api_client) rather
+than one QTableWidgetItem per cell. A cell's text is only formatted when the
+view paints it, sorting reorders an index array instead of the data, and
+further pages are requested from the server as the user scrolls towards the
+end of what has been loaded.
+"""
+import numpy as np
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+
+class ColumnarTableModel(QAbstractTableModel):
+    """
+    Read-only table over {field: array} columns
+
+    fields lists the columns in display order; headers their labels and
+    formats optional format specs (e.g. {'flowrate': '.2f'}).
+
+    When only part of the rows is loaded (has_more), the model cannot sort
+    locally: sort() emits sort_requested(field, descending) so the owner can
+    reload the first page in that order, and fetchMore() emits more_requested
+    so it can fetch the next page and hand it to append_columns().
+    """
+    more_requested = pyqtSignal()
+    sort_requested = pyqtSignal(str, bool)
+
+    def __init__(self, fields, headers=None, formats=None, parent=None):
+        super().__init__(parent)
+        self.fields = list(fields)
+        self.headers = list(headers) if headers else [field.replace('_', ' ').title() for field in self.fields]
+        self.formats = dict(formats or {})
+        self._columns = {field: np.empty(0, dtype=object) for field in self.fields}
+        self._rows = 0
+        self._order = None
+        self._sort = None
+        self._has_more = False
+        self._fetching = False
+
+    def set_columns(self, columns, has_more=False, sort=None):
+        """
+        Replace every row
+        sort is the (field, descending) order the rows arrive in, if any, so
+        the view asking for that same order does not trigger a reload.
+        """
+        self.beginResetModel()
+        self._columns = {field: np.asarray(columns[field]) for field in self.fields}
+        self._rows = len(self._columns[self.fields[0]]) if self.fields else 0
+        self._order = None
+        self._sort = sort
+        self._has_more = has_more
+        self._fetching = False
+        self.endResetModel()
+
+    def append_columns(self, columns, has_more=False):
+        """Add the next page of rows below the loaded ones"""
+        added = len(columns[self.fields[0]]) if self.fields else 0
+        self._has_more = has_more
+        self._fetching = False
+        if not added:
+            return
+
+        self.beginInsertRows(QModelIndex(), self._rows, self._rows + added - 1)
+        self._columns = {
+            field: np.concatenate([self._columns[field], np.asarray(columns[field])]) for field in self.fields
+        }
+        if self._order is not None:
+            self._order = np.concatenate([self._order, np.arange(self._rows, self._rows + added)])
+        self._rows += added
+        self.endInsertRows()
+
+    def fetch_failed(self):
+        """Let fetchMore() ask again after the owner's page request failed"""
+        self._fetching = False
+
+    def clear(self):
+        self.set_columns({field: [] for field in self.fields})
+
+    def column(self, field):
+        """A loaded column in arrival order (not the current sort order)"""
+        return self._columns[field]
+
+    def value(self, row, field):
+        """Raw value shown in the given view row"""
+        return self._columns[field][self._source_row(row)]
+
+    def _source_row(self, row):
+        return row if self._order is None else self._order[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._rows
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.fields)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        field = self.fields[index.column()]
+        if role == Qt.DisplayRole:
+            value = self._columns[field][self._source_row(index.row())]
+            spec = self.formats.get(field)
+            return format(value, spec) if spec else str(value)
+        if role == Qt.TextAlignmentRole and self._columns[field].dtype.kind in 'iuf':
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        field = self.fields[column]
+        descending = order == Qt.DescendingOrder
+        if self._sort == (field, descending):
+            return
+        if self._has_more:
+            # Sorting the loaded part would be wrong; let the server order everything
+            self.sort_requested.emit(field, descending)
+            return
+
+        self.layoutAboutToBeChanged.emit()
+        old_order = self._order
+        new_order = np.argsort(self._columns[field], kind='stable')
+        if descending:
+            new_order = new_order[::-1]
+
+        # Keep selections and the current index on the same rows
+        position = np.empty(self._rows, dtype=np.intp)
+        position[new_order] = np.arange(self._rows)
+        persistent = self.persistentIndexList()
+        moved = []
+        for index in persistent:
+            source = index.row() if old_order is None else old_order[index.row()]
+            moved.append(self.index(int(position[source]), index.column()))
+        self.changePersistentIndexList(persistent, moved)
+
+        self._order = new_order
+        self._sort = (field, descending)
+        self.layoutChanged.emit()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more and not self._fetching
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self._fetching = True
+            self.more_requested.emit()
@@ -0,0 +1,61 @@
+"""
+Tests for the API client's response cache handling
+Run from this directory: python -m unittest
+"""
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import requests
+
+from api_client import APIClient
+from response_cache import ResponseCache
+
+
+def json_response(data, status_code=200, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    response._content = json.dumps(data).encode('utf-8')
+    return response
+
+
+class ResponseCacheNamespaceTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.client = APIClient(base_url='http://testserver/api', cache=ResponseCache(tmp.name))
+
+    def login(self, user_id):
+        data = {'token': f'token-{user_id}', 'user_id': user_id, 'username': f'user{user_id}'}
+        with mock.patch('api_client.requests.post', return_value=json_response(data)):
+            self.client.login(f'user{user_id}', 'secret')
+
+    def fetch_dataset(self):
+        response = json_response({'id': 1}, headers={'ETag': '"v1"'})
+        with mock.patch.object(self.client.session, 'get', return_value=response):
+            return self.client._get('http://testserver/api/datasets/1/')
+
+    def test_users_do_not_share_responses(self):
+        self.login(1)
+        self.fetch_dataset()
+        self.assertEqual(self.client.cache.size()[0], 1)
+
+        self.login(2)
+        self.assertEqual(self.client.cache.size()[0], 0)
+
+    def test_logout_clears_the_users_cache(self):
+        self.login(1)
+        self.fetch_dataset()
+        user_cache = self.client.cache
+
+        with mock.patch.object(self.client.session, 'post'):
+            self.client.logout()
+        self.assertEqual(user_cache.size()[0], 0)
+        self.assertIs(self.client.cache, self.client.base_cache)
+        self.assertIsNone(self.client.token)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+Tests for the analytics chart decimation
+Run from this directory: python -m unittest
+"""
+import unittest
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from charts import TREND_SERIES, DashboardFigure, minmax_decimate
+
+
+class MinMaxDecimateTests(unittest.TestCase):
+    def test_keeps_each_bins_envelope(self):
+        rng = np.random.default_rng(3)
+        x = np.arange(10007, dtype=np.float64)
+        y = rng.normal(0, 1, len(x))
+        y[4321] = 50.0
+
+        out_x, out_y = minmax_decimate(x, y, 97)
+        self.assertLessEqual(len(out_y), 2 * 97)
+        self.assertEqual(len(out_x), len(out_y))
+
+        starts = out_x[0::2].astype(np.intp)
+        bounds = np.append(starts, len(y))
+        for i, (start, stop) in enumerate(zip(bounds[:-1], bounds[1:])):
+            self.assertEqual(out_y[2 * i], y[start:stop].min())
+            self.assertEqual(out_y[2 * i + 1], y[start:stop].max())
+        self.assertEqual(out_y.max(), 50.0)
+        self.assertEqual(out_y.min(), y.min())
+
+    def test_small_series_pass_through(self):
+        x = np.arange(10, dtype=np.float64)
+        y = np.linspace(0, 1, 10)
+        out_x, out_y = minmax_decimate(x, y, 5)
+        self.assertIs(out_x, x)
+        self.assertIs(out_y, y)
+
+
+class DashboardFigureTests(unittest.TestCase):
+    def setUp(self):
+        figure = Figure(figsize=(8, 6), dpi=50)
+        FigureCanvasAgg(figure)
+        self.chart = DashboardFigure(figure)
+        rng = np.random.default_rng(5)
+        self.columns = {field: rng.normal(100, 20, 100000) for field, *_ in TREND_SERIES}
+        self.chart.set_trends(self.columns)
+        self.bins = int(self.chart.trends_ax.bbox.width)
+
+    def test_full_range_is_decimated(self):
+        line_x, line_y = self.chart.trend_lines['flowrate'].get_data()
+        self.assertLessEqual(len(line_y), 2 * self.bins)
+        self.assertEqual(line_y.max(), self.columns['flowrate'].max())
+        self.assertEqual(line_y.min(), self.columns['flowrate'].min())
+
+    def test_zoom_redecimates_only_the_visible_range(self):
+        self.chart.trends_ax.set_xlim(40000, 40100)
+        line_x, line_y = self.chart.trend_lines['pressure'].get_data()
+        visible = self.columns['pressure'][40000:40101]
+        # Few enough rows to be shown as they are
+        np.testing.assert_array_equal(line_x, np.arange(40000, 40101))
+        np.testing.assert_array_equal(line_y, visible)
+
+        self.chart.zoom_trends(1 / 100, center=40050)
+        lo, hi = self.chart.trends_ax.get_xlim()
+        line_x, line_y = self.chart.trend_lines['pressure'].get_data()
+        start, stop = max(int(np.floor(lo)), 0), int(np.ceil(hi)) + 1
+        self.assertLessEqual(len(line_y), 2 * self.bins)
+        self.assertGreaterEqual(line_x.min(), start)
+        self.assertLess(line_x.max(), stop)
+        self.assertEqual(line_y.max(), self.columns['pressure'][start:stop].max())
+        self.assertEqual(line_y.min(), self.columns['pressure'][start:stop].min())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+"""
+Tests for the columnar table model
+Run from this directory: QT_QPA_PLATFORM=offscreen python -m unittest
+"""
+import unittest
+
+import numpy as np
+from PyQt5.QtCore import QCoreApplication, Qt
+
+from table_models import ColumnarTableModel
+
+
+FIELDS = ['name', 'flowrate']
+
+
+def page(start, stop):
+    ids = np.arange(start, stop)
+    return {
+        'name': np.array([f'Unit-{i}' for i in ids], dtype=object),
+        'flowrate': (ids * 37 % 11) + ids / 100.0,
+    }
+
+
+class ColumnarTableModelTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.model = ColumnarTableModel(FIELDS, formats={'flowrate': '.2f'})
+        self.more_requested = []
+        self.sort_requested = []
+        self.model.more_requested.connect(lambda: self.more_requested.append(True))
+        self.model.sort_requested.connect(lambda field, descending: self.sort_requested.append((field, descending)))
+
+    def cell(self, row, column, role=Qt.DisplayRole):
+        return self.model.data(self.model.index(row, column), role)
+
+    def displayed(self, column):
+        return [self.cell(row, column) for row in range(self.model.rowCount())]
+
+    def test_formats_cells_when_asked(self):
+        self.model.set_columns({'name': np.array(['P-1'], dtype=object), 'flowrate': np.array([123456.789])})
+
+        self.assertEqual(self.cell(0, 0), 'P-1')
+        self.assertEqual(self.cell(0, 1), '123456.79')
+        self.assertEqual(self.cell(0, 1, Qt.TextAlignmentRole), int(Qt.AlignRight | Qt.AlignVCenter))
+        self.assertIsNone(self.cell(0, 0, Qt.TextAlignmentRole))
+        self.assertEqual(self.model.headerData(1, Qt.Horizontal), 'Flowrate')
+
+    def test_fetch_more_appends_pages(self):
+        self.model.set_columns(page(0, 50), has_more=True)
+        self.assertEqual(self.model.rowCount(), 50)
+        self.assertTrue(self.model.canFetchMore())
+
+        self.model.fetchMore()
+        # One request at a time until the page arrives
+        self.assertFalse(self.model.canFetchMore())
+        self.model.fetchMore()
+        self.assertEqual(len(self.more_requested), 1)
+
+        self.model.append_columns(page(50, 100), has_more=True)
+        self.assertEqual(self.model.rowCount(), 100)
+        self.model.fetchMore()
+        self.model.append_columns(page(100, 120), has_more=False)
+        self.assertEqual(self.model.rowCount(), 120)
+        self.assertFalse(self.model.canFetchMore())
+        self.assertEqual(len(self.more_requested), 2)
+        self.assertEqual(self.cell(119, 0), 'Unit-119')
+
+    def test_fetch_failed_allows_another_request(self):
+        self.model.set_columns(page(0, 10), has_more=True)
+        self.model.fetchMore()
+        self.model.fetch_failed()
+        self.assertTrue(self.model.canFetchMore())
+
+    def test_sort_reorders_an_index(self):
+        columns = page(0, 40)
+        self.model.set_columns(columns)
+
+        self.model.sort(1, Qt.AscendingOrder)
+        order = np.argsort(columns['flowrate'], kind='stable')
+        self.assertEqual(self.displayed(1), [format(value, '.2f') for value in columns['flowrate'][order]])
+        self.assertEqual(self.displayed(0), list(columns['name'][order]))
+
+        self.model.sort(1, Qt.DescendingOrder)
+        self.assertEqual(self.displayed(0), list(columns['name'][order[::-1]]))
+        # The data itself stays in arrival order
+        self.assertEqual(list(self.model.column('name')), list(columns['name']))
+        self.assertEqual(self.sort_requested, [])
+
+    def test_sort_keeps_rows_appended_later_at_the_end(self):
+        self.model.set_columns(page(0, 10))
+        self.model.sort(1, Qt.AscendingOrder)
+        self.model.append_columns(page(10, 12))
+        self.assertEqual(self.displayed(0)[-2:], ['Unit-10', 'Unit-11'])
+
+    def test_partial_data_asks_the_server_to_sort(self):
+        self.model.set_columns(page(0, 20), has_more=True, sort=('name', False))
+        before = self.displayed(0)
+
+        self.model.sort(0, Qt.AscendingOrder)
+        self.model.sort(1, Qt.DescendingOrder)
+        self.assertEqual(self.sort_requested, [('flowrate', True)])
+        self.assertEqual(self.displayed(0), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
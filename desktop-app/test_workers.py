@@ -0,0 +1,71 @@
+"""
+Tests for the background loaders
+Run from this directory: QT_QPA_PLATFORM=offscreen python -m unittest
+"""
+import threading
+import unittest
+
+from PyQt5.QtCore import QCoreApplication, QThreadPool
+
+from workers import FetchGroup
+
+
+class FetchGroupTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QCoreApplication.instance() or QCoreApplication([])
+
+    def setUp(self):
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self.release = threading.Event()
+        self.addCleanup(self.pool.waitForDone)
+        self.addCleanup(self.release.set)
+
+    def process_events_until(self, condition, timeout=5.0):
+        deadline = threading.Event()
+        timer = threading.Timer(timeout, deadline.set)
+        timer.start()
+        try:
+            while not condition() and not deadline.is_set():
+                self.app.processEvents()
+        finally:
+            timer.cancel()
+        self.assertTrue(condition())
+
+    def test_cancel_after_partial_completion(self):
+        blocked = threading.Event()
+
+        def slow():
+            blocked.set()
+            self.release.wait(5)
+            return 'slow'
+
+        emitted = []
+        group = FetchGroup(self.pool, {'fast': lambda: 'fast', 'slow': slow, 'queued': lambda: 'queued'})
+        group.finished.connect(emitted.append)
+        group.failed.connect(emitted.append)
+        group.start()
+
+        # fast has run (and been deleted by the pool), slow is in flight, queued is waiting
+        self.process_events_until(lambda: 'fast' in group.results and blocked.is_set())
+        group.cancel()
+
+        self.release.set()
+        self.pool.waitForDone()
+        self.app.processEvents()
+        self.assertEqual(group.results, {'fast': 'fast'})
+        self.assertEqual(emitted, [])
+
+    def test_finished_carries_every_result(self):
+        emitted = []
+        group = FetchGroup(self.pool, {'a': lambda: 1, 'b': lambda: 2})
+        group.finished.connect(emitted.append)
+        group.start()
+
+        self.process_events_until(lambda: emitted)
+        self.assertEqual(emitted, [{'a': 1, 'b': 2}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Background loading for the desktop app
+API calls run on a shared QThreadPool instead of the GUI thread. Requests
+that do not depend on each other (a dataset and its summary, say) are
+started together as one FetchGroup and delivered to the window in a single
+signal once all of them have answered. Starting a new load under the same
+name cancels the previous one: its queued requests are taken off the pool
+and anything still in flight is dropped when it returns.
+"""
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class FetchSignals(QObject):
+    """Signals a FetchTask emits from its worker thread (delivered on the GUI thread)"""
+    result = pyqtSignal(object, object)
+    error = pyqtSignal(object, str)
+
+
+class FetchTask(QRunnable):
+    """
+    Run one API call on the pool and report its result under key
+    The pool deletes a task once it has run; started (a plain Python
+    attribute, set under lock) tells the group whether it may still touch it.
+    """
+
+    def __init__(self, key, func, signals, cancelled, lock):
+        super().__init__()
+        self.key = key
+        self.func = func
+        self.signals = signals
+        self.cancelled = cancelled
+        self.lock = lock
+        self.started = False
+
+    def run(self):
+        with self.lock:
+            self.started = True
+        if self.cancelled.is_set():
+            return
+        try:
+            value = self.func()
+        except Exception as e:
+            if not self.cancelled.is_set():
+                self.signals.error.emit(self.key, str(e))
+            return
+        if not self.cancelled.is_set():
+            self.signals.result.emit(self.key, value)
+
+
+class FetchGroup(QObject):
+    """
+    Independent API calls loaded in parallel and delivered together
+    fetches maps a key to a zero-argument callable; finished carries
+    {key: result} once every call has returned, failed the first error.
+    A cancelled group emits neither.
+    """
+    finished = pyqtSignal(dict)
+    failed = pyqtSignal(str)
+
+    def __init__(self, pool, fetches, parent=None):
+        super().__init__(parent)
+        self.pool = pool
+        self.fetches = dict(fetches)
+        self.results = {}
+        self.tasks = []
+        self.signals = FetchSignals(self)
+        self.signals.result.connect(self._on_result)
+        self.signals.error.connect(self._on_error)
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def start(self):
+        for key, func in self.fetches.items():
+            task = FetchTask(key, func, self.signals, self._cancelled, self._lock)
+            self.tasks.append(task)
+            self.pool.start(task)
+
+    def cancel(self):
+        """Drop this group's queued calls and ignore the ones already running"""
+        self._cancelled.set()
+        with self._lock:
+            for task in self.tasks:
+                # A started task may have finished and been deleted by the
+                # pool; only queued ones are still alive to take back
+                if not task.started:
+                    self.pool.tryTake(task)
+        self.tasks = []
+
+    def _on_result(self, key, value):
+        # Results queued before cancel() still arrive; the flag is checked on
+        # the GUI thread, so a stale result can never reach the window
+        if self.cancelled:
+            return
+        self.results[key] = value
+        if len(self.results) == len(self.fetches):
+            self.tasks = []
+            self.finished.emit(self.results)
+
+    def _on_error(self, key, message):
+        if self.cancelled:
+            return
+        self.cancel()
+        self.failed.emit(message)
+
+
+class DataLoader(QObject):
+    """
+    Named background loads on one thread pool
+    At most one load per name is live: load('details', ...) for a newly
+    picked dataset cancels the details load for the previous one.
+    """
+
+    def __init__(self, max_threads=4, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        self.groups = {}
+
+    def load(self, name, fetches, on_finished, on_failed=None):
+        """Start the fetches in parallel, replacing any running load with this name"""
+        self.cancel(name)
+        group = FetchGroup(self.pool, fetches, self)
+        group.finished.connect(on_finished)
+        if on_failed is not None:
+            group.failed.connect(on_failed)
+        group.finished.connect(lambda _results: self._done(name, group))
+        group.failed.connect(lambda _message: self._done(name, group))
+        self.groups[name] = group
+        group.start()
+        return group
+
+    def is_loading(self, name):
+        return name in self.groups
+
+    def cancel(self, name):
+        group = self.groups.pop(name, None)
+        if group is not None:
+            group.cancel()
+            group.deleteLater()
+
+    def cancel_all(self):
+        for name in list(self.groups):
+            self.cancel(name)
+
+    def shutdown(self, msecs=2000):
+        """Cancel every load and give in-flight requests a moment to return"""
+        self.cancel_all()
+        self.pool.clear()
+        self.pool.waitForDone(msecs)
+
+    def _done(self, name, group):
+        if self.groups.get(name) is group:
+            del self.groups[name]
+            group.deleteLater()
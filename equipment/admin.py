@@ -1,17 +1,23 @@
 from django.contrib import admin
-from .models import Dataset, Equipment, AlertRule, AlertHistory
+from django.db.models import Count
+from .models import Dataset, Equipment, AlertRule, AlertHistory, Job, Notification
 
 
 @admin.register(Dataset)
 class DatasetAdmin(admin.ModelAdmin):
-    list_display = ['file_name', 'upload_date', 'uploaded_by', 'equipment_count']
-    list_filter = ['upload_date']
+    list_display = ['file_name', 'upload_date', 'uploaded_by', 'status', 'equipment_count']
+    list_filter = ['status', 'upload_date']
     search_fields = ['file_name']
     readonly_fields = ['upload_date']
+    list_select_related = ['uploaded_by']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_equipment_count=Count('equipment_items'))
     
     def equipment_count(self, obj):
-        return obj.equipment_items.count()
+        return obj._equipment_count
     equipment_count.short_description = 'Equipment Count'
+    equipment_count.admin_order_field = '_equipment_count'
 
 
 @admin.register(Equipment)
@@ -19,6 +25,7 @@ class EquipmentAdmin(admin.ModelAdmin):
     list_display = ['name', 'type', 'flowrate', 'pressure', 'temperature', 'dataset']
     list_filter = ['type', 'dataset']
     search_fields = ['name', 'type']
+    list_select_related = ['dataset']
     list_per_page = 50
 
 
@@ -37,4 +44,25 @@ class AlertHistoryAdmin(admin.ModelAdmin):
     list_filter = ['severity', 'acknowledged', 'email_sent', 'telegram_sent', 'created_at']
     search_fields = ['equipment__name', 'message']
     readonly_fields = ['created_at']
+    list_select_related = ['equipment']
+    list_per_page = 50
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'stage', 'rows_processed', 'file_name', 'dataset', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status', 'created_at']
+    search_fields = ['file_name', 'error']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+    list_select_related = ['dataset']
+    list_per_page = 50
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['alert', 'channel', 'recipient', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['channel', 'status', 'created_at']
+    search_fields = ['recipient', 'subject', 'last_error']
+    readonly_fields = ['created_at', 'sent_at', 'claimed_at']
+    list_select_related = ['alert__equipment']
     list_per_page = 50
@@ -1,11 +1,12 @@
 """
 Alert System for Chemical Equipment Visualizer
-Detects anomalies and sends notifications via Email/Telegram
+Detects anomalies and queues notifications via Email/Telegram
 """
-from django.core.mail import send_mail
 from django.conf import settings
-import requests
+import numpy as np
+from .column_store import load_columns
 from .models import Equipment, AlertRule, AlertHistory
+from .notifications import enqueue_notifications
 from datetime import datetime
 
 
@@ -13,26 +14,25 @@ class AlertManager:
     """Manages alert detection and notification"""
     
     def __init__(self):
-        self.rules = []
+        self.rules = None
+    
+    def get_rules(self):
+        """Load active alert rules once per manager"""
+        if self.rules is None:
+            self.rules = list(AlertRule.objects.filter(is_active=True))
+        return self.rules
     
     def check_equipment(self, equipment):
         """Check equipment against alert rules"""
         alerts = []
         
-        # Get active alert rules
-        rules = AlertRule.objects.filter(is_active=True)
-        
-        for rule in rules:
+        for rule in self.get_rules():
             if self.evaluate_rule(equipment, rule):
                 alert = self.create_alert(equipment, rule)
                 alerts.append(alert)
-                
-                # Send notifications
-                if rule.send_email:
-                    self.send_email_alert(alert)
-                
-                if rule.send_telegram:
-                    self.send_telegram_alert(alert)
+        
+        # Queue notifications for the background dispatcher
+        enqueue_notifications([(alert, equipment.name) for alert in alerts], equipment.dataset)
         
         return alerts
     
@@ -64,11 +64,27 @@ class AlertManager:
         )
         return alert
     
+    def rule_mask(self, rule, values):
+        """Evaluate a rule over a whole parameter column, returning a boolean mask"""
+        if rule.condition == 'greater_than':
+            return values > rule.threshold
+        elif rule.condition == 'less_than':
+            return values < rule.threshold
+        elif rule.condition == 'equals':
+            return values == rule.threshold
+        elif rule.condition == 'between' and rule.min_value is not None and rule.max_value is not None:
+            return (values >= rule.min_value) & (values <= rule.max_value)
+        
+        return np.zeros(len(values), dtype=bool)
+    
     def generate_message(self, equipment, rule):
         """Generate alert message"""
-        value = getattr(equipment, rule.parameter)
+        return self.format_message(equipment.name, getattr(equipment, rule.parameter), rule)
+    
+    def format_message(self, equipment_name, value, rule):
+        """Format alert message for an equipment name and parameter value"""
         return (
-            f"⚠️ ALERT: {equipment.name}\n"
+            f"⚠️ ALERT: {equipment_name}\n"
             f"Parameter: {rule.parameter.upper()}\n"
             f"Current Value: {value:.2f}\n"
             f"Threshold: {rule.threshold:.2f}\n"
@@ -76,69 +92,48 @@ class AlertManager:
             f"Severity: {rule.get_severity_display()}"
         )
     
-    def send_email_alert(self, alert):
-        """Send email notification"""
-        try:
-            subject = f"🚨 Equipment Alert: {alert.equipment.name}"
-            message = alert.message
-            
-            # Add more details
-            message += f"\n\nDataset: {alert.equipment.dataset.file_name}"
-            message += f"\nTime: {alert.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
-            message += f"\n\nPlease check the dashboard for more details."
-            
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[alert.rule.email_recipients],
-                fail_silently=False,
-            )
-            
-            alert.email_sent = True
-            alert.save()
-            
-        except Exception as e:
-            print(f"Failed to send email: {e}")
-    
-    def send_telegram_alert(self, alert):
-        """Send Telegram notification"""
-        try:
-            bot_token = settings.TELEGRAM_BOT_TOKEN
-            chat_id = alert.rule.telegram_chat_id
-            
-            if not bot_token or not chat_id:
-                return
-            
-            message = alert.message
-            message += f"\n\n📊 Dataset: {alert.equipment.dataset.file_name}"
-            message += f"\n🕐 Time: {alert.created_at.strftime('%Y-%m-%d %H:%M:%S')}"
-            
-            url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
-            data = {
-                'chat_id': chat_id,
-                'text': message,
-                'parse_mode': 'HTML'
-            }
-            
-            response = requests.post(url, data=data)
+    def check_dataset(self, dataset):
+        """
+        Check all equipment in a dataset
+        
+        Active rules are loaded once and evaluated as NumPy masks over the
+        dataset's column store; matches are written with a single bulk_create.
+        """
+        rules = self.get_rules()
+        if not rules:
+            return []
+        
+        columns = load_columns(dataset)
+        names = None
+        
+        alerts = []
+        alert_names = []
+        for rule in rules:
+            values = getattr(columns, rule.parameter)
+            hits = np.flatnonzero(self.rule_mask(rule, values))
+            if not hits.size:
+                continue
             
-            if response.status_code == 200:
-                alert.telegram_sent = True
-                alert.save()
+            if names is None:
+                names = columns.names()
             
-        except Exception as e:
-            print(f"Failed to send Telegram message: {e}")
-    
-    def check_dataset(self, dataset):
-        """Check all equipment in a dataset"""
-        all_alerts = []
+            for index, equipment_id, value in zip(hits.tolist(), columns.id[hits].tolist(), values[hits].tolist()):
+                alerts.append(AlertHistory(
+                    equipment_id=equipment_id,
+                    rule=rule,
+                    parameter=rule.parameter,
+                    value=value,
+                    threshold=rule.threshold,
+                    message=self.format_message(names[index], value, rule),
+                    severity=rule.severity
+                ))
+                alert_names.append(names[index])
         
-        for equipment in dataset.equipment_items.all():
-            alerts = self.check_equipment(equipment)
-            all_alerts.extend(alerts)
+        AlertHistory.objects.bulk_create(alerts, batch_size=getattr(settings, 'CSV_INGEST_BATCH_SIZE', 2000))
         
-        return all_alerts
+        # Queue notifications for the background dispatcher
+        enqueue_notifications(zip(alerts, alert_names), dataset)
+        return alerts
 
 
 def check_anomalies(equipment_data):
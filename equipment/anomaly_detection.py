@@ -2,23 +2,195 @@
 Advanced Anomaly Detection System using Machine Learning
 Detects equipment parameters that deviate from normal ranges
 """
+import hashlib
+import io
+import json
+import logging
+import threading
+
 import numpy as np
 import pandas as pd
+from django.conf import settings
 from sklearn.ensemble import IsolationForest
 from sklearn.preprocessing import StandardScaler
 from scipy import stats
 from datetime import datetime, timedelta
+from .cache_store import get_cache_store
+from .column_store import load_columns
+from .dataset_stats import PARAMETERS, get_dataset_statistics
+from .model_registry import current_model_id, get_baseline
+
+
+logger = logging.getLogger(__name__)
+
+
+# Detector configuration; ANOMALY_DETECTION in settings overrides individual keys.
+# Any change produces a new detector_version() and invalidates stored results.
+DEFAULT_DETECTOR_CONFIG = {
+    'revision': 1,            # bump when the detection code itself changes
+    'contamination': 0.1,     # Expect 10% anomalies
+    'n_estimators': 100,
+    'random_state': 42,
+    'z_threshold': 3.0,
+    'iqr_factor': 1.5,
+    'min_rows': 3,            # below this, fall back to simple thresholds
+}
+
+SEVERITIES = ('normal', 'medium', 'high', 'critical')
+
+
+def get_detector_config():
+    """Return the effective detector configuration"""
+    return dict(DEFAULT_DETECTOR_CONFIG, **getattr(settings, 'ANOMALY_DETECTION', {}))
+
+
+def detector_version(config=None, baseline_id=None):
+    """Short stamp identifying a detector configuration and baseline model"""
+    config = config or get_detector_config()
+    stamp = dict(config, baseline=baseline_id)
+    encoded = json.dumps(stamp, sort_keys=True).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:12]
+
+
+def current_detector_version():
+    """detector_version() for the current configuration and baseline, without loading models"""
+    return detector_version(baseline_id=current_model_id())
+
+
+class AnomalyResults:
+    """
+    Per-row detection outcome for one dataset, held as arrays
+
+    Rows are in reporting order: order[i] is the column-store row index of
+    result i (equipment name order for datasets).
+    """
+
+    ARRAYS = ('order', 'isolation_score', 'z_score_flag', 'iqr_flag', 'health_score', 'severity_code')
+
+    def __init__(self, mode, order, isolation_score, z_score_flag, iqr_flag, health_score, severity_code, version=None):
+        self.mode = mode
+        self.order = np.asarray(order, dtype=np.int64)
+        self.isolation_score = np.asarray(isolation_score, dtype=np.int8)
+        self.z_score_flag = np.asarray(z_score_flag, dtype=bool)
+        self.iqr_flag = np.asarray(iqr_flag, dtype=bool)
+        self.health_score = np.asarray(health_score, dtype=np.int16)
+        self.severity_code = np.asarray(severity_code, dtype=np.int8)
+        self.version = version or current_detector_version()
+
+    def __len__(self):
+        return len(self.order)
+
+    @property
+    def is_anomaly(self):
+        return (self.isolation_score == -1) | self.z_score_flag | self.iqr_flag
+
+    def health_summary(self):
+        """Overall health figures for the dataset"""
+        total = len(self)
+        if not total:
+            return {
+                'overall_health': 100,
+                'total_equipment': 0,
+                'anomalies_detected': 0,
+                'critical_count': 0,
+                'health_status': 'excellent'
+            }
+
+        anomaly_count = int(self.is_anomaly.sum())
+        critical_count = int((self.severity_code == SEVERITIES.index('critical')).sum())
+        avg_health = float(self.health_score.mean())
+
+        # Determine overall status
+        if avg_health >= 90:
+            status = 'excellent'
+        elif avg_health >= 75:
+            status = 'good'
+        elif avg_health >= 60:
+            status = 'fair'
+        elif avg_health >= 40:
+            status = 'poor'
+        else:
+            status = 'critical'
+
+        return {
+            'overall_health': round(avg_health, 2),
+            'total_equipment': total,
+            'anomalies_detected': anomaly_count,
+            'critical_count': critical_count,
+            'health_status': status,
+            'anomaly_rate': round((anomaly_count / total) * 100, 2)
+        }
+
+    def to_records(self, ids, names, parameter_rows):
+        """
+        Build the per-equipment dicts returned by the API
+        ids, names and parameter_rows are already in reporting order
+        """
+        details = (
+            AnomalyDetector._get_simple_anomaly_details if self.mode == 'simple'
+            else AnomalyDetector._get_anomaly_details
+        )
+        return [
+            {
+                'equipment_id': ids[i],
+                'equipment_name': names[i],
+                'is_anomaly': is_anomaly,
+                'isolation_score': float(isolation),
+                'z_score_flag': z_flag,
+                'iqr_flag': iqr_flag,
+                'health_score': health,
+                'anomaly_details': details(dict(zip(PARAMETERS, parameter_rows[i]))),
+                'severity': SEVERITIES[severity]
+            }
+            for i, (is_anomaly, isolation, z_flag, iqr_flag, health, severity) in enumerate(zip(
+                self.is_anomaly.tolist(), self.isolation_score.tolist(), self.z_score_flag.tolist(),
+                self.iqr_flag.tolist(), self.health_score.tolist(), self.severity_code.tolist()
+            ))
+        ]
+
+    def records_for_columns(self, columns):
+        """Build API records from a dataset's column store"""
+        return self.to_records(
+            columns.id[self.order].tolist(),
+            columns.names(self.order),
+            columns.to_frame(self.order)[list(PARAMETERS)].to_numpy().tolist(),
+        )
+
+    def to_bytes(self):
+        """Serialize the arrays, mode and version stamp as one .npz payload"""
+        buffer = io.BytesIO()
+        np.savez(buffer, mode=np.array(self.mode), version=np.array(self.version),
+                 **{name: getattr(self, name) for name in self.ARRAYS})
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        with np.load(io.BytesIO(data)) as arrays:
+            return cls(str(arrays['mode']), version=str(arrays['version']),
+                       **{name: arrays[name] for name in cls.ARRAYS})
 
 
 class AnomalyDetector:
     """ML-based anomaly detection for equipment data"""
     
-    def __init__(self):
+    def __init__(self, statistics=None, config=None, baseline=None):
+        # Precomputed dataset statistics (see dataset_stats); when given, the
+        # scaler, z-score and IQR steps reuse them instead of recomputing
+        self.statistics = statistics
+        self.config = config or get_detector_config()
+        
+        # A pre-trained baseline (see model_registry) replaces per-dataset
+        # fitting: rows are scored against fleet history, and the z-score and
+        # IQR steps use the fleet statistics it was trained on
+        self.baseline = baseline
+        if baseline is not None:
+            self.statistics = baseline.statistics
+        
         self.scaler = StandardScaler()
         self.model = IsolationForest(
-            contamination=0.1,  # Expect 10% anomalies
-            random_state=42,
-            n_estimators=100
+            contamination=self.config['contamination'],
+            random_state=self.config['random_state'],
+            n_estimators=self.config['n_estimators']
         )
     
     def detect_anomalies(self, equipment_data):
@@ -26,53 +198,75 @@ class AnomalyDetector:
         Detect anomalies in equipment data using multiple methods
         Returns dict with anomaly scores and flags
         """
-        if len(equipment_data) < 3:
-            # Need at least 3 data points for meaningful detection
-            return self._simple_detection(equipment_data)
-        
         # Prepare data
         df = pd.DataFrame([{
             'flowrate': item.flowrate,
             'pressure': item.pressure,
             'temperature': item.temperature
-        } for item in equipment_data])
+        } for item in equipment_data], columns=list(PARAMETERS))
+        ids = [item.id for item in equipment_data]
+        names = [item.name for item in equipment_data]
+        
+        types = [item.type for item in equipment_data]
+        
+        results = self.score(df, np.arange(len(df)), types)
+        return results.to_records(ids, names, df.to_numpy().tolist())
+    
+    def detect_anomalies_for_columns(self, columns):
+        """
+        Detect anomalies straight from a dataset's column store
+        Results are ordered by equipment name, like the Equipment queryset
+        """
+        order = columns.name_order()
+        return self.score(columns.to_frame(order), order, columns.types(order))
+    
+    def score(self, df, order, types=None):
+        """Run every detection method over a parameter frame, returning AnomalyResults"""
+        version = detector_version(self.config, self.baseline.model_id if self.baseline else None)
+        if self.baseline is None and len(df) < self.config['min_rows']:
+            # Need at least 3 data points for meaningful detection
+            return self._simple_detection(df, order, version)
         
         # Method 1: Isolation Forest (ML-based)
-        isolation_scores = self._isolation_forest_detection(df)
+        if self.baseline is not None:
+            isolation_scores = self.baseline.predict(df[list(PARAMETERS)].to_numpy(), types)
+        else:
+            isolation_scores = np.asarray(self._isolation_forest_detection(df))
         
         # Method 2: Z-Score (Statistical)
-        z_scores = self._zscore_detection(df)
+        z_scores = np.asarray(self._zscore_detection(df), dtype=bool)
         
         # Method 3: IQR (Interquartile Range)
-        iqr_flags = self._iqr_detection(df)
+        iqr_flags = np.asarray(self._iqr_detection(df), dtype=bool)
         
         # Combine results
-        results = []
-        for i, item in enumerate(equipment_data):
-            anomaly_info = {
-                'equipment_id': item.id,
-                'equipment_name': item.name,
-                'is_anomaly': isolation_scores[i] == -1 or z_scores[i] or iqr_flags[i],
-                'isolation_score': float(isolation_scores[i]),
-                'z_score_flag': bool(z_scores[i]),
-                'iqr_flag': bool(iqr_flags[i]),
-                'health_score': self._calculate_health_score(
-                    isolation_scores[i], z_scores[i], iqr_flags[i]
-                ),
-                'anomaly_details': self._get_anomaly_details(item, df.iloc[i]),
-                'severity': self._calculate_severity(
-                    isolation_scores[i], z_scores[i], iqr_flags[i]
-                )
-            }
-            results.append(anomaly_info)
-        
-        return results
+        return AnomalyResults(
+            'full', order, isolation_scores, z_scores, iqr_flags,
+            self._calculate_health_score(isolation_scores, z_scores, iqr_flags),
+            self._calculate_severity(isolation_scores, z_scores, iqr_flags),
+            version=version,
+        )
+    
+    def _parameter_vector(self, key):
+        """Return one statistic for every parameter as an array"""
+        parameters = self.statistics['parameters']
+        return np.array([parameters[parameter][key] for parameter in PARAMETERS])
+    
+    def _standardize(self, df):
+        """Standardize columns using stored mean/std (zero-variance columns map to 0)"""
+        means = self._parameter_vector('mean')
+        stds = self._parameter_vector('std')
+        centered = df[list(PARAMETERS)].to_numpy(dtype=np.float64) - means
+        return np.divide(centered, stds, out=np.zeros_like(centered), where=stds > 0)
     
     def _isolation_forest_detection(self, df):
         """Use Isolation Forest for anomaly detection"""
         try:
             # Normalize data
-            X = self.scaler.fit_transform(df)
+            if self.statistics:
+                X = self._standardize(df)
+            else:
+                X = self.scaler.fit_transform(df)
             
             # Fit and predict
             predictions = self.model.fit_predict(X)
@@ -86,10 +280,13 @@ class AnomalyDetector:
     def _zscore_detection(self, df):
         """Use Z-score for anomaly detection"""
         try:
-            z_scores = np.abs(stats.zscore(df))
-            # Flag if any parameter has |z-score| > 3
-            anomalies = (z_scores > 3).any(axis=1)
-            return anomalies.values
+            if self.statistics:
+                z_scores = np.abs(self._standardize(df))
+            else:
+                z_scores = np.abs(np.asarray(stats.zscore(df)))
+            # Flag if any parameter has |z-score| above the threshold
+            anomalies = (z_scores > self.config['z_threshold']).any(axis=1)
+            return anomalies
         except Exception as e:
             print(f"Z-score error: {e}")
             return np.zeros(len(df), dtype=bool)
@@ -97,13 +294,17 @@ class AnomalyDetector:
     def _iqr_detection(self, df):
         """Use IQR method for anomaly detection"""
         try:
-            Q1 = df.quantile(0.25)
-            Q3 = df.quantile(0.75)
+            if self.statistics:
+                Q1 = pd.Series(self._parameter_vector('q1'), index=PARAMETERS)
+                Q3 = pd.Series(self._parameter_vector('q3'), index=PARAMETERS)
+            else:
+                Q1 = df.quantile(0.25)
+                Q3 = df.quantile(0.75)
             IQR = Q3 - Q1
             
-            # Define outliers as values outside 1.5*IQR
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
+            # Define outliers as values outside iqr_factor * IQR
+            lower_bound = Q1 - self.config['iqr_factor'] * IQR
+            upper_bound = Q3 + self.config['iqr_factor'] * IQR
             
             # Check if any value is outside bounds
             anomalies = ((df < lower_bound) | (df > upper_bound)).any(axis=1)
@@ -112,70 +313,54 @@ class AnomalyDetector:
             print(f"IQR error: {e}")
             return np.zeros(len(df), dtype=bool)
     
-    def _simple_detection(self, equipment_data):
+    def _simple_detection(self, df, order, version):
         """Simple rule-based detection for small datasets"""
-        results = []
-        for item in equipment_data:
-            # Simple thresholds
-            is_anomaly = (
-                item.flowrate > 250 or item.flowrate < 50 or
-                item.pressure > 40 or item.pressure < 10 or
-                item.temperature > 200 or item.temperature < 50
-            )
-            
-            results.append({
-                'equipment_id': item.id,
-                'equipment_name': item.name,
-                'is_anomaly': is_anomaly,
-                'isolation_score': -1 if is_anomaly else 1,
-                'z_score_flag': is_anomaly,
-                'iqr_flag': is_anomaly,
-                'health_score': 50 if is_anomaly else 95,
-                'anomaly_details': self._get_simple_anomaly_details(item),
-                'severity': 'high' if is_anomaly else 'normal'
-            })
+        # Simple thresholds
+        is_anomaly = (
+            (df['flowrate'] > 250) | (df['flowrate'] < 50) |
+            (df['pressure'] > 40) | (df['pressure'] < 10) |
+            (df['temperature'] > 200) | (df['temperature'] < 50)
+        ).to_numpy(dtype=bool)
         
-        return results
+        return AnomalyResults(
+            'simple', order,
+            np.where(is_anomaly, -1, 1), is_anomaly, is_anomaly,
+            np.where(is_anomaly, 50, 95),
+            np.where(is_anomaly, SEVERITIES.index('high'), SEVERITIES.index('normal')),
+            version=version,
+        )
     
     def _calculate_health_score(self, isolation_score, z_score_flag, iqr_flag):
         """
-        Calculate health score (0-100)
+        Calculate health scores (0-100) for arrays of detection outcomes
         100 = Perfect health, 0 = Critical
         """
-        score = 100
+        score = np.full(len(isolation_score), 100)
         
         # Isolation Forest penalty
-        if isolation_score == -1:
-            score -= 40
+        score -= np.where(isolation_score == -1, 40, 0)
         
         # Z-score penalty
-        if z_score_flag:
-            score -= 30
+        score -= np.where(z_score_flag, 30, 0)
         
         # IQR penalty
-        if iqr_flag:
-            score -= 20
+        score -= np.where(iqr_flag, 20, 0)
         
-        return max(0, min(100, score))
+        return np.clip(score, 0, 100)
     
     def _calculate_severity(self, isolation_score, z_score_flag, iqr_flag):
-        """Calculate severity level"""
-        anomaly_count = sum([
-            isolation_score == -1,
-            z_score_flag,
-            iqr_flag
-        ])
+        """Calculate severity codes (indices into SEVERITIES)"""
+        anomaly_count = (
+            (isolation_score == -1).astype(np.int8) +
+            z_score_flag.astype(np.int8) +
+            iqr_flag.astype(np.int8)
+        )
         
-        if anomaly_count >= 3:
-            return 'critical'
-        elif anomaly_count == 2:
-            return 'high'
-        elif anomaly_count == 1:
-            return 'medium'
-        else:
-            return 'normal'
+        # 0 = normal, 1 = medium, 2 = high, 3+ = critical
+        return np.minimum(anomaly_count, len(SEVERITIES) - 1)
     
-    def _get_anomaly_details(self, item, row):
+    @staticmethod
+    def _get_anomaly_details(row):
         """Get detailed anomaly information"""
         details = []
         
@@ -183,55 +368,56 @@ class AnomalyDetector:
         if row['flowrate'] > 220 or row['flowrate'] < 100:
             details.append({
                 'parameter': 'flowrate',
-                'value': float(item.flowrate),
+                'value': float(row['flowrate']),
                 'status': 'abnormal',
-                'message': f"Flowrate {item.flowrate:.2f} is outside normal range"
+                'message': f"Flowrate {row['flowrate']:.2f} is outside normal range"
             })
         
         if row['pressure'] > 35 or row['pressure'] < 15:
             details.append({
                 'parameter': 'pressure',
-                'value': float(item.pressure),
+                'value': float(row['pressure']),
                 'status': 'abnormal',
-                'message': f"Pressure {item.pressure:.2f} is outside normal range"
+                'message': f"Pressure {row['pressure']:.2f} is outside normal range"
             })
         
         if row['temperature'] > 180 or row['temperature'] < 70:
             details.append({
                 'parameter': 'temperature',
-                'value': float(item.temperature),
+                'value': float(row['temperature']),
                 'status': 'abnormal',
-                'message': f"Temperature {item.temperature:.2f} is outside normal range"
+                'message': f"Temperature {row['temperature']:.2f} is outside normal range"
             })
         
         return details
     
-    def _get_simple_anomaly_details(self, item):
+    @staticmethod
+    def _get_simple_anomaly_details(row):
         """Get anomaly details for simple detection"""
         details = []
         
-        if item.flowrate > 250 or item.flowrate < 50:
+        if row['flowrate'] > 250 or row['flowrate'] < 50:
             details.append({
                 'parameter': 'flowrate',
-                'value': float(item.flowrate),
+                'value': float(row['flowrate']),
                 'status': 'critical',
-                'message': f"Flowrate {item.flowrate:.2f} is critically abnormal"
+                'message': f"Flowrate {row['flowrate']:.2f} is critically abnormal"
             })
         
-        if item.pressure > 40 or item.pressure < 10:
+        if row['pressure'] > 40 or row['pressure'] < 10:
             details.append({
                 'parameter': 'pressure',
-                'value': float(item.pressure),
+                'value': float(row['pressure']),
                 'status': 'critical',
-                'message': f"Pressure {item.pressure:.2f} is critically abnormal"
+                'message': f"Pressure {row['pressure']:.2f} is critically abnormal"
             })
         
-        if item.temperature > 200 or item.temperature < 50:
+        if row['temperature'] > 200 or row['temperature'] < 50:
             details.append({
                 'parameter': 'temperature',
-                'value': float(item.temperature),
+                'value': float(row['temperature']),
                 'status': 'critical',
-                'message': f"Temperature {item.temperature:.2f} is critically abnormal"
+                'message': f"Temperature {row['temperature']:.2f} is critically abnormal"
             })
         
         return details
@@ -305,47 +491,68 @@ class AnomalyDetector:
             return f"Decreasing {abs_change:.1f}% over last 3 uploads"
 
 
+# A fixed set of locks shared by dataset id; two datasets on the same stripe
+# just take turns, and the set never grows with the number of datasets
+RESULTS_LOCK_STRIPES = 64
+_results_locks = [threading.Lock() for _ in range(RESULTS_LOCK_STRIPES)]
+
+
+def _results_lock(dataset_id):
+    return _results_locks[hash(dataset_id) % RESULTS_LOCK_STRIPES]
+
+
+def anomaly_cache_key(dataset_id, version):
+    return f'{dataset_id}:{version}'
+
+
+def get_anomaly_results(dataset):
+    """
+    Return the dataset's anomaly results, computing and caching them on first use
+    Results are cached per detector_version, so a configuration change or a
+    new baseline is picked up without explicit invalidation.
+    """
+    columns = load_columns(dataset)
+    baseline = get_baseline()
+    version = detector_version(baseline_id=baseline.model_id if baseline else None)
+    store = get_cache_store()
+    key = anomaly_cache_key(dataset.id, version)
+
+    # Concurrent callers (the upload precompute, report rendering, API
+    # requests) wait for one computation instead of each running the detector
+    with _results_lock(dataset.id):
+        data = store.get('anomalies', key)
+        results = AnomalyResults.from_bytes(data) if data is not None else None
+        if results is None or len(results) != len(columns):
+            detector = AnomalyDetector(statistics=get_dataset_statistics(dataset), baseline=baseline)
+            results = detector.detect_anomalies_for_columns(columns)
+            store.set('anomalies', key, results.to_bytes(), datasets=[dataset.id])
+    return results
+
+
 def get_dataset_health_summary(dataset):
     """
     Get overall health summary for a dataset
+    The small summary is cached on its own so it is served without loading
+    the per-row results.
     """
-    detector = AnomalyDetector()
-    equipment_items = list(dataset.equipment_items.all())
-    
-    if not equipment_items:
-        return {
-            'overall_health': 100,
-            'total_equipment': 0,
-            'anomalies_detected': 0,
-            'critical_count': 0,
-            'health_status': 'excellent'
-        }
-    
-    anomalies = detector.detect_anomalies(equipment_items)
-    
-    # Calculate statistics
-    total = len(anomalies)
-    anomaly_count = sum(1 for a in anomalies if a['is_anomaly'])
-    critical_count = sum(1 for a in anomalies if a['severity'] == 'critical')
-    avg_health = sum(a['health_score'] for a in anomalies) / total
-    
-    # Determine overall status
-    if avg_health >= 90:
-        status = 'excellent'
-    elif avg_health >= 75:
-        status = 'good'
-    elif avg_health >= 60:
-        status = 'fair'
-    elif avg_health >= 40:
-        status = 'poor'
-    else:
-        status = 'critical'
-    
-    return {
-        'overall_health': round(avg_health, 2),
-        'total_equipment': total,
-        'anomalies_detected': anomaly_count,
-        'critical_count': critical_count,
-        'health_status': status,
-        'anomaly_rate': round((anomaly_count / total) * 100, 2) if total > 0 else 0
-    }
+    store = get_cache_store()
+    key = f'health:{anomaly_cache_key(dataset.id, current_detector_version())}'
+    summary = store.get_json('summaries', key)
+    if summary is None:
+        summary = get_anomaly_results(dataset).health_summary()
+        store.set_json('summaries', key, summary, datasets=[dataset.id])
+    return summary
+
+
+def precompute_anomaly_results(dataset_id):
+    """Background entry point: detect and store a new dataset's anomalies"""
+    # Imported here: models are not needed by the detector itself
+    from .models import Dataset
+
+    dataset = Dataset.objects.filter(id=dataset_id).first()
+    if dataset is None:
+        return
+    try:
+        get_anomaly_results(dataset)
+    except Exception:
+        logger.exception('Anomaly detection failed for dataset %s', dataset_id)
@@ -0,0 +1,259 @@
+"""
+Shared on-disk cache for derived dataset artifacts
+Every worker process on the host sees the same entries: payloads are files
+under CACHE_STORE_DIR and a small SQLite index next to them records each
+entry's size, last access and the datasets it was derived from. The index
+enforces a total size budget (least recently used entries are evicted
+first), lets a dataset's entries be dropped when it is deleted, and keeps
+per-namespace hit/miss counters.
+
+Namespaces in use:
+    reports      rendered PDF reports
+    anomalies    AnomalyResults arrays per dataset and detector version
+    summaries    small JSON analytics (health summaries, trends)
+    charts       content-addressed chart PNGs (shared, not tied to a dataset)
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+
+NAMESPACES = ('reports', 'anomalies', 'summaries', 'charts')
+
+INDEX_FILE = 'index.sqlite3'
+
+# After an eviction pass the cache is at most this fraction of the budget,
+# so a full cache does not evict on every write
+EVICT_TO = 0.9
+
+# Last-access times are only rewritten when older than this many seconds
+TOUCH_INTERVAL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+CREATE TABLE IF NOT EXISTS entry_datasets (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    dataset_id INTEGER NOT NULL,
+    PRIMARY KEY (dataset_id, namespace, key)
+);
+CREATE INDEX IF NOT EXISTS entry_datasets_entry ON entry_datasets (namespace, key);
+CREATE TABLE IF NOT EXISTS counters (
+    namespace TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0,
+    misses INTEGER NOT NULL DEFAULT 0,
+    evictions INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+class CacheStore:
+    """File payloads plus a SQLite index shared by every process using root"""
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread (and per process: forked children reconnect)
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            self.root.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.root / INDEX_FILE, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def path(self, namespace, key):
+        """Where an entry's payload lives (whether or not it exists)"""
+        if namespace not in NAMESPACES:
+            raise ValueError(f'Unknown cache namespace: {namespace}')
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return self.root / namespace / digest[:2] / digest
+
+    def _count(self, connection, namespace, column, amount=1):
+        connection.execute(
+            f'INSERT INTO counters (namespace, {column}) VALUES (?, ?) '
+            f'ON CONFLICT (namespace) DO UPDATE SET {column} = {column} + excluded.{column}',
+            (namespace, amount),
+        )
+
+    def contains(self, namespace, key):
+        """Whether an entry exists; does not count as a hit or miss"""
+        row = self._connection().execute(
+            'SELECT 1 FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+        return row is not None and self.path(namespace, key).exists()
+
+    def open(self, namespace, key):
+        """Return an entry's payload opened for binary reading, or None on a miss"""
+        connection = self._connection()
+        row = connection.execute(
+            'SELECT accessed_at FROM entries WHERE namespace = ? AND key = ?', (namespace, key)
+        ).fetchone()
+
+        handle = None
+        if row is not None:
+            try:
+                # An open file stays readable even if the entry is evicted meanwhile
+                handle = open(self.path(namespace, key), 'rb')
+            except FileNotFoundError:
+                # Evicted or invalidated by another process in the meantime
+                self._forget(connection, namespace, key)
+            else:
+                now = time.time()
+                if row[0] < now - TOUCH_INTERVAL:
+                    connection.execute(
+                        'UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?', (now, namespace, key)
+                    )
+
+        self._count(connection, namespace, 'hits' if handle is not None else 'misses')
+        return handle
+
+    def get(self, namespace, key):
+        """Return an entry's bytes, or None on a miss"""
+        handle = self.open(namespace, key)
+        if handle is None:
+            return None
+        with handle:
+            return handle.read()
+
+    def set(self, namespace, key, data, datasets=()):
+        """Store bytes under key, linked to the given dataset ids, and enforce the size budget"""
+        connection = self._connection()
+        path = self.path(namespace, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        now = time.time()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO entries (namespace, key, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (namespace, key, len(data), now, now),
+            )
+            connection.executemany(
+                'INSERT OR IGNORE INTO entry_datasets (namespace, key, dataset_id) VALUES (?, ?, ?)',
+                [(namespace, key, int(dataset_id)) for dataset_id in datasets],
+            )
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        self._evict(connection, keep=(namespace, key))
+        return path
+
+    def get_json(self, namespace, key):
+        data = self.get(namespace, key)
+        return None if data is None else json.loads(data)
+
+    def set_json(self, namespace, key, value, datasets=()):
+        self.set(namespace, key, json.dumps(value, separators=(',', ':')).encode('utf-8'), datasets=datasets)
+
+    def delete(self, namespace, key):
+        self._forget(self._connection(), namespace, key)
+
+    def _forget(self, connection, namespace, key):
+        connection.execute('DELETE FROM entries WHERE namespace = ? AND key = ?', (namespace, key))
+        connection.execute('DELETE FROM entry_datasets WHERE namespace = ? AND key = ?', (namespace, key))
+        self.path(namespace, key).unlink(missing_ok=True)
+
+    def invalidate_dataset(self, dataset_id):
+        """Drop every entry derived from a dataset"""
+        connection = self._connection()
+        rows = connection.execute(
+            'SELECT namespace, key FROM entry_datasets WHERE dataset_id = ?', (int(dataset_id),)
+        ).fetchall()
+        for namespace, key in rows:
+            self._forget(connection, namespace, key)
+        return len(rows)
+
+    def _evict(self, connection, keep=None):
+        """Remove least recently used entries until the cache fits its budget"""
+        total = connection.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        target = self.max_bytes * EVICT_TO
+        evicted = {}
+        for namespace, key, size in connection.execute(
+            'SELECT namespace, key, size FROM entries ORDER BY accessed_at'
+        ).fetchall():
+            if total <= target:
+                break
+            if (namespace, key) == keep:
+                continue
+            self._forget(connection, namespace, key)
+            evicted[namespace] = evicted.get(namespace, 0) + 1
+            total -= size
+
+        for namespace, count in evicted.items():
+            self._count(connection, namespace, 'evictions', count)
+
+    def stats(self):
+        """Per-namespace entry counts, sizes and hit/miss/eviction counters"""
+        connection = self._connection()
+        namespaces = {
+            namespace: {'entries': 0, 'bytes': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+            for namespace in NAMESPACES
+        }
+        for namespace, entries, size in connection.execute(
+            'SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace'
+        ):
+            namespaces[namespace].update(entries=entries, bytes=size)
+        for namespace, hits, misses, evictions in connection.execute(
+            'SELECT namespace, hits, misses, evictions FROM counters'
+        ):
+            namespaces[namespace].update(hits=hits, misses=misses, evictions=evictions)
+
+        for values in namespaces.values():
+            lookups = values['hits'] + values['misses']
+            values['hit_rate'] = round(values['hits'] / lookups, 4) if lookups else None
+        return {
+            'max_bytes': self.max_bytes,
+            'bytes': sum(values['bytes'] for values in namespaces.values()),
+            'namespaces': namespaces,
+        }
+
+    def reset_counters(self):
+        self._connection().execute('DELETE FROM counters')
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_cache_store():
+    """Return the process-wide CacheStore for the configured directory"""
+    global _store
+    root = Path(getattr(settings, 'CACHE_STORE_DIR', Path(settings.MEDIA_ROOT) / 'cache'))
+    max_bytes = getattr(settings, 'CACHE_STORE_MAX_BYTES', 1024 ** 3)
+    with _store_lock:
+        if _store is None or _store.root != root or _store.max_bytes != max_bytes:
+            _store = CacheStore(root, max_bytes)
+        return _store
@@ -0,0 +1,192 @@
+"""
+Server-side chart rendering
+Charts are drawn from small, JSON-able chart data (type counts, histogram
+bins, parameter ranges) and kept in the shared cache store as PNGs addressed
+by a hash of that data plus the chart kind, size and dpi. Reports and the
+/api/datasets/<id>/charts/<kind>.png endpoint share the same images, and
+identical data renders once however many datasets or requests ask for it.
+"""
+import hashlib
+import io
+import json
+import threading
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .cache_store import get_cache_store
+from .column_store import load_columns
+from .dataset_stats import PARAMETERS, get_dataset_statistics
+
+
+# Bump when drawing code changes so cached images are not reused
+CHART_REVISION = 1
+
+HISTOGRAM_BINS = 10
+PARAMETER_COLORS = ('skyblue', 'lightcoral', 'lightgreen')
+
+# Default (width px, height px, dpi) per chart kind
+CHART_SIZES = {
+    'types': (900, 600, 150),
+    'pie': (600, 600, 150),
+    'histograms': (1500, 450, 150),
+    'ranges': (900, 600, 150),
+}
+CHART_KINDS = tuple(CHART_SIZES)
+
+MIN_PIXELS, MAX_PIXELS = 100, 4000
+MIN_DPI, MAX_DPI = 50, 300
+
+
+def chart_data(dataset, kind):
+    """Return the JSON-able data a chart of this kind is drawn from"""
+    statistics = get_dataset_statistics(dataset)
+    if kind in ('types', 'pie'):
+        return {'type_counts': statistics['type_counts']}
+    if kind == 'ranges':
+        return {
+            parameter: [statistics['parameters'][parameter][key] for key in ('mean', 'min', 'max')]
+            for parameter in PARAMETERS
+        }
+    if kind == 'histograms':
+        # Bin once here; the drawing only sees the counts and edges
+        data = {}
+        columns = load_columns(dataset)
+        for parameter, values in columns.parameters().items():
+            counts, edges = np.histogram(values, bins=HISTOGRAM_BINS) if len(values) else ([], [])
+            data[parameter] = {'counts': np.asarray(counts).tolist(), 'edges': np.asarray(edges).tolist()}
+        return data
+    raise ValueError(f'Unknown chart kind: {kind}')
+
+
+def chart_key(kind, data, width, height, dpi):
+    """Content address of one rendered chart"""
+    stamp = json.dumps(
+        {'revision': CHART_REVISION, 'kind': kind, 'size': [width, height, dpi], 'data': data},
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha1(stamp.encode('utf-8')).hexdigest()
+
+
+def validate_size(kind, width=None, height=None, dpi=None):
+    """Fill in the kind's default size and check bounds; raises ValueError"""
+    if kind not in CHART_SIZES:
+        raise ValueError(f'Unknown chart kind: {kind}')
+    default_width, default_height, default_dpi = CHART_SIZES[kind]
+    width = default_width if width is None else int(width)
+    height = default_height if height is None else int(height)
+    dpi = default_dpi if dpi is None else int(dpi)
+    if not (MIN_PIXELS <= width <= MAX_PIXELS and MIN_PIXELS <= height <= MAX_PIXELS):
+        raise ValueError(f'width and height must be between {MIN_PIXELS} and {MAX_PIXELS} pixels')
+    if not MIN_DPI <= dpi <= MAX_DPI:
+        raise ValueError(f'dpi must be between {MIN_DPI} and {MAX_DPI}')
+    return width, height, dpi
+
+
+def dataset_chart(dataset, kind, width=None, height=None, dpi=None):
+    """Return a dataset's chart as PNG bytes, rendering it on a cache miss"""
+    width, height, dpi = validate_size(kind, width, height, dpi)
+    data = chart_data(dataset, kind)
+    return render_chart(kind, data, width, height, dpi)
+
+
+def render_chart(kind, data, width, height, dpi):
+    """Return this chart as PNG bytes from the cache store, drawing it if needed"""
+    store = get_cache_store()
+    key = chart_key(kind, data, width, height, dpi)
+    png = store.get('charts', key)
+    if png is not None:
+        return png
+
+    fig = _figure(width, height, dpi)
+    try:
+        DRAWERS[kind](fig, data)
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.canvas.print_png(buffer)
+    finally:
+        fig.clear()
+
+    png = buffer.getvalue()
+    # Content-addressed and shared by every dataset with the same data, so
+    # not linked to a dataset; the size budget removes unused charts
+    store.set('charts', key, png)
+    return png
+
+
+_figures = threading.local()
+
+
+def _figure(width, height, dpi):
+    """
+    A cleared Figure of the given pixel size, one reused per thread
+    Figures are built with the object-oriented API and an Agg canvas, never
+    through pyplot, so nothing is shared between worker threads. Sizes come
+    from the request, so the one figure is resized rather than kept per size.
+    """
+    fig = getattr(_figures, 'figure', None)
+    if fig is None:
+        fig = _figures.figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+        FigureCanvasAgg(fig)
+    else:
+        fig.set_dpi(dpi)
+        fig.set_size_inches(width / dpi, height / dpi)
+    fig.clear()
+    return fig
+
+
+def _draw_types(fig, data):
+    type_counts = data['type_counts']
+    ax = fig.add_subplot()
+    ax.bar(list(type_counts.keys()), list(type_counts.values()), color='steelblue')
+    ax.set_xlabel('Equipment Type')
+    ax.set_ylabel('Count')
+    ax.set_title('Equipment Type Distribution')
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+
+def _draw_pie(fig, data):
+    type_counts = data['type_counts']
+    ax = fig.add_subplot()
+    if type_counts:
+        ax.pie(list(type_counts.values()), labels=list(type_counts.keys()), autopct='%1.1f%%', startangle=90)
+    ax.set_title('Type Distribution')
+
+
+def _draw_histograms(fig, data):
+    axes = fig.subplots(1, len(PARAMETERS))
+    for ax, parameter, color in zip(axes, PARAMETERS, PARAMETER_COLORS):
+        histogram = data[parameter]
+        if histogram['counts']:
+            edges = np.asarray(histogram['edges'])
+            ax.bar(edges[:-1], histogram['counts'], width=np.diff(edges), align='edge',
+                   color=color, edgecolor='black')
+        ax.set_xlabel(parameter.capitalize())
+        ax.set_ylabel('Frequency')
+        ax.set_title(f'{parameter.capitalize()} Distribution')
+
+
+def _draw_ranges(fig, data):
+    ax = fig.add_subplot()
+    means, mins, maxs = (np.array([data[parameter][i] for parameter in PARAMETERS]) for i in range(3))
+    x = np.arange(len(PARAMETERS))
+    ax.bar(x, means, color='steelblue', label='Average')
+    ax.errorbar(x, means, yerr=[means - mins, maxs - means], fmt='none', color='red', capsize=5,
+                label='Min/Max Range')
+    ax.set_xticks(x)
+    ax.set_xticklabels([parameter.capitalize() for parameter in PARAMETERS])
+    ax.set_ylabel('Value')
+    ax.set_title('Parameter Ranges')
+    ax.legend()
+    ax.grid(True, alpha=0.3)
+
+
+DRAWERS = {
+    'types': _draw_types,
+    'pie': _draw_pie,
+    'histograms': _draw_histograms,
+    'ranges': _draw_ranges,
+}
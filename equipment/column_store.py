@@ -0,0 +1,260 @@
+"""
+Columnar per-dataset array store
+Keeps a memory-mappable NumPy copy of each dataset's columns under MEDIA_ROOT so
+analytics can skip building one Django model instance per equipment row.
+The Equipment table stays the source of truth; a missing store is rebuilt from it.
+
+Layout of COLUMN_STORE_DIR/<dataset_id>/:
+    id.npy, flowrate.npy, pressure.npy, temperature.npy   one value per row
+    type_code.npy                                         index into meta['types']
+    name_offsets.npy, name_bytes.npy                      UTF-8 names, offsets has n + 1 entries
+    meta.json                                             row count, type labels, format version
+"""
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .dataset_stats import PARAMETERS
+from .models import Dataset
+
+
+FORMAT_VERSION = 1
+
+ROW_COLUMNS = {
+    'id': np.int64,
+    'flowrate': np.float64,
+    'pressure': np.float64,
+    'temperature': np.float64,
+    'type_code': np.int32,
+}
+
+
+class ColumnStoreNotReady(RuntimeError):
+    """The dataset's store is missing because its upload is still writing it"""
+
+
+def store_root():
+    return Path(getattr(settings, 'COLUMN_STORE_DIR', Path(settings.MEDIA_ROOT) / 'columns'))
+
+
+def dataset_dir(dataset_id):
+    return store_root() / str(dataset_id)
+
+
+class ColumnStoreWriter:
+    """
+    Append typed column chunks for one dataset, then publish them atomically
+
+    Chunks are appended to raw files in a temporary directory; finalize()
+    converts them to .npy and renames the directory into place. Each writer
+    has its own temporary directory, so concurrent writers never share files.
+    """
+
+    def __init__(self, dataset_id):
+        self.dataset_id = dataset_id
+        self.directory = dataset_dir(dataset_id)
+
+        store_root().mkdir(parents=True, exist_ok=True)
+        self.tmp_directory = Path(tempfile.mkdtemp(dir=store_root(), prefix=f'{dataset_id}.', suffix='.tmp'))
+
+        self.rows = 0
+        self.name_bytes = 0
+        self.types = {}
+        self.files = {
+            name: open(self.tmp_directory / f'{name}.raw', 'wb')
+            for name in list(ROW_COLUMNS) + ['name_offsets', 'name_bytes']
+        }
+        np.zeros(1, dtype=np.int64).tofile(self.files['name_offsets'])
+
+    def append(self, columns):
+        """
+        Append one chunk
+        columns holds 'id', 'name', 'type' and one float array per parameter
+        """
+        if not len(columns['id']):
+            return
+
+        codes = np.array([self.types.setdefault(t, len(self.types)) for t in columns['type'].tolist()], dtype=np.int32)
+        chunk = dict(columns, type_code=codes)
+        for name, dtype in ROW_COLUMNS.items():
+            np.asarray(chunk[name], dtype=dtype).tofile(self.files[name])
+
+        encoded = [name.encode('utf-8') for name in columns['name'].tolist()]
+        lengths = np.fromiter((len(value) for value in encoded), dtype=np.int64, count=len(encoded))
+        (self.name_bytes + np.cumsum(lengths)).tofile(self.files['name_offsets'])
+        self.files['name_bytes'].write(b''.join(encoded))
+
+        self.rows += len(encoded)
+        self.name_bytes += int(lengths.sum())
+
+    def finalize(self):
+        """Convert raw files to .npy, publish the directory and return a reader"""
+        for handle in self.files.values():
+            handle.close()
+
+        for name, dtype in list(ROW_COLUMNS.items()) + [('name_offsets', np.int64), ('name_bytes', np.uint8)]:
+            raw_path = self.tmp_directory / f'{name}.raw'
+            if raw_path.stat().st_size:
+                raw = np.memmap(raw_path, dtype=dtype, mode='r')
+            else:
+                raw = np.empty(0, dtype=dtype)
+            np.save(self.tmp_directory / f'{name}.npy', raw)
+            del raw
+            raw_path.unlink()
+
+        meta = {
+            'format': FORMAT_VERSION,
+            'rows': self.rows,
+            'types': list(self.types),
+        }
+        with open(self.tmp_directory / 'meta.json', 'w') as f:
+            json.dump(meta, f)
+
+        shutil.rmtree(self.directory, ignore_errors=True)
+        try:
+            os.replace(self.tmp_directory, self.directory)
+        except OSError:
+            # Another writer published the same rows in between; keep theirs
+            if not (self.directory / 'meta.json').exists():
+                raise
+            shutil.rmtree(self.tmp_directory, ignore_errors=True)
+        return DatasetColumns(self.directory)
+
+    def abort(self):
+        """Discard everything written so far"""
+        for handle in self.files.values():
+            handle.close()
+        shutil.rmtree(self.tmp_directory, ignore_errors=True)
+
+
+class DatasetColumns:
+    """Read-only, memory-mapped view of one dataset's columns"""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / 'meta.json') as f:
+            self.meta = json.load(f)
+
+        self.type_labels = self.meta['types']
+        for name in list(ROW_COLUMNS) + ['name_offsets', 'name_bytes']:
+            setattr(self, name, self._load(name))
+
+    def _load(self, name):
+        path = self.directory / f'{name}.npy'
+        try:
+            return np.load(path, mmap_mode='r')
+        except ValueError:
+            # Zero-length arrays cannot be memory-mapped
+            return np.load(path)
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def names(self, indices=None):
+        """Return equipment names as a list, optionally for selected row indices"""
+        if indices is not None and len(indices) * 8 < len(self):
+            # A few rows: slice them out of the mapped arrays without reading the rest
+            indices = np.asarray(indices)
+            starts = self.name_offsets[indices].tolist()
+            ends = self.name_offsets[indices + 1].tolist()
+            return [bytes(self.name_bytes[start:end]).decode('utf-8') for start, end in zip(starts, ends)]
+
+        offsets = self.name_offsets.tolist()
+        blob = bytes(self.name_bytes)
+        if indices is None:
+            indices = range(len(self))
+        else:
+            indices = np.asarray(indices).tolist()
+
+        text = blob.decode('utf-8')
+        if len(text) == len(blob):
+            # ASCII-only names: byte offsets are character offsets
+            return [text[offsets[i]:offsets[i + 1]] for i in indices]
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in indices]
+
+    def types(self, indices=None):
+        """Return equipment types as an object array"""
+        codes = self.type_code if indices is None else self.type_code[indices]
+        return np.array(self.type_labels, dtype=object)[codes]
+
+    def name_order(self):
+        """Row indices sorted by name (ties by id), matching Equipment.Meta.ordering"""
+        return np.argsort(np.array(self.names()), kind='stable')
+
+    def parameters(self):
+        """Return {parameter: array} for the numeric columns"""
+        return {parameter: getattr(self, parameter) for parameter in PARAMETERS}
+
+    def type_counts(self):
+        """Return {type label: count}"""
+        counts = np.bincount(self.type_code, minlength=len(self.type_labels))
+        return {label: int(count) for label, count in zip(self.type_labels, counts.tolist())}
+
+    def to_frame(self, indices=None):
+        """Return the numeric columns as a DataFrame"""
+        return pd.DataFrame({
+            parameter: np.asarray(values if indices is None else values[indices])
+            for parameter, values in self.parameters().items()
+        })
+
+
+def build_from_database(dataset, chunk_size=10000):
+    """Rebuild a dataset's column store from its Equipment rows (no model instances)"""
+    writer = ColumnStoreWriter(dataset.id)
+    try:
+        queryset = dataset.equipment_items.order_by('id').values_list('id', 'name', 'type', *PARAMETERS)
+        rows = []
+        for row in queryset.iterator(chunk_size=chunk_size):
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                writer.append(_rows_to_columns(rows))
+                rows = []
+        writer.append(_rows_to_columns(rows))
+    except Exception:
+        writer.abort()
+        raise
+    return writer.finalize()
+
+
+def _rows_to_columns(rows):
+    ids, names, types, *values = zip(*rows) if rows else ([], [], [], [], [], [])
+    columns = {
+        'id': np.array(ids, dtype=np.int64),
+        'name': np.array(names, dtype=object),
+        'type': np.array(types, dtype=object),
+    }
+    for parameter, column in zip(PARAMETERS, values):
+        columns[parameter] = np.array(column, dtype=np.float64)
+    return columns
+
+
+def load_columns(dataset):
+    """
+    Return the dataset's column store, rebuilding it from the database if missing
+    Raises ColumnStoreNotReady while the dataset's upload is still running:
+    its rows are incomplete and the ingest publishes the store itself.
+    """
+    directory = dataset_dir(dataset.id)
+    try:
+        columns = DatasetColumns(directory)
+        if columns.meta.get('format') == FORMAT_VERSION:
+            return columns
+    except FileNotFoundError:
+        pass
+
+    if Dataset.objects.filter(pk=dataset.pk, status='processing').exists():
+        raise ColumnStoreNotReady(f'Dataset {dataset.pk} is still being uploaded')
+    return build_from_database(dataset)
+
+
+def delete_columns(dataset_id):
+    """Remove a dataset's column store and any unfinished writes for it"""
+    shutil.rmtree(dataset_dir(dataset_id), ignore_errors=True)
+    for tmp_directory in store_root().glob(f'{dataset_id}.*.tmp'):
+        shutil.rmtree(tmp_directory, ignore_errors=True)
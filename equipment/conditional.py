@@ -0,0 +1,70 @@
+"""
+Conditional GET for dataset endpoints
+Datasets never change once their upload has finished, so a response is fully
+identified by the dataset's id and upload_date plus the exact representation
+requested. Datasets still being uploaded get no validators at all. The
+validators are checked against a small primary-key lookup, before the view
+does any real ORM, file or ML work.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Dataset
+
+
+def dataset_etag(request, dataset_id, upload_date, version=''):
+    """Strong ETag for one representation of a finished dataset resource"""
+    key = '|'.join([
+        str(dataset_id),
+        upload_date.isoformat(),
+        # Tags only completed uploads; also retires tags issued mid-ingest
+        'ready',
+        version,
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return '"%s"' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def conditional_dataset_view(version_func=None):
+    """
+    Decorate a detail-route view method with ETag / Last-Modified handling
+
+    version_func() may return a stamp for anything else the response depends
+    on (e.g. the anomaly detector version); it becomes part of the ETag.
+    Only 200 responses are tagged, so 202/404 answers are never revalidated.
+    """
+    def decorator(view_method):
+        @wraps(view_method)
+        def wrapper(self, request, pk=None, *args, **kwargs):
+            upload_date = Dataset.objects.filter(pk=pk, status='ready').values_list('upload_date', flat=True).first()
+            if upload_date is None:
+                # Missing or still uploading: let the view produce its usual 404
+                return view_method(self, request, pk, *args, **kwargs)
+
+            etag = dataset_etag(request, pk, upload_date, version_func() if version_func else '')
+            last_modified = int(upload_date.timestamp())
+
+            # When the response also depends on version_func, If-Modified-Since
+            # alone cannot prove freshness; only the ETag is trusted
+            not_modified = get_conditional_response(
+                request, etag=etag, last_modified=None if version_func else last_modified
+            )
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                not_modified['Last-Modified'] = http_date(last_modified)
+                return not_modified
+
+            response = view_method(self, request, pk, *args, **kwargs)
+            if response.status_code == 200:
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+                # Cacheable by the client, but always revalidated
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Accept'])
+            return response
+        return wrapper
+    return decorator
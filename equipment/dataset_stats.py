@@ -0,0 +1,85 @@
+"""
+Single-pass statistics engine for equipment datasets
+Computes every aggregate used by the summary, health checks and reports once per dataset
+"""
+import numpy as np
+
+
+PARAMETERS = ('flowrate', 'pressure', 'temperature')
+
+# np.quantile positions returned per parameter, in order
+QUANTILES = (0.0, 0.25, 0.5, 0.75, 1.0)
+QUANTILE_NAMES = ('min', 'q1', 'median', 'q3', 'max')
+
+
+def compute_statistics(parameters, type_counts):
+    """
+    Compute dataset statistics in one vectorized pass per column
+
+    parameters maps each entry in PARAMETERS to a 1-D float array (memory-mapped
+    arrays from the column store work as-is). Standard deviation is the
+    population value (ddof=0), matching the z-score and scaler conventions
+    used by anomaly detection.
+    """
+    count = len(parameters[PARAMETERS[0]])
+
+    stats_by_parameter = {}
+    for parameter in PARAMETERS:
+        if count:
+            values = np.asarray(parameters[parameter], dtype=np.float64)
+            stats = {'mean': float(values.mean()), 'std': float(values.std())}
+            quantiles = np.quantile(values, QUANTILES).tolist()
+            stats.update(zip(QUANTILE_NAMES, quantiles))
+        else:
+            stats = dict.fromkeys(('mean', 'std') + QUANTILE_NAMES, 0.0)
+        stats_by_parameter[parameter] = stats
+
+    # Most common types first, matching pandas value_counts ordering
+    type_counts = dict(sorted(type_counts.items(), key=lambda item: item[1], reverse=True))
+
+    return {
+        'count': count,
+        'parameters': stats_by_parameter,
+        'type_counts': type_counts,
+    }
+
+
+def summary_from_statistics(statistics):
+    """Build the Dataset summary dict (legacy keys plus full statistics)"""
+    parameters = statistics['parameters']
+    summary = {'total_count': statistics['count']}
+
+    for parameter in PARAMETERS:
+        summary[f'avg_{parameter}'] = parameters[parameter]['mean']
+
+    for parameter in PARAMETERS:
+        summary[f'min_{parameter}'] = parameters[parameter]['min']
+        summary[f'max_{parameter}'] = parameters[parameter]['max']
+
+    summary['type_distribution'] = statistics['type_counts']
+    summary['statistics'] = statistics
+    return summary
+
+
+def statistics_from_columns(columns):
+    """Compute statistics from a dataset's column store"""
+    return compute_statistics(columns.parameters(), columns.type_counts())
+
+
+def get_dataset_statistics(dataset):
+    """
+    Return the stored statistics for a dataset
+    Datasets uploaded before statistics were stored are backfilled once
+    """
+    summary = dataset.get_summary()
+    if 'statistics' in summary:
+        return summary['statistics']
+
+    # Imported here: the column store itself depends on PARAMETERS above
+    from .column_store import load_columns
+
+    statistics = statistics_from_columns(load_columns(dataset))
+    summary['statistics'] = statistics
+    dataset.set_summary(summary)
+    dataset.save(update_fields=['summary_json'])
+    return statistics
@@ -0,0 +1,163 @@
+"""
+Streaming CSV ingestion for equipment datasets
+Reads uploads in bounded chunks so worker memory stays flat regardless of file size
+"""
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from .column_store import ColumnStoreWriter, build_from_database
+from .dataset_stats import statistics_from_columns, summary_from_statistics
+from .models import Equipment
+
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+NUMERIC_COLUMNS = {
+    'flowrate': 'Flowrate',
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+}
+
+
+class IngestError(ValueError):
+    """Raised when an uploaded CSV cannot be ingested"""
+
+
+def check_columns(columns):
+    """Raise IngestError if any required column is missing"""
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing_columns:
+        raise IngestError(f'Missing required columns: {", ".join(missing_columns)}')
+
+
+def validate_csv_header(csv_file):
+    """Check the header of an upload without parsing its rows, then rewind it"""
+    try:
+        columns = pd.read_csv(csv_file, nrows=0).columns
+    except pd.errors.EmptyDataError:
+        raise IngestError('The uploaded file is empty')
+    csv_file.seek(0)
+    check_columns(columns)
+
+
+class CSVIngestor:
+    """
+    Stream a CSV upload into Equipment rows
+
+    The header and first chunk are read up front so column validation can
+    fail fast before any Dataset row is created.
+    """
+
+    def __init__(self, csv_file, chunk_size=None, batch_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'CSV_INGEST_CHUNK_SIZE', 10000)
+        self.batch_size = batch_size or getattr(settings, 'CSV_INGEST_BATCH_SIZE', 2000)
+
+        try:
+            self.reader = pd.read_csv(csv_file, chunksize=self.chunk_size)
+        except pd.errors.EmptyDataError:
+            raise IngestError('The uploaded file is empty')
+        self.first_chunk = next(self.reader, None)
+
+        check_columns(self.first_chunk.columns if self.first_chunk is not None else [])
+
+    def chunks(self):
+        """Yield parsed chunks, starting with the one read during validation"""
+        if self.first_chunk is not None:
+            yield self.first_chunk
+            self.first_chunk = None
+
+        yield from self.reader
+
+    def parse_chunk(self, chunk):
+        """
+        Convert and validate a chunk column by column
+        Returns a dict of NumPy arrays keyed by Equipment field name
+        """
+        # Line numbers in the file: header is line 1 and the index is global
+        line_numbers = chunk.index.to_numpy() + 2
+
+        columns = {}
+        for field, column in (('name', 'Equipment Name'), ('type', 'Type')):
+            values = chunk[column]
+            missing = values.isna().to_numpy()
+            if missing.any():
+                raise IngestError(self._format_invalid(column, line_numbers[missing]))
+            columns[field] = values.astype(str).to_numpy()
+
+        for field, column in NUMERIC_COLUMNS.items():
+            values = pd.to_numeric(chunk[column], errors='coerce').to_numpy(dtype=np.float64)
+            invalid = ~np.isfinite(values)
+            if invalid.any():
+                raise IngestError(self._format_invalid(column, line_numbers[invalid]))
+            columns[field] = values
+
+        return columns
+
+    def _format_invalid(self, column, lines, limit=5):
+        shown = ', '.join(str(line) for line in lines[:limit].tolist())
+        if len(lines) > limit:
+            shown += f' and {len(lines) - limit} more'
+        return f'Invalid or missing {column} value on line(s) {shown}'
+
+    def build_equipment(self, dataset, columns):
+        """Build unsaved Equipment instances from typed column arrays"""
+        dataset_id = dataset.id
+        return [
+            Equipment(
+                dataset_id=dataset_id,
+                name=name,
+                type=equipment_type,
+                flowrate=flowrate,
+                pressure=pressure,
+                temperature=temperature
+            )
+            for name, equipment_type, flowrate, pressure, temperature in zip(
+                columns['name'].tolist(),
+                columns['type'].tolist(),
+                columns['flowrate'].tolist(),
+                columns['pressure'].tolist(),
+                columns['temperature'].tolist(),
+            )
+        ]
+
+    def ingest(self, dataset, progress_callback=None):
+        """
+        Insert every chunk for the dataset and return its summary
+
+        Only one chunk of rows is held in memory at a time: each chunk is
+        inserted and appended to the dataset's column store, and statistics
+        are computed from the memory-mapped store at the end. progress_callback,
+        if given, is called with the running row count after each chunk.
+        """
+        writer = ColumnStoreWriter(dataset.id)
+        rows_processed = 0
+        have_ids = True
+
+        try:
+            for chunk in self.chunks():
+                columns = self.parse_chunk(chunk)
+                equipment_list = self.build_equipment(dataset, columns)
+                # Each chunk commits on its own (bulk_create is atomic), so the
+                # database write lock is taken per chunk and other writers,
+                # such as a second upload or job progress updates, interleave
+                Equipment.objects.bulk_create(equipment_list, batch_size=self.batch_size)
+
+                # Backends without RETURNING leave pks unset; rebuild from the DB below
+                columns['id'] = np.array([equipment.pk or 0 for equipment in equipment_list], dtype=np.int64)
+                have_ids = have_ids and all(equipment.pk for equipment in equipment_list)
+                writer.append(columns)
+
+                rows_processed += len(equipment_list)
+                if progress_callback:
+                    progress_callback(rows_processed)
+        except Exception:
+            writer.abort()
+            raise
+
+        if have_ids:
+            columns = writer.finalize()
+        else:
+            writer.abort()
+            columns = build_from_database(dataset)
+
+        return summary_from_statistics(statistics_from_columns(columns))
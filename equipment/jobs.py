@@ -0,0 +1,109 @@
+"""
+Background job runner
+A process-local thread pool for work that should not hold an HTTP worker
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from .models import Job
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the shared executor, creating it on first use"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'BACKGROUND_JOB_WORKERS', 2),
+                thread_name_prefix='equipment-jobs',
+            )
+        return _executor
+
+
+def _run_and_close_connections(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    finally:
+        # Worker threads get their own DB connections; don't leak them
+        connections.close_all()
+
+
+def submit(func, *args, **kwargs):
+    """Run func(*args, **kwargs) on a background worker and return its Future"""
+    return get_executor().submit(_run_and_close_connections, func, args, kwargs)
+
+
+_coalesced_lock = threading.Lock()
+_coalesced_state = {}
+
+
+def submit_coalesced(key, func):
+    """
+    Run func() on a background worker unless a run for key is already queued
+
+    A call that arrives while a run is in flight makes that run repeat once
+    more when it finishes, so work queued meanwhile is never missed.
+    """
+    with _coalesced_lock:
+        if key in _coalesced_state:
+            _coalesced_state[key] = True
+            return None
+        _coalesced_state[key] = False
+
+    def run():
+        while True:
+            func()
+            with _coalesced_lock:
+                if not _coalesced_state[key]:
+                    del _coalesced_state[key]
+                    return
+                _coalesced_state[key] = False
+
+    return submit(run)
+
+
+def stale_job_cutoff():
+    """Jobs that have not recorded progress since this time are considered dead"""
+    return timezone.now() - timedelta(seconds=getattr(settings, 'JOB_STALE_SECONDS', 900))
+
+
+def stale_jobs():
+    """Pending or running jobs that have not recorded progress within JOB_STALE_SECONDS"""
+    return Job.objects.filter(status__in=['pending', 'running'], heartbeat_at__lt=stale_job_cutoff())
+
+
+def reap_stale_jobs(**filters):
+    """
+    Mark stale jobs matching filters as failed and return how many there were
+
+    The worker pool lives inside the server process, so jobs that were queued
+    or running when it stopped would otherwise stay unfinished forever.
+    """
+    stale = stale_jobs().filter(**filters)
+    # Checked first so the common case, polling a live job, stays read-only
+    if not stale.exists():
+        return 0
+    return stale.update(
+        status='failed', error='The job stopped responding and was abandoned', finished_at=timezone.now()
+    )
+
+
+def start_job(job_id, **fields):
+    """
+    Move a pending job to running and return it, or None if it was reaped meanwhile
+    The status filter keeps a job that was given up on from starting late.
+    """
+    now = timezone.now()
+    started = Job.objects.filter(id=job_id, status='pending').update(
+        status='running', started_at=now, heartbeat_at=now, **fields
+    )
+    if not started:
+        return None
+    return Job.objects.select_related('dataset', 'created_by').get(id=job_id)
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from equipment.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = 'Delete datasets outside the retention window and report what was reclaimed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', type=int, default=None,
+                            help='Number of newest datasets to keep (default: DATASET_RETENTION_KEEP_LATEST)')
+        parser.add_argument('--max-age-days', type=int, default=None,
+                            help='Delete datasets older than this (default: DATASET_RETENTION_MAX_AGE_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Datasets deleted per transaction (default: DATASET_RETENTION_BATCH_SIZE)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report what would be deleted')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running, applying retention every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            result = apply_retention(
+                keep_latest=options['keep'],
+                max_age_days=options['max_age_days'],
+                batch_size=options['batch_size'],
+                dry_run=options['dry_run'],
+            )
+
+            verb = 'Would remove' if result['dry_run'] else 'Removed'
+            self.stdout.write(self.style.SUCCESS(
+                f"{verb} {result['datasets']} datasets, {result['equipment']} equipment rows "
+                f"and {result['alerts']} alerts in {result['seconds']:.3f}s"
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,120 @@
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from equipment.models import Dataset, Equipment, AlertRule, AlertHistory
+from equipment.pagination import KeysetPagination
+from equipment.views import AlertHistoryViewSet
+
+
+SEVERITIES = ['low', 'medium', 'high', 'critical']
+
+
+class Command(BaseCommand):
+    help = ('Benchmark alert history page latency at increasing depth: keyset cursor vs OFFSET. '
+            'Rows are inserted inside a transaction that is rolled back afterwards.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000,
+                            help='Alert rows to generate (default: 1000000)')
+        parser.add_argument('--page-size', type=int, default=50,
+                            help='Rows per page (default: 50)')
+        parser.add_argument('--repeat', type=int, default=5,
+                            help='Requests timed per depth; the median is reported (default: 5)')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            self._populate(rows)
+            self._benchmark(rows, options['page_size'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _populate(self, rows):
+        started = time.perf_counter()
+        dataset = Dataset.objects.create(file_name='benchmark.csv')
+        equipment = Equipment.objects.bulk_create([
+            Equipment(dataset=dataset, name=f'Unit-{i}', type='Pump', flowrate=100.0, pressure=20.0, temperature=150.0)
+            for i in range(1000)
+        ])
+        rule = AlertRule.objects.create(name='benchmark', parameter='temperature', condition='greater_than', threshold=100)
+
+        rng = np.random.default_rng(0)
+        now = timezone.now()
+        table = AlertHistory._meta.db_table
+        sql = (
+            f'INSERT INTO {table} (equipment_id, rule_id, parameter, value, threshold, message, severity, '
+            f'email_sent, telegram_sent, acknowledged, created_at) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)'
+        )
+        equipment_ids = np.array([item.id for item in equipment])
+        batch_size = 50000
+        with connection.cursor() as cursor:
+            for start in range(0, rows, batch_size):
+                count = min(batch_size, rows - start)
+                # A minute apart, newest first; a few share a timestamp to exercise the id tie-breaker
+                offsets = (np.arange(start, start + count) // 3).tolist()
+                cursor.executemany(sql, [
+                    (int(equipment_id), rule.id, 'temperature', 150.0, 100.0, 'benchmark alert', severity,
+                     False, False, bool(acknowledged), now - timedelta(minutes=offset))
+                    for equipment_id, severity, acknowledged, offset in zip(
+                        rng.choice(equipment_ids, count).tolist(),
+                        rng.choice(SEVERITIES, count).tolist(),
+                        (rng.random(count) < 0.5).tolist(),
+                        offsets,
+                    )
+                ])
+        self.stdout.write(f'Inserted {rows:,} alerts in {time.perf_counter() - started:.1f}s')
+
+    def _benchmark(self, rows, page_size, repeat):
+        factory = APIRequestFactory()
+        view = AlertHistoryViewSet.as_view({'get': 'list'})
+        user = User(id=0, username='benchmark')
+
+        def timed_get(params):
+            request = factory.get('/api/alert-history/', params, HTTP_HOST='localhost')
+            force_authenticate(request, user=user)
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                response = view(request)
+                response.render()
+                timings.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.content[:200]
+            return float(np.median(timings)) * 1000
+
+        depths = [0] + [depth for depth in (10000, 100000, 500000, rows - page_size) if 0 < depth < rows]
+        paginator = KeysetPagination()
+        filters = [('all alerts', {}, AlertHistory.objects.all()),
+                   ('high, unacknowledged', {'severity': 'high', 'acknowledged': 'false'},
+                    AlertHistory.objects.filter(severity='high', acknowledged=False))]
+
+        self.stdout.write(f'{"filter":>22} {"depth":>10} {"keyset ms":>10} {"offset ms":>10}')
+        for label, params, queryset in filters:
+            total = queryset.count()
+            for depth in depths:
+                if depth >= total:
+                    continue
+
+                # Cursor pointing just before row `depth` (found untimed)
+                cursor_params = dict(params, limit=page_size)
+                if depth:
+                    previous = queryset.order_by('-created_at', '-id')[depth - 1]
+                    cursor_params['cursor'] = paginator.encode_cursor(previous)
+                keyset_ms = timed_get(cursor_params)
+
+                offset_ms = self._time_offset(queryset, depth, page_size, repeat)
+                self.stdout.write(f'{label:>22} {depth:>10,} {keyset_ms:>10.2f} {offset_ms:>10.2f}')
+
+    def _time_offset(self, queryset, depth, page_size, repeat):
+        """The old style: ORDER BY ... LIMIT/OFFSET (query only, no serialization)"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            list(queryset.order_by('-created_at', '-id')[depth:depth + page_size])
+            timings.append(time.perf_counter() - started)
+        return float(np.median(timings)) * 1000
@@ -0,0 +1,147 @@
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import Avg, Count
+
+from equipment.models import Dataset, Equipment
+
+from .benchmark_ingest import EQUIPMENT_TYPES
+
+
+def run_workload(alias, writers=4, readers=4, rows=20000, chunk_size=2000):
+    """
+    Run parallel writers, readers and read-then-write updaters against one database alias
+
+    Writers insert rows chunk by chunk in their own transactions, as upload
+    ingestion does. Readers repeat the dataset list and a per-type aggregate
+    until every writer is done. One updater reads and then writes inside a
+    transaction, which is the pattern a deferred BEGIN cannot upgrade under
+    contention. Operations failing with a lock error are retried; returns
+    counts, timings and the OperationalErrors raised.
+    """
+    datasets = [Dataset.objects.using(alias).create(file_name=f'concurrency-{i}.csv') for i in range(writers)]
+    errors = []
+    counts = {'rows': 0, 'reads': 0, 'updates': 0}
+    counts_lock = threading.Lock()
+    writers_done = threading.Event()
+
+    def record(key, amount=1):
+        with counts_lock:
+            counts[key] += amount
+
+    def attempt(func, *args):
+        """Run one operation, retrying it after each lock error as a client would"""
+        while True:
+            try:
+                return func(*args)
+            except OperationalError as e:
+                errors.append(e)
+
+    def worker(func):
+        def run(*args):
+            try:
+                func(*args)
+            finally:
+                connections[alias].close()
+        return run
+
+    def insert(batch):
+        with transaction.atomic(using=alias):
+            Equipment.objects.using(alias).bulk_create(batch)
+
+    @worker
+    def write(dataset):
+        for start in range(0, rows, chunk_size):
+            batch = [
+                Equipment(dataset=dataset, name=f'Unit-{i}', type=EQUIPMENT_TYPES[i % len(EQUIPMENT_TYPES)],
+                          flowrate=100.0, pressure=20.0, temperature=150.0)
+                for i in range(start, min(start + chunk_size, rows))
+            ]
+            attempt(insert, batch)
+            record('rows', len(batch))
+
+    def list_and_aggregate():
+        list(Dataset.objects.using(alias).annotate(equipment_count=Count('equipment_items'))[:5])
+        list(Equipment.objects.using(alias).values('type').annotate(n=Count('id'), avg=Avg('temperature')))
+
+    @worker
+    def read():
+        while not writers_done.is_set():
+            attempt(list_and_aggregate)
+            record('reads')
+
+    def count_and_update():
+        with transaction.atomic(using=alias):
+            count = Equipment.objects.using(alias).filter(dataset=datasets[0]).count()
+            Dataset.objects.using(alias).filter(id=datasets[0].id).update(summary_json=f'{{"count": {count}}}')
+
+    @worker
+    def update():
+        while not writers_done.is_set():
+            attempt(count_and_update)
+            record('updates')
+
+    write_threads = [threading.Thread(target=write, args=(dataset,)) for dataset in datasets]
+    other_threads = [threading.Thread(target=read) for _ in range(readers)] + [threading.Thread(target=update)]
+
+    started = time.perf_counter()
+    for thread in write_threads + other_threads:
+        thread.start()
+    for thread in write_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    writers_done.set()
+    for thread in other_threads:
+        thread.join()
+
+    return dict(counts, elapsed=elapsed, errors=errors)
+
+
+class Command(BaseCommand):
+    help = ('Compare parallel ingest writes and analytics reads on the stock sqlite3 backend '
+            'and on the configured default database settings, each on a fresh temporary database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='Concurrent ingest writers (default: 4)')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent readers (default: 4)')
+        parser.add_argument('--rows', type=int, default=20000, help='Rows inserted per writer (default: 20000)')
+
+    def handle(self, *args, **options):
+        configured = settings.DATABASES['default']
+        configs = [
+            ('stock sqlite3', {'ENGINE': 'django.db.backends.sqlite3'}),
+            ('configured', {key: configured[key] for key in ('ENGINE', 'OPTIONS', 'CONN_MAX_AGE') if key in configured}),
+        ]
+
+        self.stdout.write(f'{"database":>14} {"seconds":>8} {"rows/s":>10} {"reads/s":>8} '
+                          f'{"updates/s":>9} {"lock errors":>11}')
+        for index, (label, config) in enumerate(configs):
+            directory = Path(tempfile.mkdtemp())
+            alias = f'benchmark_{index}'
+            connections.settings[alias] = connections.configure_settings(
+                {'default': configured, alias: dict(config, NAME=str(directory / 'db.sqlite3'))}
+            )[alias]
+            try:
+                call_command('migrate', database=alias, verbosity=0)
+                connections[alias].close()
+                result = run_workload(alias, options['writers'], options['readers'], options['rows'])
+            finally:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+                shutil.rmtree(directory, ignore_errors=True)
+
+            elapsed = result['elapsed']
+            self.stdout.write(
+                f'{label:>14} {elapsed:>8.2f} {result["rows"] / elapsed:>10,.0f} {result["reads"] / elapsed:>8.1f} '
+                f'{result["updates"] / elapsed:>9.1f} {len(result["errors"]):>11}'
+            )
+            for error in sorted({str(error) for error in result['errors']}):
+                self.stdout.write(f'{"":>14} {error}')
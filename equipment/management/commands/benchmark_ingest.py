@@ -0,0 +1,82 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from equipment.ingest import CSVIngestor
+from equipment.models import Dataset, Equipment
+
+
+EQUIPMENT_TYPES = ['Reactor', 'Heat Exchanger', 'Pump', 'Distillation Column', 'Compressor', 'Mixer', 'Separator']
+
+
+def build_sample_csv(rows, seed=42):
+    """Build an in-memory CSV with the upload column layout"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Equipment Name': [f'Unit-{i}' for i in range(rows)],
+        'Type': rng.choice(EQUIPMENT_TYPES, size=rows),
+        'Flowrate': rng.normal(180, 30, size=rows).round(2),
+        'Pressure': rng.normal(25, 5, size=rows).round(2),
+        'Temperature': rng.normal(125, 25, size=rows).round(2),
+    })
+    buffer = io.BytesIO()
+    df.to_csv(buffer, index=False)
+    return buffer.getvalue()
+
+
+def legacy_build_equipment(dataset, chunk):
+    """The original per-row construction, kept as the benchmark baseline"""
+    equipment_list = []
+    for _, row in chunk.iterrows():
+        equipment = Equipment(
+            dataset=dataset,
+            name=row['Equipment Name'],
+            type=row['Type'],
+            flowrate=float(row['Flowrate']),
+            pressure=float(row['Pressure']),
+            temperature=float(row['Temperature'])
+        )
+        equipment_list.append(equipment)
+    return equipment_list
+
+
+class Command(BaseCommand):
+    help = 'Benchmark Equipment row construction: legacy iterrows vs vectorized column parsing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000],
+                            help='Row counts to benchmark (default: 100000 1000000)')
+        parser.add_argument('--skip-legacy', action='store_true',
+                            help='Only time the vectorized path')
+
+    def handle(self, *args, **options):
+        # Unsaved dataset: construction is timed without touching the database
+        dataset = Dataset(id=0, file_name='benchmark.csv')
+
+        self.stdout.write(f'{"rows":>10} {"mode":>12} {"seconds":>10} {"rows/sec":>14}')
+        for rows in options['rows']:
+            payload = build_sample_csv(rows)
+
+            if not options['skip_legacy']:
+                elapsed = self._time(payload, lambda ingestor, chunk: legacy_build_equipment(dataset, chunk))
+                self._report(rows, 'iterrows', elapsed)
+
+            elapsed = self._time(
+                payload,
+                lambda ingestor, chunk: ingestor.build_equipment(dataset, ingestor.parse_chunk(chunk))
+            )
+            self._report(rows, 'vectorized', elapsed)
+
+    def _time(self, payload, build):
+        ingestor = CSVIngestor(io.BytesIO(payload))
+        built = 0
+        start = time.perf_counter()
+        for chunk in ingestor.chunks():
+            built += len(build(ingestor, chunk))
+        return time.perf_counter() - start
+
+    def _report(self, rows, mode, elapsed):
+        self.stdout.write(f'{rows:>10} {mode:>12} {elapsed:>10.2f} {rows / elapsed:>14,.0f}')
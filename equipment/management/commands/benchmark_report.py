@@ -0,0 +1,134 @@
+import io
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test.utils import override_settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle
+
+from equipment.anomaly_detection import get_anomaly_results
+from equipment.column_store import ColumnStoreWriter
+from equipment.dataset_stats import statistics_from_columns, summary_from_statistics
+from equipment.models import Dataset
+from equipment.reports import EQUIPMENT_HEADER, _equipment_listing, build_report_pdf
+
+from .benchmark_ingest import EQUIPMENT_TYPES
+
+
+def legacy_equipment_table(columns):
+    """The original single Table with full grid styling, kept as the benchmark baseline"""
+    data = [EQUIPMENT_HEADER]
+    order = columns.name_order()
+    rows = zip(columns.names(order), columns.types(order).tolist(),
+               *(values[order].tolist() for values in columns.parameters().values()))
+    for name, equipment_type, flowrate, pressure, temperature in rows:
+        data.append([name, equipment_type, f"{flowrate:.2f}", f"{pressure:.2f}", f"{temperature:.2f}"])
+
+    table = Table(data)
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTSIZE', (0, 1), (-1, -1), 8),
+    ]))
+    return [table]
+
+
+def build_pdf(elements):
+    buffer = io.BytesIO()
+    SimpleDocTemplate(buffer, pagesize=letter).build(elements)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = ('Benchmark PDF report generation: the legacy single-table listing, the chunked '
+            'LongTable listing and the default report (large-dataset mode above REPORT_MAX_TABLE_ROWS). '
+            'Datasets are created inside a transaction that is rolled back afterwards, and their column '
+            'stores and cached results are written to a temporary directory.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Dataset sizes to benchmark (default: 10000 100000 1000000)')
+        parser.add_argument('--legacy-max-rows', type=int, default=10000,
+                            help='Largest dataset to lay out with the legacy table (default: 10000)')
+        parser.add_argument('--listing-max-rows', type=int, default=100000,
+                            help='Largest dataset to lay out as a full chunked listing (default: 100000)')
+        parser.add_argument('--memory', action='store_true',
+                            help='Also report peak traced memory (runs each case a second time)')
+
+    def handle(self, *args, **options):
+        # Rolled-back dataset ids are handed out again, so nothing keyed by them may outlive the run
+        with tempfile.TemporaryDirectory(prefix='benchmark-report-') as tmp:
+            root = Path(tmp)
+            with override_settings(COLUMN_STORE_DIR=root / 'columns', CACHE_STORE_DIR=root / 'cache'):
+                self._benchmark(options)
+
+    def _benchmark(self, options):
+        self.stdout.write(f'{"rows":>10} {"mode":>14} {"seconds":>9} {"peak MB":>9} {"PDF KB":>9}')
+        for rows in options['rows']:
+            with transaction.atomic():
+                dataset = self._create_dataset(rows)
+                try:
+                    started = time.perf_counter()
+                    get_anomaly_results(dataset)
+                    self.stdout.write(f'{rows:>10} {"(anomalies)":>14} {time.perf_counter() - started:>9.2f}')
+
+                    columns = dataset.columns
+                    cases = [('report', lambda: build_report_pdf(dataset))]
+                    if rows <= options['listing_max_rows']:
+                        styles = getSampleStyleSheet()
+                        cases.insert(0, ('chunked table', lambda: build_pdf(_equipment_listing(columns, styles))))
+                    if rows <= options['legacy_max_rows']:
+                        cases.insert(0, ('legacy table', lambda: build_pdf(legacy_equipment_table(columns))))
+
+                    for mode, build in cases:
+                        self._run(rows, mode, build, options['memory'])
+                finally:
+                    transaction.set_rollback(True)
+
+    def _create_dataset(self, rows):
+        """A dataset with a column store and stored statistics, but no Equipment rows"""
+        dataset = Dataset.objects.create(file_name=f'benchmark-{rows}.csv')
+        rng = np.random.default_rng(rows)
+        writer = ColumnStoreWriter(dataset.id)
+        chunk_size = 100000
+        for start in range(0, rows, chunk_size):
+            count = min(chunk_size, rows - start)
+            writer.append({
+                'id': np.arange(start, start + count, dtype=np.int64),
+                'name': np.array([f'Unit-{i}' for i in range(start, start + count)], dtype=object),
+                'type': rng.choice(EQUIPMENT_TYPES, size=count).astype(object),
+                'flowrate': rng.normal(180, 30, size=count).round(2),
+                'pressure': rng.normal(25, 5, size=count).round(2),
+                'temperature': rng.normal(125, 25, size=count).round(2),
+            })
+        dataset.columns = writer.finalize()
+
+        dataset.set_summary(summary_from_statistics(statistics_from_columns(dataset.columns)))
+        dataset.save(update_fields=['summary_json'])
+        return dataset
+
+    def _run(self, rows, mode, build, memory):
+        started = time.perf_counter()
+        pdf = build()
+        elapsed = time.perf_counter() - started
+
+        peak = ''
+        if memory:
+            tracemalloc.start()
+            build()
+            peak = f'{tracemalloc.get_traced_memory()[1] / 2**20:.1f}'
+            tracemalloc.stop()
+        self.stdout.write(f'{rows:>10} {mode:>14} {elapsed:>9.2f} {peak:>9} {len(pdf) / 1024:>9.0f}')
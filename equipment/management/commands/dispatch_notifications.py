@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from equipment.notifications import NotificationDispatcher
+
+
+class Command(BaseCommand):
+    help = 'Send queued alert notifications that are due, retrying failed ones with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Notifications claimed per batch (default: NOTIFICATION_BATCH_SIZE)')
+        parser.add_argument('--interval', type=int, default=None,
+                            help='Keep running, dispatching every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        dispatcher = NotificationDispatcher(batch_size=options['batch_size'])
+
+        while True:
+            counts = dispatcher.dispatch_pending()
+            self.stdout.write(self.style.SUCCESS(
+                f"Sent {counts['sent']} notifications, {counts['retrying']} retrying, {counts['failed']} failed"
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from equipment.model_registry import retrain_baseline
+
+
+class Command(BaseCommand):
+    help = 'Train the baseline anomaly models from historical datasets and make them current'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--datasets', type=int, default=None,
+                            help='Train on the N most recent datasets (default: all)')
+        parser.add_argument('--max-rows', type=int, default=None,
+                            help='Rows sampled for training (default: ANOMALY_BASELINE_MAX_ROWS)')
+        parser.add_argument('--min-type-rows', type=int, default=None,
+                            help='Rows an equipment type needs for its own model (default: ANOMALY_BASELINE_MIN_TYPE_ROWS)')
+        parser.add_argument('--n-jobs', type=int, default=None,
+                            help='Worker processes for training, -1 for all cores (default: ANOMALY_BASELINE_N_JOBS)')
+
+    def handle(self, *args, **options):
+        try:
+            baseline = retrain_baseline(
+                dataset_limit=options['datasets'],
+                max_rows=options['max_rows'],
+                min_type_rows=options['min_type_rows'],
+                n_jobs=options['n_jobs'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        meta = baseline.meta
+        per_model = ', '.join(f'{label}: {rows}' for label, rows in meta['rows_per_model'].items())
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained baseline {baseline.model_id} on {meta['rows']} rows from {len(meta['datasets'])} datasets "
+            f"in {meta['seconds']:.3f}s ({per_model})"
+        ))
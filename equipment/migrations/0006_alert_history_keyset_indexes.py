@@ -0,0 +1,33 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0005_equipment_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='alerthistory',
+            options={'ordering': ['-created_at', '-id'], 'verbose_name_plural': 'Alert histories'},
+        ),
+        migrations.AddIndex(
+            model_name='alerthistory',
+            index=models.Index(fields=['created_at', 'id'], name='equipment_a_created_d23a4e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerthistory',
+            index=models.Index(fields=['severity', 'created_at', 'id'], name='equipment_a_severit_4c0430_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerthistory',
+            index=models.Index(fields=['acknowledged', 'created_at', 'id'], name='equipment_a_acknowl_29b4e5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alerthistory',
+            index=models.Index(fields=['severity', 'acknowledged', 'created_at', 'id'], name='equipment_a_severit_b51382_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0006_alert_history_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='job',
+            name='kind',
+            field=models.CharField(choices=[('upload', 'Upload'), ('report', 'Report')], max_length=20),
+        ),
+    ]
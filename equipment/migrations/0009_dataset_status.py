@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0008_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dataset',
+            name='status',
+            field=models.CharField(choices=[('processing', 'Processing'), ('ready', 'Ready')], default='ready', max_length=20),
+        ),
+    ]
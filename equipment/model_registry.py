@@ -0,0 +1,236 @@
+"""
+Baseline anomaly model registry
+Trains IsolationForest baselines from historical datasets (one per equipment
+type with enough history, plus a fleet-wide fallback), serializes them under
+ANOMALY_MODEL_DIR and serves the current one to the detector. New uploads are
+then scored with decision_function only instead of fitting a fresh forest.
+
+Layout of ANOMALY_MODEL_DIR:
+    baseline-<model_id>.joblib   fitted models, scaling and fleet statistics
+    current.json                 {"model_id": ...} of the active baseline
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import joblib
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from joblib import Parallel, delayed
+from sklearn.ensemble import IsolationForest
+
+from .column_store import load_columns
+from .dataset_stats import PARAMETERS, compute_statistics
+
+
+FLEET = '__fleet__'
+
+CURRENT_FILE = 'current.json'
+
+
+def model_root():
+    return Path(getattr(settings, 'ANOMALY_MODEL_DIR', Path(settings.MEDIA_ROOT) / 'models'))
+
+
+class BaselineModel:
+    """A trained set of per-type and fleet-wide IsolationForest models"""
+
+    def __init__(self, model_id, models, means, stds, statistics, meta):
+        self.model_id = model_id
+        self.models = models
+        self.means = means
+        self.stds = stds
+        self.statistics = statistics
+        self.meta = meta
+
+    def standardize(self, X):
+        """Scale a (rows, parameters) array with the training mean/std"""
+        centered = np.asarray(X, dtype=np.float64) - self.means
+        return np.divide(centered, self.stds, out=np.zeros_like(centered), where=self.stds > 0)
+
+    def predict(self, X, types=None):
+        """
+        Return 1 (normal) / -1 (anomaly) per row using decision_function only
+        Rows whose type has no model of its own use the fleet model.
+        """
+        X = self.standardize(X)
+        predictions = np.ones(len(X), dtype=np.int8)
+        if not len(X):
+            return predictions
+
+        if types is None:
+            groups = {FLEET: np.arange(len(X))}
+        else:
+            types = np.asarray(types, dtype=object)
+            groups = {}
+            fleet_rows = np.ones(len(X), dtype=bool)
+            for label in self.models:
+                if label == FLEET:
+                    continue
+                rows = np.flatnonzero(types == label)
+                if rows.size:
+                    groups[label] = rows
+                    fleet_rows[rows] = False
+            if fleet_rows.any():
+                groups[FLEET] = np.flatnonzero(fleet_rows)
+
+        for label, rows in groups.items():
+            scores = self.models[label].decision_function(X[rows])
+            predictions[rows[scores < 0]] = -1
+        return predictions
+
+
+def _fit_forest(X, config):
+    model = IsolationForest(
+        contamination=config['contamination'],
+        random_state=config['random_state'],
+        n_estimators=config['n_estimators'],
+    )
+    return model.fit(X)
+
+
+def collect_training_data(datasets, max_rows, seed=0):
+    """
+    Gather parameter rows and type labels from datasets' column stores
+    At most max_rows rows are kept, sampled uniformly across all datasets.
+    """
+    parts, type_parts = [], []
+    for dataset in datasets:
+        columns = load_columns(dataset)
+        if not len(columns):
+            continue
+        parts.append(np.column_stack([np.asarray(values) for values in columns.parameters().values()]))
+        type_parts.append(columns.types())
+
+    if not parts:
+        return np.empty((0, len(PARAMETERS))), np.empty(0, dtype=object)
+
+    X = np.concatenate(parts)
+    types = np.concatenate(type_parts)
+    if max_rows and len(X) > max_rows:
+        keep = np.sort(np.random.default_rng(seed).choice(len(X), size=max_rows, replace=False))
+        X, types = X[keep], types[keep]
+    return X, types
+
+
+def train_baseline(datasets, config, max_rows=None, min_type_rows=None, n_jobs=None):
+    """
+    Fit a fleet-wide model and one model per equipment type with enough rows
+    Models are fitted in parallel worker processes (n_jobs, -1 for all cores).
+    """
+    max_rows = max_rows or getattr(settings, 'ANOMALY_BASELINE_MAX_ROWS', 200000)
+    min_type_rows = min_type_rows or getattr(settings, 'ANOMALY_BASELINE_MIN_TYPE_ROWS', 50)
+    n_jobs = n_jobs or getattr(settings, 'ANOMALY_BASELINE_N_JOBS', -1)
+
+    started = time.perf_counter()
+    datasets = list(datasets)
+    X, types = collect_training_data(datasets, max_rows, seed=config['random_state'])
+    if len(X) < config['min_rows']:
+        raise ValueError(f'Need at least {config["min_rows"]} rows of history to train a baseline, found {len(X)}')
+
+    labels, counts = np.unique(types, return_counts=True)
+    type_counts = dict(zip(labels.tolist(), counts.tolist()))
+    statistics = compute_statistics(dict(zip(PARAMETERS, X.T)), type_counts)
+    means = np.array([statistics['parameters'][p]['mean'] for p in PARAMETERS])
+    stds = np.array([statistics['parameters'][p]['std'] for p in PARAMETERS])
+    centered = X - means
+    X_scaled = np.divide(centered, stds, out=np.zeros_like(centered), where=stds > 0)
+
+    groups = {FLEET: X_scaled}
+    for label, count in type_counts.items():
+        if count >= min_type_rows:
+            groups[label] = X_scaled[types == label]
+
+    fitted = Parallel(n_jobs=n_jobs)(delayed(_fit_forest)(rows, config) for rows in groups.values())
+
+    meta = {
+        'trained_at': timezone.now().isoformat(),
+        'datasets': [dataset.id for dataset in datasets],
+        'rows': int(len(X)),
+        'rows_per_model': {label: int(len(rows)) for label, rows in groups.items()},
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+    # Sortable by training time, which save_baseline() relies on for pruning
+    model_id = f"{timezone.now():%Y%m%d%H%M%S%f}-{uuid.uuid4().hex[:8]}"
+    return BaselineModel(model_id, dict(zip(groups, fitted)), means, stds, statistics, meta)
+
+
+def save_baseline(baseline, keep=None):
+    """Serialize a baseline, make it current and prune older files"""
+    keep = keep or getattr(settings, 'ANOMALY_BASELINE_KEEP', 3)
+    root = model_root()
+    root.mkdir(parents=True, exist_ok=True)
+
+    path = root / f'baseline-{baseline.model_id}.joblib'
+    tmp_path = path.with_suffix('.tmp')
+    joblib.dump({
+        'model_id': baseline.model_id,
+        'models': baseline.models,
+        'means': baseline.means,
+        'stds': baseline.stds,
+        'statistics': baseline.statistics,
+        'meta': baseline.meta,
+    }, tmp_path)
+    os.replace(tmp_path, path)
+
+    tmp_path = root / f'{CURRENT_FILE}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'model_id': baseline.model_id, 'meta': baseline.meta}, f)
+    os.replace(tmp_path, root / CURRENT_FILE)
+
+    for old in sorted(root.glob('baseline-*.joblib'))[:-keep]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+_cache_lock = threading.Lock()
+_cached = None
+
+
+def current_model_id():
+    """Return the id of the current baseline without loading it, or None"""
+    try:
+        with open(model_root() / CURRENT_FILE) as f:
+            return json.load(f)['model_id']
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+
+def get_baseline():
+    """Return the current BaselineModel, or None if none has been trained"""
+    global _cached
+    model_id = current_model_id()
+    if model_id is None:
+        return None
+
+    with _cache_lock:
+        if _cached is None or _cached.model_id != model_id:
+            try:
+                data = joblib.load(model_root() / f'baseline-{model_id}.joblib')
+            except FileNotFoundError:
+                return None
+            _cached = BaselineModel(
+                data['model_id'], data['models'], data['means'], data['stds'], data['statistics'], data['meta']
+            )
+        return _cached
+
+
+def retrain_baseline(dataset_limit=None, max_rows=None, min_type_rows=None, n_jobs=None):
+    """Train a baseline from the most recent datasets and make it current"""
+    # Imported here: the detector module depends on this registry
+    from .anomaly_detection import get_detector_config
+    from .models import Dataset
+
+    datasets = Dataset.objects.filter(status='ready').order_by('-upload_date', '-id')
+    if dataset_limit:
+        datasets = datasets[:dataset_limit]
+
+    baseline = train_baseline(
+        datasets, get_detector_config(), max_rows=max_rows, min_type_rows=min_type_rows, n_jobs=n_jobs
+    )
+    save_baseline(baseline)
+    return baseline
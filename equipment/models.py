@@ -1,14 +1,23 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 import json
+import uuid
 
 
 class Dataset(models.Model):
     """Model to store uploaded CSV datasets"""
+    STATUS_CHOICES = [
+        ('processing', 'Processing'),
+        ('ready', 'Ready'),
+    ]
+    
     upload_date = models.DateTimeField(auto_now_add=True)
     file_name = models.CharField(max_length=255)
     summary_json = models.TextField(blank=True, null=True)
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    # Uploads stay 'processing', and hidden from the API, until every row is in
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='ready')
     
     class Meta:
         ordering = ['-upload_date']
@@ -38,6 +47,11 @@ class Equipment(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Serve paginated listings (see pagination.py) without sorting the whole dataset
+            models.Index(fields=['dataset', 'name']),
+            models.Index(fields=['dataset', 'type', 'name']),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.type})"
@@ -108,8 +122,115 @@ class AlertHistory(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
         verbose_name_plural = 'Alert histories'
+        indexes = [
+            # One per filter combination served by AlertHistoryViewSet, each
+            # ending in the (created_at, id) keyset used for pagination
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['severity', 'created_at', 'id']),
+            models.Index(fields=['acknowledged', 'created_at', 'id']),
+            models.Index(fields=['severity', 'acknowledged', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Alert: {self.equipment.name} - {self.parameter} = {self.value}"
+
+
+class Job(models.Model):
+    """Model to track background processing jobs and their stage-level progress"""
+    KIND_CHOICES = [
+        ('upload', 'Upload'),
+        ('report', 'Report'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    stage = models.CharField(max_length=50, blank=True)
+    stages_json = models.TextField(blank=True, null=True)
+    rows_processed = models.PositiveIntegerField(default=0)
+    file_name = models.CharField(max_length=255, blank=True)
+    dataset = models.ForeignKey(Dataset, on_delete=models.SET_NULL, null=True, blank=True, related_name='jobs')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    result_json = models.TextField(blank=True, null=True)
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed whenever the worker records progress; see jobs.reap_stale_jobs
+    heartbeat_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.id} ({self.status})"
+    
+    def get_stages(self):
+        """Return stage progress as a list of dictionaries"""
+        if self.stages_json:
+            return json.loads(self.stages_json)
+        return []
+    
+    def set_stages(self, stages):
+        """Set stage progress from a list of dictionaries"""
+        self.stages_json = json.dumps(stages)
+    
+    def get_result(self):
+        """Return result as dictionary"""
+        if self.result_json:
+            return json.loads(self.result_json)
+        return {}
+    
+    def set_result(self, result_dict):
+        """Set result from dictionary"""
+        self.result_json = json.dumps(result_dict)
+
+
+class Notification(models.Model):
+    """Model to queue outgoing alert notifications (outbox) for the background dispatcher"""
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('telegram', 'Telegram'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    alert = models.ForeignKey(AlertHistory, on_delete=models.CASCADE, related_name='notifications')
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES)
+    recipient = models.TextField(help_text='Comma-separated email addresses or a Telegram chat id')
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
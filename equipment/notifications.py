@@ -0,0 +1,327 @@
+"""
+Notification outbox and background dispatcher
+Alerts enqueue Notification rows; a dispatcher sends them in batches over pooled
+connections, retrying failures with exponential backoff
+"""
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+import requests
+from requests.adapters import HTTPAdapter
+from .jobs import submit_coalesced
+from .models import AlertHistory, Notification
+
+
+logger = logging.getLogger(__name__)
+
+
+def build_notifications(alert, equipment_name, dataset):
+    """Build unsaved Notification rows for an alert according to its rule"""
+    rule = alert.rule
+    created_at = alert.created_at or timezone.now()
+    time_text = created_at.strftime('%Y-%m-%d %H:%M:%S')
+    notifications = []
+
+    if rule.send_email and rule.email_recipients.strip():
+        notifications.append(Notification(
+            alert=alert,
+            channel='email',
+            recipient=rule.email_recipients,
+            subject=f"🚨 Equipment Alert: {equipment_name}",
+            body=(
+                f"{alert.message}"
+                f"\n\nDataset: {dataset.file_name}"
+                f"\nTime: {time_text}"
+                f"\n\nPlease check the dashboard for more details."
+            ),
+        ))
+
+    if rule.send_telegram and rule.telegram_chat_id:
+        notifications.append(Notification(
+            alert=alert,
+            channel='telegram',
+            recipient=rule.telegram_chat_id,
+            body=(
+                f"{alert.message}"
+                f"\n\n📊 Dataset: {dataset.file_name}"
+                f"\n🕐 Time: {time_text}"
+            ),
+        ))
+
+    return notifications
+
+
+def enqueue_notifications(alerts_with_names, dataset):
+    """
+    Write outbox rows for (alert, equipment_name) pairs and wake the dispatcher
+    Returns the number of notifications queued
+    """
+    notifications = []
+    for alert, equipment_name in alerts_with_names:
+        notifications.extend(build_notifications(alert, equipment_name, dataset))
+
+    if not notifications:
+        return 0
+
+    Notification.objects.bulk_create(notifications, batch_size=500)
+    schedule_dispatch()
+    return len(notifications)
+
+
+class LiveTransport:
+    """Send over SMTP (Django email backend) and the Telegram Bot API"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.timeout = getattr(settings, 'NOTIFICATION_HTTP_TIMEOUT', 10)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+
+    def send_email(self, notifications):
+        """Send emails over one reused backend connection; returns {id: error or None}"""
+        results = {}
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+            for notification in notifications:
+                message = EmailMessage(
+                    subject=notification.subject,
+                    body=notification.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[address.strip() for address in notification.recipient.split(',') if address.strip()],
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                    results[notification.id] = None
+                except Exception as e:
+                    results[notification.id] = str(e) or e.__class__.__name__
+        except Exception as e:
+            # Could not even open the connection: every message in the batch failed
+            for notification in notifications:
+                results.setdefault(notification.id, str(e) or e.__class__.__name__)
+        finally:
+            connection.close()
+        return results
+
+    def send_telegram(self, notifications):
+        """Send Telegram messages with bounded concurrency; returns {id: error or None}"""
+        bot_token = settings.TELEGRAM_BOT_TOKEN
+        if not bot_token:
+            return {notification.id: 'TELEGRAM_BOT_TOKEN is not configured' for notification in notifications}
+
+        url = f"https://api.telegram.org/bot{bot_token}/sendMessage"
+
+        def send(notification):
+            try:
+                response = self.session.post(url, data={
+                    'chat_id': notification.recipient,
+                    'text': notification.body,
+                    'parse_mode': 'HTML'
+                }, timeout=self.timeout)
+                if response.status_code == 200:
+                    return notification.id, None
+                return notification.id, f'Telegram API returned {response.status_code}'
+            except requests.RequestException as e:
+                return notification.id, str(e) or e.__class__.__name__
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return dict(pool.map(send, notifications))
+
+
+class StubTransport:
+    """Record sends in memory instead of touching the network (NOTIFICATION_TRANSPORT = 'stub')"""
+
+    sent = []
+
+    def __init__(self, max_workers=None):
+        pass
+
+    def send_email(self, notifications):
+        return self._record(notifications)
+
+    def send_telegram(self, notifications):
+        return self._record(notifications)
+
+    def _record(self, notifications):
+        for notification in notifications:
+            StubTransport.sent.append({
+                'channel': notification.channel,
+                'recipient': notification.recipient,
+                'subject': notification.subject,
+                'body': notification.body,
+            })
+        return {notification.id: None for notification in notifications}
+
+
+TRANSPORTS = {
+    'live': LiveTransport,
+    'stub': StubTransport,
+}
+
+
+class NotificationDispatcher:
+    """Claim due outbox rows in batches, send them and record the outcome"""
+
+    def __init__(self, transport=None, batch_size=None, max_attempts=None, backoff_seconds=None, max_workers=None):
+        self.batch_size = batch_size or getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+        self.max_attempts = max_attempts or getattr(settings, 'NOTIFICATION_MAX_ATTEMPTS', 5)
+        self.backoff_seconds = backoff_seconds or getattr(settings, 'NOTIFICATION_RETRY_BACKOFF_SECONDS', 30)
+        self.stale_claim_seconds = getattr(settings, 'NOTIFICATION_STALE_CLAIM_SECONDS', 300)
+        max_workers = max_workers or getattr(settings, 'NOTIFICATION_MAX_WORKERS', 4)
+
+        if transport is None:
+            transport = TRANSPORTS[getattr(settings, 'NOTIFICATION_TRANSPORT', 'live')](max_workers)
+        self.transport = transport
+
+    def claim_batch(self):
+        """
+        Atomically mark a batch of due notifications as ours
+        Rows left 'sending' by a crashed dispatcher become claimable again
+        """
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.stale_claim_seconds)
+        due = (
+            Notification.objects.filter(status='pending', next_attempt_at__lte=now) |
+            Notification.objects.filter(status='sending', claimed_at__lt=stale)
+        )
+        candidate_ids = list(due.order_by('next_attempt_at').values_list('id', flat=True)[:self.batch_size])
+        if not candidate_ids:
+            return []
+
+        token = uuid.uuid4().hex
+        # The status filter makes the claim a compare-and-set against other dispatchers
+        (Notification.objects.filter(id__in=candidate_ids, status='pending') |
+         Notification.objects.filter(id__in=candidate_ids, status='sending', claimed_at__lt=stale)
+         ).update(status='sending', claim_token=token, claimed_at=now)
+        return list(Notification.objects.filter(claim_token=token, status='sending'))
+
+    def dispatch_batch(self):
+        """Send one claimed batch; returns counts of sent, retrying and failed"""
+        notifications = self.claim_batch()
+        counts = {'sent': 0, 'retrying': 0, 'failed': 0}
+        if not notifications:
+            return counts
+
+        results = {}
+        emails = [n for n in notifications if n.channel == 'email']
+        telegrams = [n for n in notifications if n.channel == 'telegram']
+        if emails:
+            results.update(self.transport.send_email(emails))
+        if telegrams:
+            results.update(self.transport.send_telegram(telegrams))
+
+        now = timezone.now()
+        sent_alerts = {'email': [], 'telegram': []}
+        for notification in notifications:
+            error = results.get(notification.id, 'No result from transport')
+            notification.attempts += 1
+            notification.claim_token = ''
+            notification.claimed_at = None
+
+            if error is None:
+                notification.status = 'sent'
+                notification.sent_at = now
+                notification.last_error = ''
+                sent_alerts[notification.channel].append(notification.alert_id)
+                counts['sent'] += 1
+            elif notification.attempts >= self.max_attempts:
+                notification.status = 'failed'
+                notification.last_error = error
+                counts['failed'] += 1
+            else:
+                notification.status = 'pending'
+                notification.last_error = error
+                delay = self.backoff_seconds * 2 ** (notification.attempts - 1)
+                notification.next_attempt_at = now + timedelta(seconds=delay)
+                counts['retrying'] += 1
+
+        Notification.objects.bulk_update(notifications, [
+            'status', 'attempts', 'claim_token', 'claimed_at', 'last_error', 'sent_at', 'next_attempt_at'
+        ])
+        if sent_alerts['email']:
+            AlertHistory.objects.filter(id__in=sent_alerts['email']).update(email_sent=True)
+        if sent_alerts['telegram']:
+            AlertHistory.objects.filter(id__in=sent_alerts['telegram']).update(telegram_sent=True)
+
+        return counts
+
+    def dispatch_pending(self):
+        """Send batches until nothing is due; returns the summed counts"""
+        totals = {'sent': 0, 'retrying': 0, 'failed': 0}
+        while True:
+            counts = self.dispatch_batch()
+            if not any(counts.values()):
+                return totals
+            for key, value in counts.items():
+                totals[key] += value
+
+
+def run_dispatcher():
+    """Send everything that is due, logging the outcome, then wait for the next retry"""
+    try:
+        counts = NotificationDispatcher().dispatch_pending()
+        logger.info('Notifications: %(sent)d sent, %(retrying)d retrying, %(failed)d failed', counts)
+    except Exception:
+        logger.exception('Notification dispatch failed')
+
+    try:
+        schedule_next_retry()
+    except Exception:
+        logger.exception('Could not schedule the next notification retry')
+
+
+def next_retry_at():
+    """When the earliest waiting notification becomes due (or its claim goes stale), or None"""
+    stale_claim = timedelta(seconds=getattr(settings, 'NOTIFICATION_STALE_CLAIM_SECONDS', 300))
+    due = Notification.objects.filter(status='pending').order_by('next_attempt_at')
+    claimed = Notification.objects.filter(status='sending').order_by('claimed_at')
+    times = [
+        due.values_list('next_attempt_at', flat=True).first(),
+        claimed.values_list('claimed_at', flat=True).first(),
+    ]
+    if times[1] is not None:
+        times[1] += stale_claim
+    times = [time for time in times if time is not None]
+    return min(times) if times else None
+
+
+_retry_timer = None
+_retry_timer_lock = threading.Lock()
+
+
+def schedule_next_retry():
+    """
+    Wake the dispatcher when the next retry is due
+    One timer per process: an earlier retry replaces it, a later one leaves it.
+    Returns the time the dispatcher will run, or None if nothing is waiting.
+    """
+    global _retry_timer
+    due_at = next_retry_at()
+    if due_at is None:
+        return None
+
+    with _retry_timer_lock:
+        if _retry_timer is not None and _retry_timer.is_alive() and _retry_timer.due_at <= due_at:
+            return _retry_timer.due_at
+        if _retry_timer is not None:
+            _retry_timer.cancel()
+
+        # At least a second, so a dispatcher that keeps failing cannot spin
+        delay = max((due_at - timezone.now()).total_seconds(), 1)
+        _retry_timer = threading.Timer(delay, schedule_dispatch)
+        _retry_timer.due_at = due_at
+        _retry_timer.daemon = True
+        _retry_timer.start()
+        return due_at
+
+
+def schedule_dispatch():
+    """Queue a dispatcher run on the background worker pool (coalesced)"""
+    return submit_coalesced('notifications', run_dispatcher)
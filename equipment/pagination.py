@@ -0,0 +1,119 @@
+"""
+Pagination for equipment and alert listings
+Keyset-based so deep pages cost the same as the first one
+"""
+import base64
+from datetime import datetime
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over (ordering field, id)
+
+    The cursor holds the last row's (value, id); the next page is everything
+    strictly after it in the ordering, read straight off a matching
+    (..., field, id) index instead of OFFSET-scanning earlier pages. The id
+    tie-breaker keeps pages exact when many rows share a value.
+    """
+
+    ordering = '-created_at'
+    # Orderings a client may pick with ?ordering=; empty means fixed
+    ordering_fields = ()
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    invalid_cursor_message = 'Invalid cursor'
+    # Absolute URL next links point at; defaults to the current request's
+    base_url = None
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            raise ValidationError({self.page_size_query_param: 'Must be an integer.'})
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, request, queryset, view):
+        """Return the ordering with id as a tie-breaker, e.g. ('-created_at', '-id')"""
+        ordering = self.ordering
+        if self.ordering_fields:
+            ordering = request.query_params.get(self.ordering_query_param, self.ordering)
+            if ordering.lstrip('-') not in self.ordering_fields:
+                raise ValidationError({self.ordering_query_param: (
+                    f"Unsupported ordering '{ordering}'. Use one of: {', '.join(self.ordering_fields)}"
+                )})
+
+        if ordering.lstrip('-') == 'id':
+            return (ordering,)
+        return (ordering, '-id' if ordering.startswith('-') else 'id')
+
+    def encode_cursor(self, row, field=None):
+        value = getattr(row, field or self.ordering.lstrip('-'))
+        value = value.isoformat() if isinstance(value, datetime) else repr(value) if isinstance(value, float) else value
+        position = f'{value}|{row.pk}'
+        return base64.urlsafe_b64encode(position.encode('utf-8')).decode('ascii')
+
+    def decode_cursor(self, request, model, field):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            # rsplit: string values may contain the separator themselves
+            value, pk = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8').rsplit('|', 1)
+            return model._meta.get_field(field).to_python(value), int(pk)
+        except (TypeError, ValueError, UnicodeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        ordering = self.get_ordering(request, queryset, view)
+        descending = ordering[0].startswith('-')
+        field = ordering[0].lstrip('-')
+
+        cursor = self.decode_cursor(request, queryset.model, field)
+        if cursor is not None:
+            value, pk = cursor
+            before, after = ('lt', 'lte') if descending else ('gt', 'gte')
+            if field == 'id':
+                queryset = queryset.filter(**{f'pk__{before}': pk})
+            else:
+                # (field, id) past (value, pk); the leading bound gives the index
+                # a range, the OR alone would be evaluated by scanning from the top
+                queryset = queryset.filter(**{f'{field}__{after}': value}).filter(
+                    Q(**{f'{field}__{before}': value}) | Q(**{f'pk__{before}': pk})
+                )
+
+        # One extra row tells us whether there is a next page
+        rows = list(queryset.order_by(*ordering)[:page_size + 1])
+        self.next_cursor = self.encode_cursor(rows[page_size - 1], field) if len(rows) > page_size else None
+        return rows[:page_size]
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.base_url or self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class EquipmentPagination(KeysetPagination):
+    """Keyset pagination over a dataset's equipment, sortable by ?ordering="""
+
+    ordering = 'name'
+    ordering_fields = ('id', 'name', 'type', 'flowrate', 'pressure', 'temperature')
+    page_size = getattr(settings, 'EQUIPMENT_PAGE_SIZE', 100)
+    max_page_size = getattr(settings, 'EQUIPMENT_MAX_PAGE_SIZE', 1000)
+    page_size_query_param = 'page_size'
@@ -0,0 +1,93 @@
+"""
+Raw CSV upload bodies
+Besides multipart forms, POST /api/datasets/upload/ accepts the CSV itself as
+the request body:
+
+    Content-Type: text/csv
+    Content-Disposition: attachment; filename="plant-a.csv"   (or ?file_name=)
+    Content-Encoding: gzip                                     (optional)
+
+The body is decompressed while it streams into a temporary file, so neither
+the compressed nor the decompressed CSV is ever held in memory, and the view
+sees the same request.FILES['file'] a multipart upload gives it.
+"""
+import zlib
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.utils.http import parse_header_parameters
+from rest_framework.exceptions import ParseError, UnsupportedMediaType
+from rest_framework.parsers import BaseParser, DataAndFiles
+
+
+GZIP_ENCODINGS = ('gzip', 'x-gzip')
+
+DEFAULT_FILE_NAME = 'upload.csv'
+
+
+class CSVUploadParser(BaseParser):
+    """Parse a raw (optionally gzip-encoded) CSV body into request.FILES['file']"""
+    media_type = 'text/csv'
+    chunk_size = 64 * 1024
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        encoding = request.META.get('HTTP_CONTENT_ENCODING', '').strip().lower()
+        if encoding in GZIP_ENCODINGS:
+            decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        elif encoding in ('', 'identity'):
+            decompressor = None
+        else:
+            raise UnsupportedMediaType(media_type, detail=f'Unsupported Content-Encoding "{encoding}"')
+
+        # Decompressed size is capped so a small gzip body cannot fill the disk
+        max_bytes = getattr(settings, 'UPLOAD_MAX_DECOMPRESSED_BYTES', 2 * 1024 ** 3)
+        upload = TemporaryUploadedFile(self.get_filename(request), self.media_type, 0, 'utf-8')
+        size = 0
+        try:
+            for data in self._decoded_chunks(stream, decompressor):
+                size += len(data)
+                if size > max_bytes:
+                    raise ParseError(f'Uploaded CSV is larger than {max_bytes} bytes')
+                upload.write(data)
+        except zlib.error as e:
+            upload.close()
+            raise ParseError(f'Invalid gzip body: {e}')
+        except ParseError:
+            upload.close()
+            raise
+
+        upload.size = size
+        upload.seek(0)
+        return DataAndFiles({}, {'file': upload})
+
+    def _decoded_chunks(self, stream, decompressor):
+        """Yield the body in chunks, gunzipping each into at most chunk_size-sized pieces"""
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            if decompressor is None:
+                yield chunk
+                continue
+            # Bounded output per call, so highly compressed input is expanded gradually
+            data = decompressor.decompress(chunk, self.chunk_size)
+            while data:
+                yield data
+                data = decompressor.decompress(decompressor.unconsumed_tail, self.chunk_size)
+
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+            if not decompressor.eof:
+                raise ParseError('Invalid gzip body: truncated')
+
+    def get_filename(self, request):
+        """File name from Content-Disposition (filename or filename*), else ?file_name="""
+        disposition = request.META.get('HTTP_CONTENT_DISPOSITION', '')
+        if disposition:
+            _, params = parse_header_parameters(disposition)
+            if params.get('filename'):
+                return params['filename']
+        return request.query_params.get('file_name') or DEFAULT_FILE_NAME
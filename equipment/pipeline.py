@@ -0,0 +1,144 @@
+"""
+Upload processing pipeline
+Runs ingestion and alert evaluation either inline or on a background worker
+"""
+import os
+from contextlib import contextmanager
+from django.utils import timezone
+from .alerts import AlertManager
+from .anomaly_detection import precompute_anomaly_results
+from .ingest import CSVIngestor
+from .jobs import start_job, submit
+from .models import Dataset, Job
+from .reports import schedule_report
+from .retention import schedule_retention
+
+
+class UploadPipeline:
+    """
+    Process one CSV upload, recording stage progress on a Job
+    Background uploads pass the job they were queued as. Inline uploads get
+    one of their own, opened and closed here: its heartbeat is how retention
+    tells a slow upload from an abandoned one.
+    """
+
+    STAGES = ['ingesting', 'alerts']
+
+    def __init__(self, file_name, user=None, job=None):
+        self.file_name = file_name
+        self.user = user
+        self.owns_job = job is None
+        if self.owns_job:
+            now = timezone.now()
+            job = Job.objects.create(kind='upload', status='running', file_name=file_name, created_by=user,
+                                     started_at=now, heartbeat_at=now)
+        self.job = job
+
+        self.job.set_stages([{'name': name, 'status': 'pending'} for name in self.STAGES])
+        self.job.save(update_fields=['stages_json'])
+
+    @contextmanager
+    def stage(self, name):
+        """Mark a stage as running for the duration of the block"""
+        self._update_stage(name, status='running', started_at=timezone.now().isoformat())
+        try:
+            yield
+        except Exception:
+            self._update_stage(name, status='failed', finished_at=timezone.now().isoformat())
+            raise
+        self._update_stage(name, status='done', finished_at=timezone.now().isoformat())
+
+    def _update_stage(self, name, **fields):
+        stages = self.job.get_stages()
+        for stage in stages:
+            if stage['name'] == name:
+                stage.update(fields)
+        self.job.set_stages(stages)
+        self.job.stage = name
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=['stages_json', 'stage', 'heartbeat_at'])
+
+    def report_progress(self, rows_processed):
+        """Record the number of rows ingested so far"""
+        self.job.rows_processed = rows_processed
+        self.job.heartbeat_at = timezone.now()
+        self.job.save(update_fields=['rows_processed', 'heartbeat_at'])
+
+    def run(self, csv_file, ingestor=None):
+        """
+        Run every stage and return (dataset, result)
+        Ingestion commits chunk by chunk, so the dataset stays 'processing'
+        until the upload is complete; one that fails at any stage is removed
+        again, rows, alerts and column store included
+        """
+        dataset = Dataset.objects.create(file_name=self.file_name, uploaded_by=self.user, status='processing')
+        # Lets retention tell a slow upload from an abandoned one
+        self.job.dataset = dataset
+        self.job.save(update_fields=['dataset'])
+
+        try:
+            with self.stage('ingesting'):
+                # Parse, insert and summarize in bounded chunks
+                ingestor = ingestor or CSVIngestor(csv_file)
+                summary = ingestor.ingest(dataset, progress_callback=self.report_progress)
+                dataset.set_summary(summary)
+                dataset.save()
+
+            with self.stage('alerts'):
+                alerts = AlertManager().check_dataset(dataset)
+
+            dataset.status = 'ready'
+            dataset.save(update_fields=['status'])
+        except Exception as e:
+            dataset.delete()
+            # The row is gone; saving the job must not point at it
+            self.job.dataset = None
+            self._finish_job('failed', error=str(e))
+            raise
+
+        # Anomaly results and the PDF report are prepared ahead of the first
+        # request, and old datasets are removed by the retention worker, not inline
+        submit(precompute_anomaly_results, dataset.id)
+        schedule_report(dataset, user=self.user)
+        schedule_retention()
+
+        result = {'alerts_triggered': len(alerts)}
+        self._finish_job('succeeded', result=result)
+        return dataset, result
+
+    def _finish_job(self, status, result=None, error=''):
+        """Close a job this pipeline opened; run_upload_job closes the ones it is given"""
+        if not self.owns_job:
+            return
+
+        if result is not None:
+            self.job.set_result(result)
+        self.job.status = status
+        self.job.error = error
+        self.job.finished_at = timezone.now()
+        self.job.save()
+
+
+def run_upload_job(job_id, path):
+    """Background entry point: run the pipeline for a spooled upload file"""
+    job = start_job(job_id)
+    if job is None:
+        os.remove(path)
+        return
+
+    try:
+        with open(path, 'rb') as csv_file:
+            pipeline = UploadPipeline(job.file_name, user=job.created_by, job=job)
+            dataset, result = pipeline.run(csv_file)
+
+        job.dataset = dataset
+        job.set_result(result)
+        job.status = 'succeeded'
+    except Exception as e:
+        job.error = str(e)
+        job.status = 'failed'
+    finally:
+        job.finished_at = timezone.now()
+        job.save()
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,160 @@
+"""
+Compact columnar response encoding
+Clients that send Accept: application/vnd.equipment.columnar (or ?format=columnar)
+get column buffers they can map straight onto NumPy arrays instead of JSON rows.
+
+Frame layout (all integers little-endian):
+    b'EQCF'              magic
+    uint16 version       FRAME_VERSION
+    uint16 reserved
+    uint32 header_len
+    header               UTF-8 JSON, padded with spaces to a multiple of 8 bytes
+    buffers              each starting on an 8-byte boundary
+
+The header holds {'meta': {...}, 'rows': n, 'columns': [...]}. Each column is
+one of:
+    {'name', 'kind': 'numeric', 'dtype', 'buffer': [offset, length]}
+    {'name', 'kind': 'category', 'dtype', 'labels': [...], 'buffer': [...]}
+    {'name', 'kind': 'string', 'offsets': [offset, length], 'data': [offset, length]}
+Offsets are relative to the start of the buffer area. String columns store
+n + 1 int32 byte offsets into a UTF-8 blob.
+"""
+import json
+import struct
+
+import numpy as np
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+MAGIC = b'EQCF'
+FRAME_VERSION = 1
+ALIGNMENT = 8
+
+# Low-cardinality text columns sent as codes plus a label table
+CATEGORY_COLUMNS = {'type'}
+
+# Parameter values are sent as float64 so they match the JSON listing exactly;
+# float32 cannot hold two decimals much beyond 1e5
+FLOAT_DTYPE = '<f8'
+
+
+def _pad(length):
+    return -length % ALIGNMENT
+
+
+def encode_columns(columns, meta=None):
+    """Encode {name: array or list of str} plus JSON-able meta into one frame"""
+    descriptors = []
+    buffers = []
+    position = 0
+    rows = None
+
+    def add_buffer(data):
+        nonlocal position
+        start = position
+        buffers.append(data)
+        buffers.append(b'\0' * _pad(len(data)))
+        position += len(data) + _pad(len(data))
+        return [start, len(data)]
+
+    for name, values in columns.items():
+        array = np.asarray(values)
+        rows = len(array) if rows is None else rows
+        if len(array) != rows:
+            raise ValueError(f"Column '{name}' has {len(array)} rows, expected {rows}")
+
+        if array.dtype.kind == 'f':
+            data = array.astype(FLOAT_DTYPE, copy=False)
+            descriptors.append({'name': name, 'kind': 'numeric', 'dtype': FLOAT_DTYPE,
+                                'buffer': add_buffer(data.tobytes())})
+        elif array.dtype.kind in 'iub':
+            data = array.astype(array.dtype.newbyteorder('<'), copy=False)
+            descriptors.append({'name': name, 'kind': 'numeric', 'dtype': data.dtype.str,
+                                'buffer': add_buffer(data.tobytes())})
+        elif name in CATEGORY_COLUMNS:
+            labels, codes = np.unique(array.astype(str), return_inverse=True)
+            descriptors.append({'name': name, 'kind': 'category', 'dtype': '<u2', 'labels': labels.tolist(),
+                                'buffer': add_buffer(codes.astype('<u2').tobytes())})
+        else:
+            encoded = [str(value).encode('utf-8') for value in array.tolist()]
+            offsets = np.zeros(len(encoded) + 1, dtype='<i4')
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            descriptors.append({'name': name, 'kind': 'string',
+                                'offsets': add_buffer(offsets.tobytes()),
+                                'data': add_buffer(b''.join(encoded))})
+
+    header = json.dumps({'meta': meta or {}, 'rows': rows or 0, 'columns': descriptors},
+                        separators=(',', ':'), cls=JSONEncoder).encode('utf-8')
+    # Magic + version + reserved + length is 12 bytes; pad the header so buffers align
+    header += b' ' * _pad(12 + len(header))
+    return b''.join([MAGIC, struct.pack('<HHI', FRAME_VERSION, 0, len(header)), header] + buffers)
+
+
+def decode_columns(payload):
+    """Decode a frame into (meta, {name: array}); the reference for client decoders"""
+    if payload[:4] != MAGIC:
+        raise ValueError('Not a columnar frame')
+    version, _, header_len = struct.unpack_from('<HHI', payload, 4)
+    if version != FRAME_VERSION:
+        raise ValueError(f'Unsupported columnar frame version {version}')
+
+    header = json.loads(payload[12:12 + header_len])
+    body = memoryview(payload)[12 + header_len:]
+
+    def buffer(span, dtype):
+        start, length = span
+        return np.frombuffer(body[start:start + length], dtype=dtype)
+
+    columns = {}
+    for column in header['columns']:
+        if column['kind'] == 'numeric':
+            columns[column['name']] = buffer(column['buffer'], column['dtype'])
+        elif column['kind'] == 'category':
+            labels = np.array(column['labels'], dtype=object)
+            columns[column['name']] = labels[buffer(column['buffer'], column['dtype'])]
+        else:
+            offsets = buffer(column['offsets'], '<i4').tolist()
+            start, length = column['data']
+            blob = bytes(body[start:start + length])
+            columns[column['name']] = np.array(
+                [blob[offsets[i]:offsets[i + 1]].decode('utf-8') for i in range(len(offsets) - 1)], dtype=object
+            )
+    return header['meta'], columns
+
+
+class ColumnarRenderer(BaseRenderer):
+    """
+    Render {'columns': {...}, **meta} responses as a columnar frame
+    Responses without columns (errors) become a frame carrying only meta.
+    """
+
+    media_type = 'application/vnd.equipment.columnar'
+    format = 'columnar'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, dict) or 'columns' not in data:
+            return encode_columns({}, meta={'detail': data})
+
+        meta = {key: value for key, value in data.items() if key != 'columns'}
+        return encode_columns(data['columns'], meta=meta)
+
+
+class PNGRenderer(BaseRenderer):
+    """
+    Accept image/png for chart endpoints
+    Charts are served as files; this renderer only carries error responses,
+    whose status code is the whole answer.
+    """
+
+    media_type = 'image/png'
+    format = 'png'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data if isinstance(data, bytes) else b''
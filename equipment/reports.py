@@ -0,0 +1,312 @@
+"""
+PDF report rendering
+Reports are rendered once per dataset on a background worker (started right
+after upload) and kept in the shared cache store; the report endpoint serves
+the cached file or answers 202 with a job to poll while rendering is in progress.
+"""
+import io
+import logging
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, LongTable, TableStyle, Paragraph, Spacer, Image
+
+from .anomaly_detection import SEVERITIES, current_detector_version, get_anomaly_results
+from .cache_store import get_cache_store
+from .charts import CHART_SIZES, dataset_chart
+from .column_store import load_columns
+from .dataset_stats import PARAMETERS, get_dataset_statistics
+from .jobs import reap_stale_jobs, start_job, submit
+from .models import Dataset, Job
+
+
+logger = logging.getLogger(__name__)
+
+
+def report_key(dataset_id):
+    # Reports list anomalies, so a new detector version means a new report
+    return f'{dataset_id}:{current_detector_version()}'
+
+
+def open_report(dataset_id):
+    """Return the dataset's cached report opened for reading, or None"""
+    return get_cache_store().open('reports', report_key(dataset_id))
+
+
+def _chart_image(dataset, kind, width):
+    """A reportlab Image of a cached dataset chart, scaled to width"""
+    pixel_width, pixel_height, _ = CHART_SIZES[kind]
+    png = io.BytesIO(dataset_chart(dataset, kind))
+    return Image(png, width=width, height=width * pixel_height / pixel_width)
+
+
+def build_report_pdf(dataset, max_rows=None, top_anomalies=None):
+    """
+    Build the PDF report for a dataset and return its bytes
+    Datasets over max_rows (REPORT_MAX_TABLE_ROWS) get per-type aggregates and
+    the top_anomalies (REPORT_TOP_ANOMALIES) most severe anomalies instead of
+    a full listing, so layout time and memory stay bounded.
+    """
+    columns = load_columns(dataset)
+    statistics = get_dataset_statistics(dataset)
+
+    # Create PDF
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+    styles = getSampleStyleSheet()
+
+    # Title
+    title = Paragraph(f"<b>Equipment Report: {dataset.file_name}</b>", styles['Title'])
+    elements.append(title)
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Summary section from the stored dataset statistics
+    summary_text = f"""
+    <b>Summary Statistics</b><br/>
+    Total Equipment: {statistics['count']}<br/>
+    <br/>
+    """
+    for parameter in PARAMETERS:
+        stats = statistics['parameters'][parameter]
+        summary_text += (
+            f"<b>{parameter.capitalize()}:</b> Avg: {stats['mean']:.2f}, "
+            f"Std: {stats['std']:.2f}, "
+            f"Min: {stats['min']:.2f}, "
+            f"Median: {stats['median']:.2f}, "
+            f"Max: {stats['max']:.2f}<br/>"
+        )
+    elements.append(Paragraph(summary_text, styles['Normal']))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Charts come from the shared content-addressed chart cache
+    try:
+        # Chart 1: Equipment Type Distribution
+        if statistics['type_counts']:
+            elements.append(Paragraph("<b>Equipment Type Distribution</b>", styles['Heading2']))
+            elements.append(Spacer(1, 0.1*inch))
+            elements.append(_chart_image(dataset, 'types', 5*inch))
+            elements.append(Spacer(1, 0.3*inch))
+
+        # Chart 2: Parameter Comparison
+        elements.append(Paragraph("<b>Parameter Distributions</b>", styles['Heading2']))
+        elements.append(Spacer(1, 0.1*inch))
+        elements.append(_chart_image(dataset, 'histograms', 7*inch))
+        elements.append(Spacer(1, 0.3*inch))
+
+    except Exception as e:
+        # If chart generation fails, continue without charts
+        elements.append(Paragraph(f"<i>Chart generation skipped: {str(e)}</i>", styles['Normal']))
+        elements.append(Spacer(1, 0.2*inch))
+
+    # Equipment listing, or a bounded summary of it for large datasets
+    max_rows = _report_setting('REPORT_MAX_TABLE_ROWS', max_rows)
+    if len(columns) <= max_rows:
+        elements.extend(_equipment_listing(columns, styles))
+    else:
+        top_anomalies = _report_setting('REPORT_TOP_ANOMALIES', top_anomalies)
+        elements.extend(_large_dataset_sections(dataset, columns, styles, max_rows, top_anomalies))
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+# Table styling kept to whole-table commands: per-cell styles and measuring
+# every cell for auto-sized columns dominate layout time on long tables
+TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 8),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.beige, colors.white]),
+    ('LINEBELOW', (0, 0), (-1, 0), 1, colors.black),
+    ('BOX', (0, 0), (-1, -1), 1, colors.black),
+])
+ROW_HEIGHT = 14
+
+EQUIPMENT_HEADER = ['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+EQUIPMENT_COL_WIDTHS = [2*inch, 1.5*inch, 1*inch, 1*inch, 1*inch]
+
+
+# Used when the matching setting is absent
+REPORT_DEFAULTS = {
+    'REPORT_MAX_TABLE_ROWS': 5000,
+    'REPORT_TOP_ANOMALIES': 100,
+    'REPORT_TABLE_CHUNK_ROWS': 500,
+}
+
+
+def _report_setting(name, value=None):
+    if value is not None:
+        return value
+    return getattr(settings, name, REPORT_DEFAULTS[name])
+
+
+def _chunked_tables(header, rows, col_widths):
+    """
+    Lay rows out as a series of LongTables of REPORT_TABLE_CHUNK_ROWS rows
+    Fixed column widths and row heights skip reportlab's per-cell measuring,
+    and short tables keep page splitting cheap.
+    """
+    chunk_rows = _report_setting('REPORT_TABLE_CHUNK_ROWS')
+    for start in range(0, len(rows), chunk_rows):
+        yield LongTable(
+            [header] + rows[start:start + chunk_rows],
+            colWidths=col_widths,
+            rowHeights=ROW_HEIGHT,
+            style=TABLE_STYLE,
+            repeatRows=1,
+            normalizedData=1,
+        )
+
+
+def _format_values(*arrays):
+    """Format float columns as lists of '0.00' strings"""
+    return [np.char.mod('%.2f', np.asarray(values, dtype=np.float64)).tolist() for values in arrays]
+
+
+def _equipment_listing(columns, styles):
+    """The full equipment table, in name order"""
+    elements = [Paragraph("<b>Equipment Details</b>", styles['Heading2']), Spacer(1, 0.1*inch)]
+    if not len(columns):
+        return elements
+
+    order = columns.name_order()
+    rows = [list(row) for row in zip(
+        columns.names(order),
+        columns.types(order).tolist(),
+        *_format_values(*(values[order] for values in columns.parameters().values())),
+    )]
+    elements.extend(_chunked_tables(EQUIPMENT_HEADER, rows, EQUIPMENT_COL_WIDTHS))
+    return elements
+
+
+def _large_dataset_sections(dataset, columns, styles, max_rows, top_anomalies):
+    """Per-type aggregates and the most severe anomalies, in place of the full listing"""
+    results = get_anomaly_results(dataset)
+    is_anomaly = results.is_anomaly
+
+    elements = [
+        Paragraph(
+            f"<i>This dataset has {len(columns):,} rows, more than the {max_rows:,} listed in a report. "
+            f"Per-type aggregates and the {top_anomalies:,} most severe anomalies are shown instead; "
+            f"row-level data is available from the equipment API.</i>",
+            styles['Normal']
+        ),
+        Spacer(1, 0.2*inch),
+    ]
+
+    # Per-type aggregates, one pass per column over the memory-mapped store
+    codes = columns.type_code
+    counts = np.bincount(codes, minlength=len(columns.type_labels))
+    aggregates = {}
+    for parameter, values in columns.parameters().items():
+        means = np.bincount(codes, weights=values, minlength=len(counts)) / np.maximum(counts, 1)
+        lows = np.full(len(counts), np.inf)
+        highs = np.full(len(counts), -np.inf)
+        np.minimum.at(lows, codes, values)
+        np.maximum.at(highs, codes, values)
+        aggregates[parameter] = (means.tolist(), lows.tolist(), highs.tolist())
+    anomaly_counts = np.bincount(codes[results.order[is_anomaly]], minlength=len(counts))
+
+    rows = []
+    for code in np.argsort(-counts, kind='stable').tolist():
+        if not counts[code]:
+            continue
+        row = [columns.type_labels[code], f"{counts[code]:,}", f"{anomaly_counts[code]:,}"]
+        for parameter in PARAMETERS:
+            means, lows, highs = aggregates[parameter]
+            mean, low, high = means[code], lows[code], highs[code]
+            row.append(f"{mean:.2f} ({low:.2f} to {high:.2f})")
+        rows.append(row)
+
+    header = ['Type', 'Count', 'Anomalies'] + [f"{parameter.capitalize()} avg (range)" for parameter in PARAMETERS]
+    elements.append(Paragraph("<b>Equipment by Type</b>", styles['Heading2']))
+    elements.append(Spacer(1, 0.1*inch))
+    elements.extend(_chunked_tables(header, rows, [1.3*inch, 0.6*inch, 0.7*inch] + [1.3*inch] * 3))
+    elements.append(Spacer(1, 0.3*inch))
+
+    # Most severe anomalies: highest severity, then lowest health score
+    anomalous = np.flatnonzero(is_anomaly)
+    ranked = anomalous[np.lexsort((
+        anomalous,
+        results.health_score[anomalous],
+        -results.severity_code[anomalous].astype(np.int16),
+    ))][:top_anomalies]
+    indices = results.order[ranked]
+
+    elements.append(Paragraph(
+        f"<b>Top Anomalies</b> ({len(ranked):,} of {len(anomalous):,})", styles['Heading2']
+    ))
+    elements.append(Spacer(1, 0.1*inch))
+    if len(ranked):
+        rows = [list(row) for row in zip(
+            columns.names(indices),
+            columns.types(indices).tolist(),
+            [SEVERITIES[code] for code in results.severity_code[ranked].tolist()],
+            [str(health) for health in results.health_score[ranked].tolist()],
+            *_format_values(*(values[indices] for values in columns.parameters().values())),
+        )]
+        header = ['Name', 'Type', 'Severity', 'Health'] + EQUIPMENT_HEADER[2:]
+        col_widths = [1.6*inch, 1.2*inch, 0.7*inch, 0.6*inch] + [0.8*inch] * 3
+        elements.extend(_chunked_tables(header, rows, col_widths))
+    return elements
+
+
+def write_report(dataset):
+    """Render a dataset's report into the cache store and return its size in bytes"""
+    # Keyed before rendering: a version change mid-render must not be credited to this PDF
+    key = report_key(dataset.id)
+    pdf = build_report_pdf(dataset)
+    get_cache_store().set('reports', key, pdf, datasets=[dataset.id])
+    return len(pdf)
+
+
+def run_report_job(job_id):
+    """Background entry point: render the report for the job's dataset"""
+    job = start_job(job_id, stage='rendering')
+    if job is None:
+        return
+
+    try:
+        if job.dataset is None:
+            raise Dataset.DoesNotExist('Dataset was deleted before its report was rendered')
+        job.set_result({'bytes': write_report(job.dataset)})
+        job.status = 'succeeded'
+    except Exception as e:
+        logger.exception('Report rendering failed for job %s', job_id)
+        job.error = str(e)
+        job.status = 'failed'
+    finally:
+        job.finished_at = timezone.now()
+        job.save()
+
+
+_schedule_lock = threading.Lock()
+
+
+def schedule_report(dataset, user=None):
+    """
+    Return the job rendering this dataset's report, starting one if needed
+    Returns None when the report is already cached. A pending or running job
+    that stopped making progress (its worker died with the server) is failed
+    and replaced rather than handed out again.
+    """
+    with _schedule_lock:
+        if get_cache_store().contains('reports', report_key(dataset.id)):
+            return None
+
+        reap_stale_jobs(kind='report', dataset=dataset)
+        job = Job.objects.filter(kind='report', dataset=dataset, status__in=['pending', 'running']).first()
+        if job is None:
+            job = Job.objects.create(kind='report', dataset=dataset, file_name=dataset.file_name, created_by=user)
+            submit(run_report_job, job.id)
+        return job
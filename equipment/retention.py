@@ -0,0 +1,119 @@
+"""
+Dataset retention
+Set-based, batched removal of old datasets, run off the request path
+"""
+import logging
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from .jobs import reap_stale_jobs, stale_job_cutoff, submit_coalesced
+from .models import Dataset, Equipment, AlertHistory, Job, Notification
+
+
+logger = logging.getLogger(__name__)
+
+
+def select_expired_datasets(keep_latest=None, max_age_days=None):
+    """
+    Return ids of datasets outside the retention window
+    A dataset expires if it is beyond the newest keep_latest datasets or
+    older than max_age_days; either limit may be None to disable it. Uploads
+    still processing are left alone unless their upload was abandoned.
+    Read-only, so dry runs can use it too.
+    """
+    expired = set()
+    datasets = Dataset.objects.filter(status='ready')
+
+    if keep_latest is not None:
+        expired.update(datasets.order_by('-upload_date', '-id').values_list('id', flat=True)[keep_latest:])
+
+    if max_age_days is not None:
+        cutoff = timezone.now() - timedelta(days=max_age_days)
+        expired.update(datasets.filter(upload_date__lt=cutoff).values_list('id', flat=True))
+
+    # A server stop mid-ingest leaves a processing dataset nothing will finish;
+    # its job, if any, has stopped recording progress
+    cutoff = stale_job_cutoff()
+    live_uploads = Job.objects.filter(
+        dataset=OuterRef('pk'), status__in=['pending', 'running'], heartbeat_at__gte=cutoff
+    )
+    expired.update(
+        Dataset.objects.filter(status='processing', upload_date__lt=cutoff)
+        .exclude(Exists(live_uploads))
+        .values_list('id', flat=True)
+    )
+
+    return sorted(expired)
+
+
+def delete_datasets(dataset_ids, batch_size):
+    """
+    Delete datasets and their rows with one set-based statement per table per batch
+    Returns row counts per table
+    """
+    counts = {'datasets': 0, 'equipment': 0, 'alerts': 0}
+
+    for start in range(0, len(dataset_ids), batch_size):
+        batch = dataset_ids[start:start + batch_size]
+        with transaction.atomic():
+            # _raw_delete issues a single DELETE without loading rows into the
+            # collector; children go first so the cascade finds nothing left
+            Notification.objects.filter(alert__equipment__dataset_id__in=batch)._raw_delete(Notification.objects.db)
+            counts['alerts'] += AlertHistory.objects.filter(equipment__dataset_id__in=batch)._raw_delete(AlertHistory.objects.db)
+            counts['equipment'] += Equipment.objects.filter(dataset_id__in=batch)._raw_delete(Equipment.objects.db)
+
+            # Regular delete for the (few) dataset rows so post_delete cleanup still runs
+            deleted, per_model = Dataset.objects.filter(id__in=batch).delete()
+            counts['datasets'] += per_model.get(Dataset._meta.label, 0)
+
+    return counts
+
+
+def apply_retention(keep_latest=None, max_age_days=None, batch_size=None, dry_run=False):
+    """
+    Apply the retention policy and report what was reclaimed
+    Unspecified limits fall back to the DATASET_RETENTION_* settings
+    """
+    if keep_latest is None:
+        keep_latest = getattr(settings, 'DATASET_RETENTION_KEEP_LATEST', 5)
+    if max_age_days is None:
+        max_age_days = getattr(settings, 'DATASET_RETENTION_MAX_AGE_DAYS', None)
+    batch_size = batch_size or getattr(settings, 'DATASET_RETENTION_BATCH_SIZE', 100)
+
+    started = time.perf_counter()
+    dataset_ids = select_expired_datasets(keep_latest, max_age_days)
+
+    if dry_run:
+        counts = {
+            'datasets': len(dataset_ids),
+            'equipment': Equipment.objects.filter(dataset_id__in=dataset_ids).count(),
+            'alerts': AlertHistory.objects.filter(equipment__dataset_id__in=dataset_ids).count(),
+        }
+    else:
+        # The uploads behind abandoned datasets are failed along with them
+        reap_stale_jobs(kind='upload')
+        counts = delete_datasets(dataset_ids, batch_size)
+
+    counts['seconds'] = round(time.perf_counter() - started, 3)
+    counts['dry_run'] = dry_run
+    return counts
+
+
+def run_retention():
+    """Apply the configured retention policy, logging what was reclaimed"""
+    try:
+        result = apply_retention()
+        logger.info(
+            'Retention removed %(datasets)d datasets, %(equipment)d equipment rows '
+            'and %(alerts)d alerts in %(seconds).3fs', result
+        )
+    except Exception:
+        logger.exception('Dataset retention failed')
+
+
+def schedule_retention():
+    """Queue a retention run on the background worker pool (coalesced)"""
+    return submit_coalesced('retention', run_retention)
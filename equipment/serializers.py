@@ -1,21 +1,47 @@
 from rest_framework import serializers
-from .models import Dataset, Equipment, AlertRule, AlertHistory
+from .models import Dataset, Equipment, AlertRule, AlertHistory, Job
 from django.contrib.auth.models import User
 
 
 class EquipmentSerializer(serializers.ModelSerializer):
+    """Equipment row; pass fields=[...] to serialize only a subset"""
+    
     class Meta:
         model = Equipment
         fields = ['id', 'name', 'type', 'flowrate', 'pressure', 'temperature']
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
 
 
 class DatasetSerializer(serializers.ModelSerializer):
-    equipment_items = EquipmentSerializer(many=True, read_only=True)
+    """
+    Dataset detail without its rows
+    The detail view adds the first page of equipment_items; further pages
+    come from GET /api/datasets/<id>/equipment/
+    """
     summary = serializers.SerializerMethodField()
     
     class Meta:
         model = Dataset
-        fields = ['id', 'upload_date', 'file_name', 'summary', 'equipment_items']
+        fields = ['id', 'upload_date', 'file_name', 'summary']
+    
+    def get_summary(self, obj):
+        return obj.get_summary()
+
+
+class DatasetUploadSerializer(serializers.ModelSerializer):
+    """Upload response: summary only, so large files are never re-serialized row by row"""
+    summary = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Dataset
+        fields = ['id', 'upload_date', 'file_name', 'summary']
     
     def get_summary(self, obj):
         return obj.get_summary()
@@ -29,6 +55,9 @@ class DatasetListSerializer(serializers.ModelSerializer):
         fields = ['id', 'upload_date', 'file_name', 'equipment_count']
     
     def get_equipment_count(self, obj):
+        # Views annotate equipment_count; fall back to a query for bare instances
+        if hasattr(obj, 'equipment_count'):
+            return obj.equipment_count
         return obj.equipment_items.count()
 
 
@@ -46,3 +75,20 @@ class AlertHistorySerializer(serializers.ModelSerializer):
     class Meta:
         model = AlertHistory
         fields = '__all__'
+
+
+class JobSerializer(serializers.ModelSerializer):
+    url = serializers.HyperlinkedIdentityField(view_name='job-detail')
+    stages = serializers.SerializerMethodField()
+    result = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Job
+        fields = ['id', 'url', 'kind', 'status', 'stage', 'stages', 'rows_processed', 'file_name',
+                  'dataset', 'result', 'error', 'created_at', 'started_at', 'finished_at']
+    
+    def get_stages(self, obj):
+        return obj.get_stages()
+    
+    def get_result(self, obj):
+        return obj.get_result()
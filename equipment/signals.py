@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .cache_store import get_cache_store
+from .column_store import delete_columns
+from .models import Dataset
+
+
+@receiver(post_delete, sender=Dataset)
+def remove_dataset_files(sender, instance, **kwargs):
+    """Remove on-disk artifacts and cache entries derived from a deleted dataset"""
+    delete_columns(instance.id)
+    get_cache_store().invalidate_dataset(instance.id)
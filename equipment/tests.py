@@ -1,3 +1,1249 @@
-from django.test import TestCase
+import gzip
+import io
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import LongTable
+from rest_framework.test import APIClient
+
+from . import anomaly_detection, charts, notifications
+from .alerts import AlertManager
+from .anomaly_detection import (
+    SEVERITIES, AnomalyDetector, current_detector_version, get_anomaly_results, get_dataset_health_summary,
+)
+from .cache_store import CacheStore, get_cache_store
+from .charts import dataset_chart
+from .column_store import (
+    ColumnStoreNotReady, ColumnStoreWriter, dataset_dir, delete_columns, load_columns, store_root,
+)
+from .dataset_stats import compute_statistics, get_dataset_statistics, summary_from_statistics
+from .ingest import CSVIngestor, IngestError, validate_csv_header
+from .jobs import start_job
+from .management.commands.benchmark_concurrency import run_workload
+from .model_registry import FLEET, current_model_id, get_baseline, model_root, retrain_baseline
+from .models import Dataset, Equipment, AlertRule, AlertHistory, Job, Notification
+from .pipeline import UploadPipeline, run_upload_job
+from .renderers import decode_columns, encode_columns
+from .reports import _equipment_listing, _large_dataset_sections, build_report_pdf
+from .retention import apply_retention, select_expired_datasets
+
+
+class QueryCountTestMixin:
+    """
+    Assert that an endpoint runs a fixed number of queries however many rows it lists
+
+    Subclasses implement add_rows(count) to create count more listed objects.
+    """
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, response.content[:500])
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, client, url, expected, grow_by=(1, 10)):
+        """Check url runs exactly expected queries after each growth step"""
+        for count in grow_by:
+            self.add_rows(count)
+            queries = self.count_queries(client, url)
+            self.assertEqual(
+                queries, expected,
+                f'{url} ran {queries} queries after adding {count} rows; expected {expected}'
+            )
+
+
+class TemporaryStorageMixin:
+    """Keep column stores, cached artifacts, spooled uploads and models out of MEDIA_ROOT"""
+
+    def use_temporary_storage(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        root = Path(self.tmp.name)
+        settings_override = override_settings(
+            COLUMN_STORE_DIR=root / 'columns', CACHE_STORE_DIR=root / 'cache', UPLOAD_SPOOL_DIR=root / 'uploads',
+            ANOMALY_MODEL_DIR=root / 'models',
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+
+class ListQueryCountTests(QueryCountTestMixin, TestCase):
+    """List views and admin changelists must not issue per-row queries"""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        self.client.force_login(self.user)
+
+        self.rule = AlertRule.objects.create(
+            name='High temperature', parameter='temperature', condition='greater_than', threshold=100
+        )
+
+    def add_rows(self, count):
+        for i in range(count):
+            dataset = Dataset.objects.create(file_name=f'data-{i}.csv', uploaded_by=self.user)
+            equipment = Equipment.objects.bulk_create([
+                Equipment(dataset=dataset, name=f'Unit-{i}-{j}', type='Pump',
+                          flowrate=100.0, pressure=20.0, temperature=150.0)
+                for j in range(3)
+            ])
+            alerts = AlertHistory.objects.bulk_create([
+                AlertHistory(equipment=item, rule=self.rule, parameter='temperature', value=150.0,
+                             threshold=100.0, message='Too hot', severity='high')
+                for item in equipment
+            ])
+            Notification.objects.bulk_create([
+                Notification(alert=alert, channel='email', recipient='ops@example.com', body='Too hot')
+                for alert in alerts
+            ])
+            Job.objects.create(kind='upload', file_name=dataset.file_name, dataset=dataset, created_by=self.user)
+
+    def test_dataset_list(self):
+        # One query: datasets with their annotated equipment counts
+        self.assertConstantQueries(self.api, '/api/datasets/', 1)
+
+    def test_alert_history_list(self):
+        # One query: alerts joined to equipment and rule
+        self.assertConstantQueries(self.api, '/api/alert-history/', 1)
+
+    def test_admin_changelists(self):
+        for model in ('dataset', 'equipment', 'alerthistory', 'job', 'notification'):
+            with self.subTest(model=model):
+                url = f'/admin/equipment/{model}/'
+                self.add_rows(1)
+                expected = self.count_queries(self.client, url)
+                self.assertConstantQueries(self.client, url, expected, grow_by=(5,))
+
+
+class AlertHistoryPaginationTests(TestCase):
+    """Keyset pagination walks every alert exactly once, newest first"""
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+
+        dataset = Dataset.objects.create(file_name='data.csv')
+        equipment = Equipment.objects.create(dataset=dataset, name='Unit-1', type='Pump',
+                                             flowrate=100.0, pressure=20.0, temperature=150.0)
+        alerts = AlertHistory.objects.bulk_create([
+            AlertHistory(equipment=equipment, parameter='temperature', value=150.0, threshold=100.0,
+                         message='Too hot', severity='high' if i % 2 else 'low')
+            for i in range(25)
+        ])
+        # Several alerts share each timestamp, so the id tie-breaker matters
+        base = timezone.now()
+        for i, alert in enumerate(alerts):
+            AlertHistory.objects.filter(id=alert.id).update(created_at=base - timedelta(minutes=i // 4))
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.api.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_all_alerts_in_order(self):
+        expected = list(AlertHistory.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/alert-history/?limit=7'), expected)
+
+    def test_filters_apply_to_every_page(self):
+        expected = list(AlertHistory.objects.filter(severity='high').order_by('-created_at', '-id')
+                        .values_list('id', flat=True))
+        self.assertEqual(self.walk('/api/alert-history/?limit=3&severity=high'), expected)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.api.get('/api/alert-history/?cursor=bogus').status_code, 404)
+
+
+class EquipmentPaginationTests(TemporaryStorageMixin, TestCase):
+    """Equipment pages seek on (ordering field, id), also when values repeat"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+
+        self.dataset = Dataset.objects.create(file_name='data.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit|{i % 9}', type=('Pump', 'Valve', 'Mixer')[i % 3],
+                      flowrate=float(i % 4) + 0.1, pressure=20.0, temperature=150.0 + i)
+            for i in range(40)
+        ])
+
+    def walk(self, url):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                response = self.api.get(url)
+            self.assertEqual(response.status_code, 200, response.content[:500])
+            self.assertFalse(any('OFFSET' in query['sql'] for query in context.captured_queries))
+            page = response.data.get('results', response.data.get('equipment_items'))
+            ids.extend(row['id'] for row in page)
+            url = response.data.get('next', response.data.get('equipment_next'))
+        return ids
+
+    def test_orderings_with_repeated_values(self):
+        equipment = Equipment.objects.filter(dataset=self.dataset)
+        for ordering in ('type', '-flowrate', 'name', '-pressure', '-id'):
+            with self.subTest(ordering=ordering):
+                tiebreak = '-id' if ordering.startswith('-') else 'id'
+                expected = list(equipment.order_by(ordering, tiebreak).values_list('id', flat=True))
+                url = f'/api/datasets/{self.dataset.id}/equipment/?page_size=6&ordering={ordering}'
+                self.assertEqual(self.walk(url), expected)
+                self.assertEqual(self.walk(f'{url}&fields=id'), expected)
+
+    def test_detail_continues_on_equipment_endpoint(self):
+        expected = list(Equipment.objects.filter(dataset=self.dataset, type='Pump')
+                        .order_by('name', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk(f'/api/datasets/{self.dataset.id}/?page_size=4&type=Pump'), expected)
+
+    def test_bad_requests(self):
+        url = f'/api/datasets/{self.dataset.id}/equipment/'
+        self.assertEqual(self.api.get(f'{url}?ordering=dataset').status_code, 400)
+        self.assertEqual(self.api.get(f'{url}?cursor=bogus').status_code, 404)
+        # A cursor whose value does not fit the requested ordering field
+        next_url = self.api.get(f'{url}?page_size=5&ordering=flowrate').data['next']
+        self.assertEqual(self.api.get(next_url.replace('ordering=flowrate', 'ordering=id')).status_code, 404)
+
+
+class LargeReportTests(TemporaryStorageMixin, TestCase):
+    """Reports over REPORT_MAX_TABLE_ROWS summarize instead of listing every row"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+
+        self.dataset = Dataset.objects.create(file_name='large.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit-{i:03d}', type='Pump' if i % 3 else 'Valve',
+                      flowrate=100.0 + i, pressure=20.0, temperature=500.0 if i % 10 == 0 else 150.0)
+            for i in range(60)
+        ])
+        self.columns = load_columns(self.dataset)
+        self.styles = getSampleStyleSheet()
+
+    def table_rows(self, elements):
+        return [row for element in elements if isinstance(element, LongTable)
+                for row in element._cellvalues[1:]]
+
+    @override_settings(REPORT_TABLE_CHUNK_ROWS=25)
+    def test_listing_is_chunked(self):
+        elements = _equipment_listing(self.columns, self.styles)
+        tables = [element for element in elements if isinstance(element, LongTable)]
+        self.assertEqual([len(table._cellvalues) for table in tables], [26, 26, 11])
+        self.assertEqual([row[0] for row in self.table_rows(elements)], [f'Unit-{i:03d}' for i in range(60)])
+
+    def test_large_mode_summarizes(self):
+        elements = _large_dataset_sections(self.dataset, self.columns, self.styles, max_rows=10, top_anomalies=3)
+        tables = [element for element in elements if isinstance(element, LongTable)]
+        type_rows, anomaly_rows = tables[0]._cellvalues[1:], tables[1]._cellvalues[1:]
+
+        self.assertEqual([row[:2] for row in type_rows], [['Pump', '40'], ['Valve', '20']])
+        self.assertEqual(len(anomaly_rows), 3)
+        results = get_anomaly_results(self.dataset)
+        worst = results.severity_code.max()
+        self.assertEqual({row[2] for row in anomaly_rows}, {SEVERITIES[worst]})
+
+    def test_build_switches_mode(self):
+        self.assertTrue(build_report_pdf(self.dataset, max_rows=10, top_anomalies=3).startswith(b'%PDF'))
+
+
+class ChartTests(TemporaryStorageMixin, TestCase):
+    """Chart PNGs are content-addressed and shared between datasets and requests"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+        self.datasets = [self.create_dataset(f'data-{i}.csv') for i in range(2)]
+
+    def create_dataset(self, file_name):
+        dataset = Dataset.objects.create(file_name=file_name)
+        Equipment.objects.bulk_create([
+            Equipment(dataset=dataset, name=f'Unit-{i}', type='Pump' if i % 2 else 'Valve',
+                      flowrate=100.0 + i, pressure=20.0 + i, temperature=150.0 + i)
+            for i in range(20)
+        ])
+        return dataset
+
+    def test_identical_data_shares_an_image(self):
+        for dataset in self.datasets:
+            dataset_chart(dataset, 'histograms')
+        dataset_chart(self.datasets[0], 'histograms', width=600, height=300)
+
+        charts = get_cache_store().stats()['namespaces']['charts']
+        self.assertEqual((charts['entries'], charts['hits'], charts['misses']), (2, 1, 2))
+
+    def test_sizes_share_one_figure(self):
+        sizes = []
+        for width, height, dpi in ((600, 300, 100), (480, 360, 72), (600, 300, 100), (800, 500, 150)):
+            png = dataset_chart(self.datasets[0], 'types', width=width, height=height, dpi=dpi)
+            sizes.append((int.from_bytes(png[16:20], 'big'), int.from_bytes(png[20:24], 'big')))
+            self.assertIsNotNone(charts._figures.figure)
+        self.assertEqual(sizes, [(600, 300), (480, 360), (600, 300), (800, 500)])
+        self.assertFalse(hasattr(charts._figures, 'by_size'))
+
+    def test_endpoint(self):
+        url = f'/api/datasets/{self.datasets[0].id}/charts/types.png'
+        response = self.api.get(url, HTTP_ACCEPT='image/png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertTrue(response.content.startswith(b'\x89PNG'))
+
+        self.assertEqual(self.api.get(url, HTTP_ACCEPT='image/png', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.api.get(f'{url}?dpi=1000').status_code, 400)
+        self.assertEqual(self.api.get(f'/api/datasets/{self.datasets[0].id}/charts/bogus.png').status_code, 404)
+
+
+class CacheStoreTests(TestCase):
+    """Size-bounded LRU eviction, dataset invalidation and counters"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = CacheStore(self.tmp.name, max_bytes=1000)
+
+    def test_get_and_counters(self):
+        self.assertIsNone(self.store.get('summaries', 'a'))
+        self.store.set_json('summaries', 'a', {'value': 1})
+        self.assertEqual(self.store.get_json('summaries', 'a'), {'value': 1})
+
+        summaries = self.store.stats()['namespaces']['summaries']
+        self.assertEqual((summaries['hits'], summaries['misses'], summaries['hit_rate']), (1, 1, 0.5))
+
+    def test_evicts_least_recently_used(self):
+        for key in ('a', 'b', 'c'):
+            self.store.set('reports', key, b'x' * 300)
+        # Make 'a' the most recently used
+        self.store._connection().execute("UPDATE entries SET accessed_at = accessed_at + 100 WHERE key = 'a'")
+
+        self.store.set('reports', 'd', b'x' * 300)
+        self.assertEqual(
+            [key for key in 'abcd' if self.store.contains('reports', key)], ['a', 'c', 'd']
+        )
+        self.assertFalse(self.store.path('reports', 'b').exists())
+        self.assertEqual(self.store.stats()['namespaces']['reports']['evictions'], 1)
+
+    def test_invalidate_dataset(self):
+        self.store.set('reports', '1', b'pdf', datasets=[1])
+        self.store.set('summaries', 'trends', b'{}', datasets=[1, 2])
+        self.store.set('reports', '2', b'pdf', datasets=[2])
+
+        self.assertEqual(self.store.invalidate_dataset(1), 2)
+        self.assertEqual(
+            [self.store.contains(*entry) for entry in (('reports', '1'), ('summaries', 'trends'), ('reports', '2'))],
+            [False, False, True]
+        )
+
+    def test_stats_endpoint_is_admin_only(self):
+        api = APIClient()
+        api.force_authenticate(User.objects.create_user('user', password='password'))
+        self.assertEqual(api.get('/api/cache/stats/').status_code, 403)
+
+        api.force_authenticate(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        with override_settings(CACHE_STORE_DIR=Path(self.tmp.name) / 'shared'):
+            response = api.get('/api/cache/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['namespaces']), {'reports', 'anomalies', 'summaries', 'charts'})
+
+
+class ConcurrentDatabaseTests(TransactionTestCase):
+    """Parallel ingest writes, reads and read-then-write transactions never hit 'database is locked'"""
+
+    def test_connection_settings(self):
+        with connection.cursor() as cursor:
+            pragmas = {}
+            for pragma in ('journal_mode', 'synchronous', 'busy_timeout'):
+                cursor.execute(f'PRAGMA {pragma}')
+                pragmas[pragma] = cursor.fetchone()[0]
+        self.assertEqual(pragmas, {'journal_mode': 'wal', 'synchronous': 1, 'busy_timeout': 20000})
+
+    def test_parallel_writes_and_reads(self):
+        result = run_workload('default', writers=3, readers=3, rows=4000, chunk_size=500)
+
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(result['rows'], 12000)
+        self.assertEqual(Equipment.objects.count(), 12000)
+        self.assertGreater(result['reads'], 0)
+
+
+class RawUploadTests(TemporaryStorageMixin, TestCase):
+    """Raw text/csv upload bodies, plain and gzip-encoded"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        for target in ('equipment.pipeline.submit', 'equipment.pipeline.schedule_report',
+                       'equipment.pipeline.schedule_retention', 'equipment.notifications.submit_coalesced'):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user('uploader', password='password')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        rows = [f'Unit-{i},{("Pump", "Valve")[i % 2]},{100 + i}.5,{5 + i % 3}.0,{120 + i}.0' for i in range(50)]
+        self.csv = ('Equipment Name,Type,Flowrate,Pressure,Temperature\n' + '\n'.join(rows) + '\n').encode()
+
+    def upload(self, body, **headers):
+        return self.api.post('/api/datasets/upload/?async=false', body, content_type='text/csv', **headers)
+
+    def test_gzip_body(self):
+        response = self.upload(
+            gzip.compress(self.csv), HTTP_CONTENT_ENCODING='gzip',
+            HTTP_CONTENT_DISPOSITION='attachment; filename="plant-a.csv"',
+        )
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        dataset = Dataset.objects.get(pk=response.data['id'])
+        self.assertEqual(dataset.file_name, 'plant-a.csv')
+        self.assertEqual(dataset.equipment_items.count(), 50)
+
+    def test_plain_body_with_query_file_name(self):
+        response = self.api.post('/api/datasets/upload/?async=false&file_name=plain.csv', self.csv,
+                                 content_type='text/csv')
+        self.assertEqual(response.status_code, 201, response.content[:500])
+        self.assertEqual(Dataset.objects.get(pk=response.data['id']).file_name, 'plain.csv')
+
+    def test_bad_bodies(self):
+        self.assertEqual(self.upload(gzip.compress(self.csv)[:-20], HTTP_CONTENT_ENCODING='gzip').status_code, 400)
+        self.assertEqual(self.upload(self.csv, HTTP_CONTENT_ENCODING='br').status_code, 415)
+        with override_settings(UPLOAD_MAX_DECOMPRESSED_BYTES=1000):
+            self.assertEqual(self.upload(gzip.compress(self.csv), HTTP_CONTENT_ENCODING='gzip').status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+
+
+class IngestorTests(TemporaryStorageMixin, TestCase):
+    """Chunked CSV ingest: validation messages, empty files and chunk boundaries"""
+
+    HEADER = 'Equipment Name,Type,Flowrate,Pressure,Temperature\n'
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.dataset = Dataset.objects.create(file_name='ingest.csv')
+
+    def csv(self, rows):
+        return io.BytesIO((self.HEADER + ''.join(f'{row}\n' for row in rows)).encode())
+
+    def rows(self, count):
+        return [f'Unit-{i},Pump,{100 + i}.0,{5 + i}.0,{150 + i}.0' for i in range(count)]
+
+    def test_chunk_boundaries(self):
+        progress = []
+        summary = CSVIngestor(self.csv(self.rows(7)), chunk_size=3).ingest(self.dataset, progress.append)
+
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertEqual(summary['total_count'], 7)
+        self.assertEqual(list(self.dataset.equipment_items.order_by('id').values_list('name', flat=True)),
+                         [f'Unit-{i}' for i in range(7)])
+        columns = load_columns(self.dataset)
+        self.assertEqual(columns.flowrate.tolist(), [100.0 + i for i in range(7)])
+        self.assertEqual(columns.names(), [f'Unit-{i}' for i in range(7)])
+
+    def test_rows_match_per_row_construction(self):
+        rows = ['Pump 1,Pump,120,5.2,110.5', 'Valve-2,Valve,1e2,0.75,90', '42,Mixer, 3.5 ,7,-12.25']
+        ingestor = CSVIngestor(self.csv(rows))
+        chunk = next(ingestor.chunks())
+        equipment = ingestor.build_equipment(self.dataset, ingestor.parse_chunk(chunk))
+
+        expected = [
+            (str(row['Equipment Name']), str(row['Type']),
+             float(row['Flowrate']), float(row['Pressure']), float(row['Temperature']))
+            for _, row in chunk.iterrows()
+        ]
+        self.assertEqual([(e.name, e.type, e.flowrate, e.pressure, e.temperature) for e in equipment], expected)
+        self.assertTrue(all(type(e.flowrate) is float and e.dataset_id == self.dataset.id for e in equipment))
+
+    def test_errors_report_file_line_numbers(self):
+        rows = self.rows(8)
+        rows[4] = 'Unit-4,Pump,fast,5.0,150.0'
+        with self.assertRaisesMessage(IngestError, 'Invalid or missing Flowrate value on line(s) 6'):
+            CSVIngestor(self.csv(rows), chunk_size=3).ingest(self.dataset)
+        self.assertFalse(dataset_dir(self.dataset.id).exists())
+
+    def test_long_error_lists_are_truncated(self):
+        rows = [f'Unit-{i},,1.0,1.0,1.0' for i in range(8)]
+        with self.assertRaisesMessage(IngestError, 'Type value on line(s) 2, 3, 4, 5, 6 and 3 more'):
+            CSVIngestor(self.csv(rows)).ingest(self.dataset)
+
+    def test_empty_files(self):
+        with self.assertRaisesMessage(IngestError, 'The uploaded file is empty'):
+            CSVIngestor(io.BytesIO(b''))
+        with self.assertRaisesMessage(IngestError, 'The uploaded file is empty'):
+            validate_csv_header(io.BytesIO(b''))
+        with self.assertRaisesMessage(IngestError, 'Missing required columns: Type'):
+            CSVIngestor(io.BytesIO(b'Equipment Name,Flowrate,Pressure,Temperature\n'))
+
+        summary = CSVIngestor(self.csv([])).ingest(self.dataset)
+        self.assertEqual(summary['total_count'], 0)
+
+
+class StatisticsTests(TemporaryStorageMixin, TestCase):
+    """The single-pass statistics engine agrees with pandas and backfills old datasets"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+
+    def test_matches_pandas(self):
+        rng = np.random.default_rng(3)
+        frame = pd.DataFrame({
+            'flowrate': rng.normal(100, 15, 501),
+            'pressure': rng.uniform(1, 9, 501),
+            'temperature': rng.normal(150, 30, 501),
+        })
+        types = pd.Series(rng.choice(['Pump', 'Valve', 'Mixer'], 501, p=[0.5, 0.3, 0.2]))
+        statistics = compute_statistics(
+            {parameter: frame[parameter].to_numpy() for parameter in frame}, types.value_counts().to_dict()
+        )
+
+        self.assertEqual(statistics['count'], 501)
+        for parameter in frame:
+            described = frame[parameter].describe()
+            stats = statistics['parameters'][parameter]
+            for name, key in (('mean', 'mean'), ('min', 'min'), ('q1', '25%'), ('median', '50%'),
+                              ('q3', '75%'), ('max', 'max')):
+                self.assertAlmostEqual(stats[name], described[key], places=9)
+            self.assertAlmostEqual(stats['std'], frame[parameter].std(ddof=0), places=9)
+        self.assertEqual(list(statistics['type_counts'].items()), list(types.value_counts().items()))
+
+    def test_empty_dataset(self):
+        statistics = compute_statistics(dict.fromkeys(('flowrate', 'pressure', 'temperature'), np.empty(0)), {})
+        summary = summary_from_statistics(statistics)
+        self.assertEqual(summary['total_count'], 0)
+        self.assertEqual((summary['avg_flowrate'], summary['max_temperature']), (0.0, 0.0))
+
+    def test_backfills_stored_statistics(self):
+        dataset = Dataset.objects.create(file_name='legacy.csv')
+        dataset.set_summary({'total_count': 3})
+        dataset.save()
+        Equipment.objects.bulk_create([
+            Equipment(dataset=dataset, name=f'Unit-{i}', type='Pump', flowrate=float(i), pressure=1.0, temperature=2.0)
+            for i in range(3)
+        ])
+
+        statistics = get_dataset_statistics(dataset)
+        self.assertEqual(statistics['parameters']['flowrate']['mean'], 1.0)
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.get_summary()['statistics'], statistics)
+        with self.assertNumQueries(0):
+            get_dataset_statistics(dataset)
+
+
+class JobTests(TemporaryStorageMixin, TestCase):
+    """Background uploads run through the job endpoint and abandoned jobs are failed"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.user = User.objects.create_user('uploader', password='password')
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        for target in ('equipment.pipeline.submit', 'equipment.pipeline.schedule_report',
+                       'equipment.pipeline.schedule_retention'):
+            patcher = mock.patch(target)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_async_upload(self):
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,10,2,30\nV-1,Valve,5,1,20\n'
+        with mock.patch('equipment.views.submit_job') as submit_job:
+            response = self.api.post('/api/datasets/upload/?async=true&file_name=plant.csv', csv,
+                                     content_type='text/csv')
+        self.assertEqual(response.status_code, 202, response.content[:500])
+        self.assertEqual(self.api.get(response['Location']).data['status'], 'pending')
+
+        func, job_id, path = submit_job.call_args.args
+        func(job_id, path)
+        job = self.api.get(response['Location']).data
+        self.assertEqual((job['status'], job['rows_processed']), ('succeeded', 2))
+        dataset = Dataset.objects.get(pk=job['dataset'])
+        self.assertEqual((dataset.status, dataset.equipment_items.count()), ('ready', 2))
+        self.assertFalse(Path(path).exists())
+
+    def test_stale_jobs_are_failed(self):
+        stale_at = timezone.now() - timedelta(hours=1)
+        running = Job.objects.create(kind='upload', status='running', heartbeat_at=stale_at)
+        pending = Job.objects.create(kind='upload', heartbeat_at=stale_at)
+        live = Job.objects.create(kind='upload', status='running')
+
+        self.assertEqual(self.api.get(f'/api/jobs/{running.id}/').data['status'], 'failed')
+        pending.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((pending.status, live.status), ('failed', 'running'))
+        self.assertIsNotNone(pending.finished_at)
+
+        # A reaped job that reaches a worker late does not run
+        spool = Path(self.tmp.name) / 'late.csv'
+        spool.write_bytes(b'Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+        run_upload_job(pending.id, spool)
+        pending.refresh_from_db()
+        self.assertEqual(pending.status, 'failed')
+        self.assertFalse(spool.exists())
+        self.assertIsNone(start_job(pending.id))
+
+    def test_processing_datasets_are_hidden(self):
+        ready = Dataset.objects.create(file_name='ready.csv')
+        processing = Dataset.objects.create(file_name='loading.csv', status='processing')
+
+        self.assertEqual([row['id'] for row in self.api.get('/api/datasets/').data], [ready.id])
+        self.assertEqual(self.api.get(f'/api/datasets/{processing.id}/').status_code, 404)
+        self.assertEqual(self.api.get(f'/api/datasets/{processing.id}/summary/').status_code, 404)
+        self.assertEqual(self.api.get(f'/api/datasets/{ready.id}/').status_code, 200)
+
+    def test_retention_skips_uploads_in_progress(self):
+        old = timezone.now() - timedelta(hours=1)
+        ready = Dataset.objects.create(file_name='ready.csv')
+        loading = Dataset.objects.create(file_name='loading.csv', status='processing')
+        slow = Dataset.objects.create(file_name='slow.csv', status='processing')
+        abandoned = Dataset.objects.create(file_name='abandoned.csv', status='processing')
+        Dataset.objects.filter(id__in=[slow.id, abandoned.id]).update(upload_date=old)
+        Job.objects.create(kind='upload', status='running', dataset=slow)
+        Job.objects.create(kind='upload', status='running', dataset=abandoned, heartbeat_at=old)
+
+        self.assertEqual(select_expired_datasets(keep_latest=1), [abandoned.id])
+        self.assertEqual(select_expired_datasets(keep_latest=0), sorted([ready.id, abandoned.id]))
+        self.assertNotIn(loading.id, select_expired_datasets(max_age_days=0))
+
+    def test_retention_skips_inline_upload_in_progress(self):
+        removed = []
+
+        class SlowIngestor(CSVIngestor):
+            def ingest(self, dataset, progress_callback=None):
+                def progress(rows_processed):
+                    progress_callback(rows_processed)
+                    if rows_processed == 2:
+                        # Another upload's retention run comes by long after this one started
+                        Dataset.objects.filter(pk=dataset.pk).update(upload_date=timezone.now() - timedelta(hours=1))
+                        removed.append(apply_retention(keep_latest=10)['datasets'])
+                return super().ingest(dataset, progress_callback=progress)
+
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + b''.join(
+            f'P-{i},Pump,{10 + i},2,30\n'.encode() for i in range(4)
+        )
+        dataset, result = UploadPipeline('inline.csv', user=self.user).run(
+            None, ingestor=SlowIngestor(io.BytesIO(csv), chunk_size=2)
+        )
+
+        self.assertEqual(removed, [0])
+        dataset.refresh_from_db()
+        self.assertEqual(dataset.status, 'ready')
+        self.assertEqual(dataset.equipment_items.count(), 4)
+        job = Job.objects.get(dataset=dataset)
+        self.assertEqual((job.kind, job.status, job.rows_processed), ('upload', 'succeeded', 4))
+
+    def test_failed_inline_upload_fails_its_job(self):
+        ingestor = CSVIngestor(io.BytesIO(b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,x,2,30\n'))
+        with self.assertRaises(IngestError):
+            UploadPipeline('broken.csv', user=self.user).run(None, ingestor=ingestor)
+
+        self.assertFalse(Dataset.objects.exists())
+        job = Job.objects.get(file_name='broken.csv')
+        self.assertEqual((job.status, job.dataset), ('failed', None))
+        self.assertTrue(job.error)
+
+    def test_failed_alerts_stage_removes_the_upload(self):
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,10,2,30\nV-1,Valve,5,1,20\n'
+        with mock.patch('equipment.pipeline.AlertManager.check_dataset', side_effect=RuntimeError('rules broke')):
+            response = self.api.post('/api/datasets/upload/?async=false&file_name=plant.csv', csv,
+                                     content_type='text/csv')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Dataset.objects.exists())
+        self.assertFalse(Equipment.objects.exists())
+        self.assertEqual(list(store_root().iterdir()) if store_root().exists() else [], [])
+        job = Job.objects.get(file_name='plant.csv')
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.get_stages()[1]['status'], 'failed')
+
+    def test_retention_dry_run_leaves_jobs_alone(self):
+        old = timezone.now() - timedelta(hours=1)
+        abandoned = Dataset.objects.create(file_name='abandoned.csv', status='processing')
+        Dataset.objects.filter(pk=abandoned.pk).update(upload_date=old)
+        job = Job.objects.create(kind='upload', status='running', dataset=abandoned, heartbeat_at=old)
+
+        self.assertEqual(apply_retention(keep_latest=10, dry_run=True)['datasets'], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+
+        self.assertEqual(apply_retention(keep_latest=10)['datasets'], 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+
+class ColumnStoreTests(TemporaryStorageMixin, TestCase):
+    """Column stores round-trip, rebuild from the Equipment table and tolerate concurrent writers"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.dataset = Dataset.objects.create(file_name='columns.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Ünit-{i}', type=('Pump', 'Valve', 'Mixer')[i % 3],
+                      flowrate=10.0 + i, pressure=1.5 * i, temperature=100.0 - i)
+            for i in range(25)
+        ])
+
+    def chunk(self, start, stop):
+        rows = self.dataset.equipment_items.order_by('id')[start:stop]
+        return {
+            'id': np.array([row.id for row in rows], dtype=np.int64),
+            'name': np.array([row.name for row in rows], dtype=object),
+            'type': np.array([row.type for row in rows], dtype=object),
+            'flowrate': np.array([row.flowrate for row in rows]),
+            'pressure': np.array([row.pressure for row in rows]),
+            'temperature': np.array([row.temperature for row in rows]),
+        }
+
+    def assertMatchesDatabase(self, columns):
+        rows = list(self.dataset.equipment_items.order_by('id').values_list('id', 'name', 'type', 'flowrate'))
+        self.assertEqual(len(columns), 25)
+        self.assertEqual(columns.id.tolist(), [row[0] for row in rows])
+        self.assertEqual(columns.names(), [row[1] for row in rows])
+        self.assertEqual(columns.names([3, 7]), [rows[3][1], rows[7][1]])
+        self.assertEqual([columns.type_labels[code] for code in columns.type_code], [row[2] for row in rows])
+        self.assertEqual(columns.flowrate.tolist(), [row[3] for row in rows])
+        self.assertEqual(columns.type_counts(), {'Pump': 9, 'Valve': 8, 'Mixer': 8})
+
+    def test_round_trip(self):
+        writer = ColumnStoreWriter(self.dataset.id)
+        for start in range(0, 25, 10):
+            writer.append(self.chunk(start, start + 10))
+        writer.append(self.chunk(25, 25))
+        self.assertMatchesDatabase(writer.finalize())
+        self.assertMatchesDatabase(load_columns(self.dataset))
+        self.assertEqual([path.name for path in store_root().iterdir()], [str(self.dataset.id)])
+
+    def test_rebuilds_missing_or_outdated_stores(self):
+        self.assertFalse(dataset_dir(self.dataset.id).exists())
+        self.assertMatchesDatabase(load_columns(self.dataset))
+
+        meta_path = dataset_dir(self.dataset.id) / 'meta.json'
+        meta_path.write_text(meta_path.read_text().replace('"format": 1', '"format": 0'))
+        self.assertMatchesDatabase(load_columns(self.dataset))
+
+        delete_columns(self.dataset.id)
+        self.assertFalse(dataset_dir(self.dataset.id).exists())
+
+    def test_concurrent_writers(self):
+        ingest = ColumnStoreWriter(self.dataset.id)
+        ingest.append(self.chunk(0, 10))
+
+        # A rebuild started meanwhile must not touch the ingest's files
+        rebuild = ColumnStoreWriter(self.dataset.id)
+        rebuild.append(self.chunk(0, 25))
+        rebuild.finalize()
+
+        ingest.append(self.chunk(10, 25))
+        self.assertMatchesDatabase(ingest.finalize())
+        self.assertEqual([path.name for path in store_root().iterdir()], [str(self.dataset.id)])
+
+    def test_no_rebuild_during_upload(self):
+        Dataset.objects.filter(pk=self.dataset.pk).update(status='processing')
+        with self.assertRaises(ColumnStoreNotReady):
+            load_columns(self.dataset)
+        self.assertFalse(dataset_dir(self.dataset.id).exists())
+
+        writer = ColumnStoreWriter(self.dataset.id)
+        delete_columns(self.dataset.id)
+        self.assertFalse(writer.tmp_directory.exists())
+        writer.abort()
+
+
+class RetentionTests(TemporaryStorageMixin, TestCase):
+    """Set-based retention removes every dependent row and still runs Dataset cleanup"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        rule = AlertRule.objects.create(name='Hot', parameter='temperature', condition='greater_than',
+                                        threshold=100, send_telegram=True, telegram_chat_id='42')
+        self.datasets = []
+        for i in range(3):
+            dataset = Dataset.objects.create(file_name=f'plant-{i}.csv')
+            equipment = Equipment.objects.bulk_create([
+                Equipment(dataset=dataset, name=f'Unit-{j}', type='Pump', flowrate=1.0, pressure=1.0,
+                          temperature=150.0)
+                for j in range(4)
+            ])
+            for item in equipment:
+                alert = AlertHistory.objects.create(equipment=item, rule=rule, parameter='temperature',
+                                                    value=150.0, threshold=100, message='Hot', severity='high')
+                Notification.objects.create(alert=alert, channel='telegram', recipient='42', body='Hot')
+            load_columns(dataset)
+            get_cache_store().set('summaries', f'dataset-{dataset.id}', b'{}', datasets=[dataset.id])
+            self.datasets.append(dataset)
+        Dataset.objects.filter(pk=self.datasets[0].pk).update(upload_date=timezone.now() - timedelta(days=1))
+
+    def test_deletes_dependent_rows_and_files(self):
+        expired, kept = self.datasets[0], self.datasets[1:]
+        self.assertEqual(apply_retention(keep_latest=2, dry_run=True)['equipment'], 4)
+        self.assertTrue(Dataset.objects.filter(pk=expired.pk).exists())
+
+        result = apply_retention(keep_latest=2, batch_size=1)
+        self.assertEqual((result['datasets'], result['equipment'], result['alerts']), (1, 4, 4))
+        self.assertEqual(list(Dataset.objects.order_by('id')), kept)
+        self.assertEqual(Equipment.objects.count(), 8)
+        self.assertEqual(AlertHistory.objects.count(), 8)
+        self.assertEqual(Notification.objects.count(), 8)
+        self.assertFalse(Equipment.objects.filter(dataset_id=expired.pk).exists())
+
+        # post_delete still fired for the dataset row
+        self.assertFalse(dataset_dir(expired.id).exists())
+        self.assertIsNone(get_cache_store().get('summaries', f'dataset-{expired.id}'))
+        self.assertTrue(dataset_dir(kept[0].id).exists())
+        self.assertIsNotNone(get_cache_store().get('summaries', f'dataset-{kept[0].id}'))
+
+    def test_max_age(self):
+        self.assertEqual(select_expired_datasets(max_age_days=0.5), [self.datasets[0].id])
+        self.assertEqual(select_expired_datasets(keep_latest=None, max_age_days=None), [])
+
+
+class AlertRuleTests(TemporaryStorageMixin, TestCase):
+    """Column-wise rule evaluation matches evaluating each Equipment row"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.dataset = Dataset.objects.create(file_name='alerts.csv')
+        rng = np.random.default_rng(7)
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit-{i}', type='Pump', flowrate=float(rng.integers(50, 150)),
+                      pressure=round(float(rng.uniform(0, 10)), 1), temperature=float(rng.normal(150, 40)))
+            for i in range(300)
+        ])
+        for name, parameter, condition, threshold, bounds in (
+            ('Fast', 'flowrate', 'greater_than', 140, (None, None)),
+            ('Cold', 'temperature', 'less_than', 80, (None, None)),
+            ('Exact', 'flowrate', 'equals', 100, (None, None)),
+            ('Band', 'pressure', 'between', 0, (2.5, 3.0)),
+        ):
+            AlertRule.objects.create(name=name, parameter=parameter, condition=condition, threshold=threshold,
+                                     min_value=bounds[0], max_value=bounds[1], severity='high')
+        AlertRule.objects.create(name='Off', parameter='flowrate', condition='greater_than', threshold=0,
+                                 is_active=False)
+
+    def test_matches_per_row_evaluation(self):
+        manager = AlertManager()
+        expected = sorted(
+            (equipment.id, rule.id, getattr(equipment, rule.parameter), manager.generate_message(equipment, rule))
+            for equipment in self.dataset.equipment_items.all()
+            for rule in manager.get_rules()
+            if manager.evaluate_rule(equipment, rule)
+        )
+        self.assertTrue(expected)
+        self.assertEqual({rule_id for _, rule_id, _, _ in expected}, set(
+            AlertRule.objects.filter(is_active=True).values_list('id', flat=True)
+        ))
+
+        # Rules, then one bulk insert; rows come from the column store
+        load_columns(self.dataset)
+        with self.assertNumQueries(2):
+            alerts = AlertManager().check_dataset(self.dataset)
+        self.assertEqual(len(alerts), len(expected))
+        stored = sorted(AlertHistory.objects.values_list('equipment_id', 'rule_id', 'value', 'message'))
+        self.assertEqual(stored, expected)
+
+
+class FailingTransport:
+    """Fail every send"""
+
+    def send_email(self, notifications):
+        return {notification.id: 'SMTP down' for notification in notifications}
+
+    send_telegram = send_email
+
+
+@override_settings(NOTIFICATION_TRANSPORT='stub')
+class NotificationTests(TestCase):
+    """Outbox claims, delivery, retry backoff and the retry timer"""
+
+    def setUp(self):
+        notifications.StubTransport.sent = []
+        rule = AlertRule.objects.create(name='Hot', parameter='temperature', condition='greater_than', threshold=100,
+                                        send_email=True, email_recipients='ops@example.com',
+                                        send_telegram=True, telegram_chat_id='42')
+        self.dataset = Dataset.objects.create(file_name='plant.csv')
+        equipment = Equipment.objects.create(dataset=self.dataset, name='R-1', type='Reactor', flowrate=1,
+                                             pressure=1, temperature=150)
+        self.alert = AlertHistory.objects.create(equipment=equipment, rule=rule, parameter='temperature',
+                                                 value=150, threshold=100, message='Hot', severity='high')
+        with mock.patch('equipment.notifications.schedule_dispatch') as schedule_dispatch:
+            self.assertEqual(notifications.enqueue_notifications([(self.alert, 'R-1')], self.dataset), 2)
+        schedule_dispatch.assert_called_once_with()
+
+    def test_stub_delivery(self):
+        counts = notifications.NotificationDispatcher().dispatch_pending()
+        self.assertEqual(counts, {'sent': 2, 'retrying': 0, 'failed': 0})
+        self.assertEqual(sorted(sent['channel'] for sent in notifications.StubTransport.sent), ['email', 'telegram'])
+        self.assertIn('Dataset: plant.csv', notifications.StubTransport.sent[0]['body'])
+        self.alert.refresh_from_db()
+        self.assertTrue(self.alert.email_sent and self.alert.telegram_sent)
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+
+    def test_claims_are_exclusive(self):
+        first = notifications.NotificationDispatcher().claim_batch()
+        self.assertEqual(len(first), 2)
+        self.assertEqual(notifications.NotificationDispatcher().claim_batch(), [])
+
+        # A claim left behind by a crashed dispatcher can be taken over
+        Notification.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        second = notifications.NotificationDispatcher().claim_batch()
+        self.assertEqual({n.id for n in second}, {n.id for n in first})
+        self.assertNotEqual(second[0].claim_token, first[0].claim_token)
+
+    def test_retries_back_off_then_fail(self):
+        dispatcher = notifications.NotificationDispatcher(transport=FailingTransport(), max_attempts=3,
+                                                          backoff_seconds=10)
+        started = timezone.now()
+        self.assertEqual(dispatcher.dispatch_pending(), {'sent': 0, 'retrying': 2, 'failed': 0})
+        # Not due yet
+        self.assertEqual(dispatcher.dispatch_pending(), {'sent': 0, 'retrying': 0, 'failed': 0})
+
+        delays = []
+        for attempt in (1, 2):
+            notification = Notification.objects.first()
+            self.assertEqual((notification.status, notification.attempts), ('pending', attempt))
+            self.assertEqual(notification.last_error, 'SMTP down')
+            delays.append(round((notification.next_attempt_at - started).total_seconds()))
+            Notification.objects.update(next_attempt_at=started)
+            counts = dispatcher.dispatch_pending()
+        self.assertEqual(delays, [10, 20])
+        self.assertEqual(counts, {'sent': 0, 'retrying': 0, 'failed': 2})
+        self.assertEqual(set(Notification.objects.values_list('status', 'attempts')), {('failed', 3)})
+
+    def test_retry_timer(self):
+        self.addCleanup(setattr, notifications, '_retry_timer', None)
+        later = timezone.now() + timedelta(minutes=5)
+        Notification.objects.update(next_attempt_at=later)
+
+        with mock.patch('equipment.notifications.threading.Timer') as timer:
+            timer.return_value.is_alive.return_value = True
+            self.assertEqual(notifications.schedule_next_retry(), later)
+            delay, callback = timer.call_args.args
+            self.assertAlmostEqual(delay, 300, delta=5)
+            self.assertIs(callback, notifications.schedule_dispatch)
+
+            # A later retry keeps the existing timer; an earlier one replaces it
+            timer.return_value.due_at = later
+            Notification.objects.filter(channel='email').update(next_attempt_at=later + timedelta(minutes=5))
+            self.assertEqual(notifications.schedule_next_retry(), later)
+            self.assertEqual(timer.call_count, 1)
+            sooner = timezone.now() + timedelta(minutes=1)
+            Notification.objects.filter(channel='email').update(next_attempt_at=sooner)
+            self.assertEqual(notifications.schedule_next_retry(), sooner)
+            self.assertEqual(timer.call_count, 2)
+            timer.return_value.cancel.assert_called_once_with()
+
+        Notification.objects.update(status='sent')
+        self.assertIsNone(notifications.schedule_next_retry())
+
+    def test_dispatcher_run_schedules_retries(self):
+        with mock.patch('equipment.notifications.schedule_next_retry') as schedule_next_retry:
+            notifications.run_dispatcher()
+        schedule_next_retry.assert_called_once_with()
+
+
+class AnomalyResultTests(TemporaryStorageMixin, TestCase):
+    """Anomaly results are computed once per detector version and stored in the cache store"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.dataset = Dataset.objects.create(file_name='anomalies.csv')
+        rng = np.random.default_rng(11)
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit-{i:02d}', type='Pump', flowrate=float(rng.normal(100, 5)),
+                      pressure=float(rng.normal(10, 1)), temperature=900.0 if i == 7 else float(rng.normal(150, 5)))
+            for i in range(40)
+        ])
+        patcher = mock.patch.object(AnomalyDetector, 'detect_anomalies_for_columns', autospec=True,
+                                    side_effect=AnomalyDetector.detect_anomalies_for_columns)
+        self.detect = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_results_are_persisted(self):
+        results = get_anomaly_results(self.dataset)
+        self.assertEqual(len(results), 40)
+        self.assertEqual(get_cache_store().stats()['namespaces']['anomalies']['entries'], 1)
+
+        # Read back from disk by a fresh store, as another worker process would
+        with mock.patch('equipment.cache_store._store', None):
+            again = get_anomaly_results(self.dataset)
+        self.assertEqual(self.detect.call_count, 1)
+        for name in again.ARRAYS:
+            self.assertEqual(getattr(again, name).tolist(), getattr(results, name).tolist())
+
+        health = get_dataset_health_summary(self.dataset)
+        self.assertEqual(health, get_dataset_health_summary(self.dataset))
+        self.assertEqual(self.detect.call_count, 1)
+
+    def test_new_detector_version_recomputes(self):
+        get_anomaly_results(self.dataset)
+        with override_settings(ANOMALY_DETECTION={'z_threshold': 2.5}):
+            get_anomaly_results(self.dataset)
+            get_anomaly_results(self.dataset)
+        self.assertEqual(self.detect.call_count, 2)
+        self.assertEqual(get_cache_store().stats()['namespaces']['anomalies']['entries'], 2)
+
+    def test_lock_stripes(self):
+        self.assertIs(anomaly_detection._results_lock(5), anomaly_detection._results_lock(5))
+        locks = {id(anomaly_detection._results_lock(dataset_id)) for dataset_id in range(10000)}
+        self.assertEqual(len(locks), anomaly_detection.RESULTS_LOCK_STRIPES)
+
+
+class ModelRegistryTests(TemporaryStorageMixin, TestCase):
+    """Trained baselines are published through current.json and picked up by detection"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        rng = np.random.default_rng(5)
+        self.datasets = []
+        for i in range(2):
+            dataset = Dataset.objects.create(file_name=f'history-{i}.csv')
+            Equipment.objects.bulk_create([
+                Equipment(dataset=dataset, name=f'Unit-{j}', type=('Pump', 'Valve')[j % 2],
+                          flowrate=float(rng.normal(100, 5)), pressure=float(rng.normal(10, 1)),
+                          temperature=float(rng.normal(150, 5)))
+                for j in range(60)
+            ])
+            self.datasets.append(dataset)
+        Dataset.objects.create(file_name='loading.csv', status='processing')
+
+    def retrain(self):
+        return retrain_baseline(n_jobs=1, min_type_rows=50)
+
+    def test_current_switch(self):
+        self.assertIsNone(current_model_id())
+        self.assertIsNone(get_baseline())
+        unversioned = current_detector_version()
+
+        first = self.retrain()
+        self.assertEqual(current_model_id(), first.model_id)
+        self.assertEqual(sorted(first.meta['datasets']), [dataset.id for dataset in self.datasets])
+        self.assertEqual(set(first.models), {FLEET, 'Pump', 'Valve'})
+        results = get_anomaly_results(self.datasets[0])
+        first_version = current_detector_version()
+        self.assertNotEqual(first_version, unversioned)
+        self.assertEqual(results.version, first_version)
+
+        second = self.retrain()
+        self.assertNotEqual(second.model_id, first.model_id)
+        self.assertEqual(get_baseline().model_id, second.model_id)
+        self.assertNotIn(current_detector_version(), (unversioned, first_version))
+        self.assertEqual(get_anomaly_results(self.datasets[0]).version, current_detector_version())
+
+    def test_pruning_keeps_current(self):
+        with override_settings(ANOMALY_BASELINE_KEEP=1):
+            for _ in range(3):
+                baseline = self.retrain()
+        self.assertEqual([path.name for path in model_root().glob('baseline-*.joblib')],
+                         [f'baseline-{baseline.model_id}.joblib'])
+        self.assertEqual(get_baseline().model_id, baseline.model_id)
+
+    def test_unreadable_current_file(self):
+        self.retrain()
+        (model_root() / 'current.json').write_text('{not json')
+        self.assertIsNone(current_model_id())
+        self.assertIsNone(get_baseline())
+
+
+class ColumnarFrameTests(TemporaryStorageMixin, TestCase):
+    """EQCF frames round-trip every column kind and match the JSON listing"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+        self.dataset = Dataset.objects.create(file_name='frame.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Pompe-{i} ñ' if i % 2 else f'Unit-{i}',
+                      type=('Pump', 'Valve', 'Reactor')[i % 3], flowrate=100.25 + i, pressure=123456.78 + i,
+                      temperature=-i)
+            for i in range(30)
+        ])
+
+    def test_round_trip(self):
+        payload = encode_columns({
+            'id': np.arange(5, dtype=np.int64),
+            'flag': np.array([True, False, True, True, False]),
+            'flowrate': np.array([1.5, 2.25, -3.0, 123456.78, 98765432.01]),
+            'type': np.array(['Pump', 'Valve', 'Pump', 'Mixer', 'Pump'], dtype=object),
+            'name': np.array(['a', 'ñandú', '', 'd|e', '日本'], dtype=object),
+        }, meta={'next': None, 'count': 5})
+
+        header_len = int.from_bytes(payload[8:12], 'little')
+        self.assertEqual((12 + header_len) % 8, 0)
+        meta, columns = decode_columns(payload)
+        self.assertEqual(meta, {'next': None, 'count': 5})
+        self.assertEqual(columns['id'].dtype, np.dtype('<i8'))
+        self.assertEqual(columns['id'].tolist(), list(range(5)))
+        self.assertEqual(columns['flag'].tolist(), [True, False, True, True, False])
+        self.assertEqual(columns['flowrate'].dtype, np.dtype('<f8'))
+        self.assertEqual(columns['flowrate'].tolist(), [1.5, 2.25, -3.0, 123456.78, 98765432.01])
+        self.assertEqual([f'{value:.2f}' for value in columns['flowrate'][3:]], ['123456.78', '98765432.01'])
+        self.assertEqual(columns['type'].tolist(), ['Pump', 'Valve', 'Pump', 'Mixer', 'Pump'])
+        self.assertEqual(columns['name'].tolist(), ['a', 'ñandú', '', 'd|e', '日本'])
+
+    def test_invalid_frames(self):
+        self.assertEqual(decode_columns(encode_columns({}, meta={'detail': 'x'})), ({'detail': 'x'}, {}))
+        with self.assertRaises(ValueError):
+            encode_columns({'a': np.zeros(2), 'b': np.zeros(3)})
+        with self.assertRaisesMessage(ValueError, 'Not a columnar frame'):
+            decode_columns(b'{"json": true}')
+        payload = bytearray(encode_columns({'a': np.zeros(1)}))
+        payload[4] = 9
+        with self.assertRaisesMessage(ValueError, 'Unsupported columnar frame version 9'):
+            decode_columns(bytes(payload))
+
+    def test_matches_json_listing(self):
+        url = f'/api/datasets/{self.dataset.id}/equipment/?page_size=20&ordering=-temperature'
+        rows = self.api.get(url).data['results']
+        response = self.api.get(url, HTTP_ACCEPT='application/vnd.equipment.columnar')
+        self.assertEqual(response['Content-Type'], 'application/vnd.equipment.columnar')
+
+        meta, columns = decode_columns(response.content)
+        self.assertEqual(meta['next'], self.api.get(url).data['next'])
+        for field in ('id', 'name', 'type', 'flowrate', 'pressure', 'temperature'):
+            self.assertEqual(columns[field].tolist(), [row[field] for row in rows], field)
+
+        detail = self.api.get(f'/api/datasets/{self.dataset.id}/?fields=name,type',
+                              HTTP_ACCEPT='application/vnd.equipment.columnar')
+        meta, columns = decode_columns(detail.content)
+        self.assertEqual(list(columns), ['name', 'type'])
+        self.assertEqual((meta['file_name'], meta['equipment_count'], len(columns['name'])), ('frame.csv', 30, 30))
+
+
+class ConditionalGetTests(TemporaryStorageMixin, TestCase):
+    """ETag / Last-Modified revalidation on dataset endpoints"""
+
+    COLUMNAR = 'application/vnd.equipment.columnar'
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+        self.dataset = Dataset.objects.create(file_name='plant.csv')
+        self.dataset.set_summary({'total_count': 3})
+        self.dataset.save()
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit-{i}', type='Pump', flowrate=10.0 * i, pressure=1.0,
+                      temperature=100.0)
+            for i in range(3)
+        ])
+        self.url = f'/api/datasets/{self.dataset.id}/'
+
+    def test_not_modified(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Accept', response['Vary'])
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(1):
+            again = self.api.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again.content, b'')
+        self.assertEqual(again['ETag'], response['ETag'])
+
+        self.assertEqual(self.api.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.api.get(f'{self.url}?page_size=1', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_etag_varies_with_accept(self):
+        json_response = self.api.get(self.url)
+        columnar = self.api.get(self.url, HTTP_ACCEPT=self.COLUMNAR)
+        self.assertEqual(columnar['Content-Type'], self.COLUMNAR)
+        self.assertNotEqual(columnar['ETag'], json_response['ETag'])
+
+        self.assertEqual(self.api.get(self.url, HTTP_ACCEPT=self.COLUMNAR,
+                                      HTTP_IF_NONE_MATCH=json_response['ETag']).status_code, 200)
+        self.assertEqual(self.api.get(self.url, HTTP_ACCEPT=self.COLUMNAR,
+                                      HTTP_IF_NONE_MATCH=columnar['ETag']).status_code, 304)
+
+    def test_versioned_endpoint_ignores_if_modified_since(self):
+        url = f'{self.url}health/'
+        response = self.api.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.api.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 200)
+        self.assertEqual(self.api.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_no_validators_during_upload(self):
+        ready_etag = self.api.get(self.url)['ETag']
+        Dataset.objects.filter(pk=self.dataset.pk).update(status='processing')
+
+        response = self.api.get(self.url, HTTP_IF_NONE_MATCH=ready_etag)
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+        Dataset.objects.filter(pk=self.dataset.pk).update(status='ready')
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=ready_etag).status_code, 304)
+
+
+class ReportJobTests(TemporaryStorageMixin, TestCase):
+    """The report endpoint answers 202 with a job while rendering, then serves the PDF"""
+
+    def setUp(self):
+        self.use_temporary_storage()
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user('user', password='password'))
+        self.dataset = Dataset.objects.create(file_name='plant.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=self.dataset, name=f'Unit-{i}', type='Pump', flowrate=10.0 + i, pressure=1.0,
+                      temperature=100.0 + i)
+            for i in range(10)
+        ])
+        self.url = f'/api/datasets/{self.dataset.id}/report/'
+        patcher = mock.patch('equipment.reports.submit')
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_render_then_serve(self):
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        job_url = response['Location']
+        self.assertEqual(self.api.get(job_url).data['status'], 'pending')
+
+        # A second request while rendering gets the same job
+        self.assertEqual(self.api.get(self.url).data['id'], response.data['id'])
+        self.assertEqual(self.submit.call_count, 1)
+
+        func, job_id = self.submit.call_args.args
+        func(job_id)
+        job = self.api.get(job_url).data
+        self.assertEqual(job['status'], 'succeeded', job['error'])
+
+        report = self.api.get(self.url)
+        self.assertEqual(report.status_code, 200)
+        self.assertEqual(report['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(report.streaming_content).startswith(b'%PDF'))
+
+    def test_stale_job_is_replaced(self):
+        stale = self.api.get(self.url).data['id']
+        Job.objects.filter(id=stale).update(status='running', heartbeat_at=timezone.now() - timedelta(hours=1))
+
+        response = self.api.get(self.url)
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data['id'], stale)
+        self.assertEqual(Job.objects.get(id=stale).status, 'failed')
+        self.assertEqual(self.submit.call_count, 2)
+
+    def test_new_detector_version_rerenders(self):
+        self.api.get(self.url)
+        func, job_id = self.submit.call_args.args
+        func(job_id)
+        report = self.api.get(self.url)
+        self.assertEqual(report.status_code, 200)
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=report['ETag']).status_code, 304)
+
+        with override_settings(ANOMALY_DETECTION={'z_threshold': 2.0}):
+            response = self.api.get(self.url, HTTP_IF_NONE_MATCH=report['ETag'])
+            self.assertEqual(response.status_code, 202)
+            self.assertNotEqual(response.data['id'], str(job_id))
+            func, job_id = self.submit.call_args.args
+            func(job_id)
+            rerendered = self.api.get(self.url, HTTP_IF_NONE_MATCH=report['ETag'])
+            self.assertEqual(rerendered.status_code, 200)
+            self.assertNotEqual(rerendered['ETag'], report['ETag'])
@@ -1,15 +1,18 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import DatasetViewSet, AlertRuleViewSet, AlertHistoryViewSet, login_view, logout_view, register_view
+from .views import DatasetViewSet, AlertRuleViewSet, AlertHistoryViewSet, JobViewSet, cache_stats_view, login_view, logout_view, register_view
 
 router = DefaultRouter()
 router.register(r'datasets', DatasetViewSet)
 router.register(r'alert-rules', AlertRuleViewSet)
 router.register(r'alert-history', AlertHistoryViewSet)
+router.register(r'jobs', JobViewSet)
 
 urlpatterns = [
+    path('datasets/<int:pk>/charts/<slug:kind>.png', DatasetViewSet.as_view({'get': 'chart'}), name='dataset-chart'),
     path('', include(router.urls)),
     path('auth/login/', login_view, name='login'),
     path('auth/logout/', logout_view, name='logout'),
     path('auth/register/', register_view, name='register'),
+    path('cache/stats/', cache_stats_view, name='cache-stats'),
 ]
@@ -1,30 +1,38 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.settings import api_settings
+from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.http import HttpResponse
-from django.core.cache import cache
-from .models import Dataset, Equipment, AlertRule, AlertHistory
-from .serializers import DatasetSerializer, DatasetListSerializer, EquipmentSerializer, AlertRuleSerializer, AlertHistorySerializer
+from django.db.models import Count
+from django.http import FileResponse, HttpResponse
+from django.urls import reverse
+from django.conf import settings
+from .models import Dataset, Equipment, AlertRule, AlertHistory, Job
+from .serializers import DatasetSerializer, DatasetListSerializer, DatasetUploadSerializer, EquipmentSerializer, AlertRuleSerializer, AlertHistorySerializer, JobSerializer
 from .alerts import AlertManager, check_anomalies
-from .anomaly_detection import AnomalyDetector, get_dataset_health_summary
-import pandas as pd
-import io
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.units import inch
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
+from .anomaly_detection import AnomalyDetector, current_detector_version, get_anomaly_results, get_dataset_health_summary
+from .cache_store import get_cache_store
+from .charts import CHART_KINDS, dataset_chart, validate_size
+from .column_store import load_columns
+from .conditional import conditional_dataset_view
+from .dataset_stats import PARAMETERS, get_dataset_statistics
+from .ingest import CSVIngestor, IngestError, validate_csv_header
+from .jobs import reap_stale_jobs, submit as submit_job
+from .pagination import EquipmentPagination, KeysetPagination
+from .parsers import CSVUploadParser
+from .renderers import ColumnarRenderer, PNGRenderer
+from .reports import open_report, schedule_report
+from .pipeline import UploadPipeline, run_upload_job
+from pathlib import Path
+import numpy as np
 
 
 class DatasetViewSet(viewsets.ModelViewSet):
-    queryset = Dataset.objects.all()
+    queryset = Dataset.objects.filter(status='ready')
     serializer_class = DatasetSerializer
     permission_classes = [IsAuthenticated]
     
@@ -35,13 +43,124 @@ class DatasetViewSet(viewsets.ModelViewSet):
     
     def list(self, request):
         """Get last 5 datasets"""
-        datasets = Dataset.objects.all()[:5]
+        datasets = self.get_queryset().annotate(equipment_count=Count('equipment_items'))[:5]
         serializer = self.get_serializer(datasets, many=True)
         return Response(serializer.data)
     
-    @action(detail=False, methods=['post'])
+    def get_renderers(self):
+        # Equipment rows can also be sent as a columnar frame (see renderers.py)
+        renderers = super().get_renderers()
+        if self.action in ('retrieve', 'equipment'):
+            renderers.append(ColumnarRenderer())
+        if self.action == 'chart':
+            renderers.append(PNGRenderer())
+        return renderers
+    
+    def _wants_columnar(self, request):
+        return getattr(request, 'accepted_renderer', None) is not None and request.accepted_renderer.format == 'columnar'
+    
+    @conditional_dataset_view()
+    def retrieve(self, request, pk=None):
+        """Get a dataset with the first page of its equipment"""
+        dataset = self.get_object()
+        data = self.get_serializer(dataset).data
+        
+        paginator, page, fields = self._paginate_equipment(request, dataset)
+        # Continue from the equipment endpoint, keeping filters and projection
+        paginator.base_url = request.build_absolute_uri(
+            reverse('dataset-equipment', args=[dataset.id]) + '?' + request.META.get('QUERY_STRING', '')
+        )
+        data['equipment_count'] = dataset.get_summary().get('total_count', dataset.equipment_items.count())
+        data['equipment_next'] = paginator.get_next_link()
+        if self._wants_columnar(request):
+            data['columns'] = self._equipment_columns(page, fields)
+        else:
+            data['equipment_items'] = EquipmentSerializer(page, many=True, fields=fields).data
+        return Response(data)
+    
+    @action(detail=True, methods=['get'])
+    @conditional_dataset_view()
+    def equipment(self, request, pk=None):
+        """
+        Page through a dataset's equipment
+        Supports ?cursor=, ?page_size=, ?ordering=, ?fields=, ?type= and
+        ?min_<parameter>= / ?max_<parameter>= range filters
+        """
+        dataset = self.get_object()
+        paginator, page, fields = self._paginate_equipment(request, dataset)
+        
+        if self._wants_columnar(request):
+            return Response({
+                'next': paginator.get_next_link(),
+                'columns': self._equipment_columns(page, fields),
+            })
+        return paginator.get_paginated_response(EquipmentSerializer(page, many=True, fields=fields).data)
+    
+    def _equipment_columns(self, page, fields):
+        """Turn a page of Equipment into {field: array} for the columnar renderer"""
+        fields = fields or EquipmentSerializer.Meta.fields
+        columns = {}
+        for field in fields:
+            values = [getattr(item, field) for item in page]
+            if field == 'id':
+                columns[field] = np.array(values, dtype=np.int64)
+            elif field in PARAMETERS:
+                columns[field] = np.array(values, dtype=np.float64)
+            else:
+                columns[field] = np.array(values, dtype=object)
+        return columns
+    
+    def _paginate_equipment(self, request, dataset):
+        """Filter, project and paginate equipment rows; returns (paginator, page, fields)"""
+        params = request.query_params
+        # Not dataset.equipment_items: the related manager sets .dataset on every
+        # row, which would reload dataset_id when ?fields= defers it
+        queryset = Equipment.objects.filter(dataset=dataset)
+        
+        # Type filter: ?type=Pump or ?type=Pump,Reactor
+        types = [value for value in params.get('type', '').split(',') if value]
+        if types:
+            queryset = queryset.filter(type__in=types)
+        
+        # Range filters: ?min_flowrate=100&max_temperature=150
+        for parameter in PARAMETERS:
+            for bound, lookup in (('min', 'gte'), ('max', 'lte')):
+                key = f'{bound}_{parameter}'
+                if key not in params:
+                    continue
+                try:
+                    value = float(params[key])
+                except ValueError:
+                    raise ValidationError({key: 'Must be a number.'})
+                queryset = queryset.filter(**{f'{parameter}__{lookup}': value})
+        
+        # Projection: ?fields=name,flowrate only loads and returns those columns
+        fields = None
+        if params.get('fields'):
+            fields = [value for value in params['fields'].split(',') if value]
+            unknown = set(fields) - set(EquipmentSerializer.Meta.fields)
+            if unknown:
+                raise ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        
+        paginator = EquipmentPagination()
+        if self._wants_columnar(request):
+            # Columnar pages are cheap to encode and decode, so allow bigger ones
+            paginator.max_page_size = getattr(settings, 'EQUIPMENT_COLUMNAR_MAX_PAGE_SIZE', 50000)
+        if fields is not None:
+            # The cursor is built from the ordering field, so it must be loaded too
+            ordering = paginator.get_ordering(request, queryset, self)
+            queryset = queryset.only(*fields, *(value.lstrip('-') for value in ordering))
+        
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator, page, fields
+    
+    @action(detail=False, methods=['post'], parser_classes=[*api_settings.DEFAULT_PARSER_CLASSES, CSVUploadParser])
     def upload(self, request):
-        """Handle CSV file upload"""
+        """
+        Handle CSV file upload (inline for small files, as a background job for large ones)
+        Accepts a multipart form with a 'file' field, or the CSV itself as a
+        text/csv body, optionally with Content-Encoding: gzip (see parsers.py)
+        """
         if 'file' not in request.FILES:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -50,104 +169,91 @@ class DatasetViewSet(viewsets.ModelViewSet):
         if not csv_file.name.endswith('.csv'):
             return Response({'error': 'File must be a CSV'}, status=status.HTTP_400_BAD_REQUEST)
         
+        if self._wants_async_upload(request, csv_file):
+            return self._enqueue_upload(request, csv_file)
+        
         try:
-            # Read CSV file
-            df = pd.read_csv(csv_file)
-            
-            # Validate required columns
-            required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                return Response(
-                    {'error': f'Missing required columns: {", ".join(missing_columns)}'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Create dataset
-            dataset = Dataset.objects.create(
-                file_name=csv_file.name,
-                uploaded_by=request.user
-            )
-            
-            # Create equipment records
-            equipment_list = []
-            for _, row in df.iterrows():
-                equipment = Equipment(
-                    dataset=dataset,
-                    name=row['Equipment Name'],
-                    type=row['Type'],
-                    flowrate=float(row['Flowrate']),
-                    pressure=float(row['Pressure']),
-                    temperature=float(row['Temperature'])
-                )
-                equipment_list.append(equipment)
-            
-            Equipment.objects.bulk_create(equipment_list)
-            
-            # Calculate summary statistics
-            summary = {
-                'total_count': len(df),
-                'avg_flowrate': float(df['Flowrate'].mean()),
-                'avg_pressure': float(df['Pressure'].mean()),
-                'avg_temperature': float(df['Temperature'].mean()),
-                'min_flowrate': float(df['Flowrate'].min()),
-                'max_flowrate': float(df['Flowrate'].max()),
-                'min_pressure': float(df['Pressure'].min()),
-                'max_pressure': float(df['Pressure'].max()),
-                'min_temperature': float(df['Temperature'].min()),
-                'max_temperature': float(df['Temperature'].max()),
-                'type_distribution': df['Type'].value_counts().to_dict()
-            }
+            # Validate header and open a chunked reader over the upload
+            try:
+                ingestor = CSVIngestor(csv_file)
+            except IngestError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
             
-            dataset.set_summary(summary)
-            dataset.save()
+            pipeline = UploadPipeline(csv_file.name, user=request.user)
+            dataset, result = pipeline.run(csv_file, ingestor=ingestor)
             
-            # Check for alerts
-            alert_manager = AlertManager()
-            alerts = alert_manager.check_dataset(dataset)
-            
-            # Cleanup old datasets (keep last 5)
-            old_datasets = Dataset.objects.all()[5:]
-            for old_dataset in old_datasets:
-                old_dataset.delete()
-            
-            serializer = DatasetSerializer(dataset)
+            serializer = DatasetUploadSerializer(dataset)
             response_data = serializer.data
-            response_data['alerts_triggered'] = len(alerts)
+            response_data.update(result)
             
             return Response(response_data, status=status.HTTP_201_CREATED)
         
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     
+    def _wants_async_upload(self, request, csv_file):
+        """?async=true/false forces a mode; otherwise large files go to the background"""
+        mode = request.query_params.get('async')
+        if mode in ('true', '1'):
+            return True
+        if mode in ('false', '0'):
+            return False
+        return csv_file.size > settings.ASYNC_UPLOAD_THRESHOLD_BYTES
+    
+    def _enqueue_upload(self, request, csv_file):
+        """Spool the upload to disk, queue the pipeline and return 202 with the job"""
+        try:
+            validate_csv_header(csv_file)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        job = Job.objects.create(kind='upload', file_name=csv_file.name, created_by=request.user)
+        
+        spool_dir = Path(settings.UPLOAD_SPOOL_DIR)
+        spool_dir.mkdir(parents=True, exist_ok=True)
+        path = spool_dir / f'{job.id}.csv'
+        with open(path, 'wb') as destination:
+            for chunk in csv_file.chunks():
+                destination.write(chunk)
+        
+        submit_job(run_upload_job, job.id, str(path))
+        
+        serializer = JobSerializer(job, context={'request': request})
+        response = Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+        # str(): the serializer gives a Hyperlink, which WSGI servers reject as a header value
+        response['Location'] = str(serializer.data['url'])
+        return response
+    
     @action(detail=True, methods=['get'])
+    @conditional_dataset_view()
     def summary(self, request, pk=None):
         """Get analytics summary for a dataset"""
         dataset = self.get_object()
         return Response(dataset.get_summary())
     
     @action(detail=True, methods=['get'])
+    @conditional_dataset_view(version_func=current_detector_version)
     def anomalies(self, request, pk=None):
         """Detect anomalies in dataset using ML"""
         dataset = self.get_object()
-        equipment_items = list(dataset.equipment_items.all())
+        columns = load_columns(dataset)
         
-        if not equipment_items:
+        if not len(columns):
             return Response({'error': 'No equipment data found'}, status=status.HTTP_404_NOT_FOUND)
         
-        detector = AnomalyDetector()
-        anomalies = detector.detect_anomalies(equipment_items)
+        # Detection runs once per dataset; later requests read the stored results
+        results = get_anomaly_results(dataset)
         
         return Response({
             'dataset_id': dataset.id,
             'dataset_name': dataset.file_name,
-            'total_equipment': len(equipment_items),
-            'anomalies': anomalies,
-            'health_summary': get_dataset_health_summary(dataset)
+            'total_equipment': len(columns),
+            'anomalies': results.records_for_columns(columns),
+            'health_summary': results.health_summary()
         })
     
     @action(detail=True, methods=['get'])
+    @conditional_dataset_view(version_func=current_detector_version)
     def health(self, request, pk=None):
         """Get health summary for dataset"""
         dataset = self.get_object()
@@ -157,7 +263,7 @@ class DatasetViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def trends(self, request):
         """Analyze trends across recent datasets"""
-        datasets = Dataset.objects.all()[:3]
+        datasets = self.get_queryset()[:3]
         
         if len(datasets) < 2:
             return Response({
@@ -174,162 +280,50 @@ class DatasetViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=True, methods=['get'])
+    @conditional_dataset_view(version_func=current_detector_version)
     def report(self, request, pk=None):
-        """Generate PDF report for a dataset with charts and caching"""
+        """Serve the dataset's PDF report, or 202 with a job to poll while it renders"""
         dataset = self.get_object()
         
-        # Check cache first
-        cache_key = f'pdf_report_{dataset.id}_{dataset.upload_date.timestamp()}'
-        cached_pdf = cache.get(cache_key)
-        
-        if cached_pdf:
-            response = HttpResponse(cached_pdf, content_type='application/pdf')
-            response['Content-Disposition'] = f'attachment; filename="{dataset.file_name}_report.pdf"'
-            return response
-        
-        equipment_items = dataset.equipment_items.all()
-        summary = dataset.get_summary()
-        
-        # Create PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        styles = getSampleStyleSheet()
-        
-        # Title
-        title = Paragraph(f"<b>Equipment Report: {dataset.file_name}</b>", styles['Title'])
-        elements.append(title)
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Summary section with min/max
-        summary_text = f"""
-        <b>Summary Statistics</b><br/>
-        Total Equipment: {summary.get('total_count', 0)}<br/>
-        <br/>
-        <b>Flowrate:</b> Avg: {summary.get('avg_flowrate', 0):.2f}, 
-        Min: {summary.get('min_flowrate', 0):.2f}, 
-        Max: {summary.get('max_flowrate', 0):.2f}<br/>
-        <b>Pressure:</b> Avg: {summary.get('avg_pressure', 0):.2f}, 
-        Min: {summary.get('min_pressure', 0):.2f}, 
-        Max: {summary.get('max_pressure', 0):.2f}<br/>
-        <b>Temperature:</b> Avg: {summary.get('avg_temperature', 0):.2f}, 
-        Min: {summary.get('min_temperature', 0):.2f}, 
-        Max: {summary.get('max_temperature', 0):.2f}<br/>
-        """
-        elements.append(Paragraph(summary_text, styles['Normal']))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Generate charts
-        try:
-            # Chart 1: Equipment Type Distribution
-            type_dist = summary.get('type_distribution', {})
-            if type_dist:
-                fig, ax = plt.subplots(figsize=(6, 4))
-                types = list(type_dist.keys())
-                counts = list(type_dist.values())
-                ax.bar(types, counts, color='steelblue')
-                ax.set_xlabel('Equipment Type')
-                ax.set_ylabel('Count')
-                ax.set_title('Equipment Type Distribution')
-                plt.xticks(rotation=45, ha='right')
-                plt.tight_layout()
-                
-                # Save chart to buffer
-                chart_buffer = io.BytesIO()
-                plt.savefig(chart_buffer, format='png', dpi=150, bbox_inches='tight')
-                chart_buffer.seek(0)
-                plt.close()
-                
-                # Add chart to PDF
-                chart_image = Image(chart_buffer, width=5*inch, height=3.5*inch)
-                elements.append(Paragraph("<b>Equipment Type Distribution</b>", styles['Heading2']))
-                elements.append(Spacer(1, 0.1*inch))
-                elements.append(chart_image)
-                elements.append(Spacer(1, 0.3*inch))
-            
-            # Chart 2: Parameter Comparison
-            fig, (ax1, ax2, ax3) = plt.subplots(1, 3, figsize=(10, 3))
-            
-            # Flowrate
-            flowrates = [item.flowrate for item in equipment_items]
-            ax1.hist(flowrates, bins=10, color='skyblue', edgecolor='black')
-            ax1.set_xlabel('Flowrate')
-            ax1.set_ylabel('Frequency')
-            ax1.set_title('Flowrate Distribution')
-            
-            # Pressure
-            pressures = [item.pressure for item in equipment_items]
-            ax2.hist(pressures, bins=10, color='lightcoral', edgecolor='black')
-            ax2.set_xlabel('Pressure')
-            ax2.set_ylabel('Frequency')
-            ax2.set_title('Pressure Distribution')
-            
-            # Temperature
-            temperatures = [item.temperature for item in equipment_items]
-            ax3.hist(temperatures, bins=10, color='lightgreen', edgecolor='black')
-            ax3.set_xlabel('Temperature')
-            ax3.set_ylabel('Frequency')
-            ax3.set_title('Temperature Distribution')
-            
-            plt.tight_layout()
-            
-            # Save chart to buffer
-            chart_buffer2 = io.BytesIO()
-            plt.savefig(chart_buffer2, format='png', dpi=150, bbox_inches='tight')
-            chart_buffer2.seek(0)
-            plt.close()
-            
-            # Add chart to PDF
-            chart_image2 = Image(chart_buffer2, width=7*inch, height=2.5*inch)
-            elements.append(Paragraph("<b>Parameter Distributions</b>", styles['Heading2']))
-            elements.append(Spacer(1, 0.1*inch))
-            elements.append(chart_image2)
-            elements.append(Spacer(1, 0.3*inch))
+        report = open_report(dataset.id)
+        if report is None:
+            # Not rendered yet, or evicted from the cache store: (re)start rendering
+            job = schedule_report(dataset, user=request.user)
+            if job is not None:
+                serializer = JobSerializer(job, context={'request': request})
+                response = Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+                response['Location'] = str(serializer.data['url'])
+                return response
             
-        except Exception as e:
-            # If chart generation fails, continue without charts
-            elements.append(Paragraph(f"<i>Chart generation skipped: {str(e)}</i>", styles['Normal']))
-            elements.append(Spacer(1, 0.2*inch))
-        
-        # Equipment table
-        elements.append(Paragraph("<b>Equipment Details</b>", styles['Heading2']))
-        elements.append(Spacer(1, 0.1*inch))
-        
-        data = [['Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']]
-        for item in equipment_items:
-            data.append([
-                item.name,
-                item.type,
-                f"{item.flowrate:.2f}",
-                f"{item.pressure:.2f}",
-                f"{item.temperature:.2f}"
-            ])
-        
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ]))
-        
-        elements.append(table)
-        doc.build(elements)
+            # Rendering finished between the lookup and scheduling
+            report = open_report(dataset.id)
+            if report is None:
+                raise NotFound('Report is not available yet; retry shortly')
         
-        buffer.seek(0)
-        pdf_content = buffer.read()
+        return FileResponse(
+            report,
+            content_type='application/pdf',
+            as_attachment=True,
+            filename=f'{dataset.file_name}_report.pdf',
+        )
+
+    
+    @conditional_dataset_view()
+    def chart(self, request, pk=None, kind=None):
+        """Serve a dataset chart PNG from the shared chart cache (routed as charts/<kind>.png)"""
+        dataset = self.get_object()
+        if kind not in CHART_KINDS:
+            raise NotFound(f'Unknown chart kind: {kind}')
         
-        # Cache the PDF for 1 hour
-        cache.set(cache_key, pdf_content, 3600)
+        try:
+            width, height, dpi = validate_size(
+                kind,
+                **{key: request.query_params[key] for key in ('width', 'height', 'dpi') if key in request.query_params}
+            )
+        except ValueError as e:
+            raise ValidationError({'error': str(e)})
         
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="{dataset.file_name}_report.pdf"'
-        return response
+        return HttpResponse(dataset_chart(dataset, kind, width, height, dpi), content_type='image/png')
 
 
 @api_view(['POST'])
@@ -390,6 +384,13 @@ def register_view(request):
     }, status=status.HTTP_201_CREATED)
 
 
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats_view(request):
+    """Shared cache store usage and hit/miss counters per namespace"""
+    return Response(get_cache_store().stats())
+
+
 
 class AlertRuleViewSet(viewsets.ModelViewSet):
     """ViewSet for managing alert rules"""
@@ -411,10 +412,13 @@ class AlertHistoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AlertHistory.objects.all()
     serializer_class = AlertHistorySerializer
     permission_classes = [IsAuthenticated]
+    # ?limit= is the page size (capped); follow 'next' for older alerts
+    pagination_class = KeysetPagination
     
     def get_queryset(self):
         """Filter alerts"""
-        queryset = AlertHistory.objects.all()
+        # The serializer reads equipment.name and rule.name for every row
+        queryset = AlertHistory.objects.select_related('equipment', 'rule')
         
         # Filter by severity
         severity = self.request.query_params.get('severity', None)
@@ -426,10 +430,6 @@ class AlertHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         if acknowledged == 'false':
             queryset = queryset.filter(acknowledged=False)
         
-        # Limit to recent alerts
-        limit = self.request.query_params.get('limit', 50)
-        queryset = queryset[:int(limit)]
-        
         return queryset
     
     @action(detail=True, methods=['post'])
@@ -444,4 +444,16 @@ class AlertHistoryViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """ViewSet for polling background job status"""
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        # Jobs orphaned by a server restart are failed here so pollers stop waiting
+        reap_stale_jobs()
+        return super().get_queryset()
+
+
 from django.utils import timezone
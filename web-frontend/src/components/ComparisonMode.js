@@ -123,7 +123,7 @@ const ComparisonMode = ({ datasets, onClose }) => {
                   <div className="column-metrics">
                     <div className="metric-card">
                       <span className="metric-label">Equipment Count</span>
-                      <span className="metric-value">{data.dataset.equipment_items.length}</span>
+                      <span className="metric-value">{data.dataset.equipment_count}</span>
                     </div>
 
                     <div className="metric-card">
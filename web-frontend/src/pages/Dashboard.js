@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { datasetAPI, authAPI } from '../services/api';
 import { removeAuthToken, getUser } from '../utils/auth';
@@ -21,6 +21,7 @@ const Dashboard = () => {
   const [successMessage, setSuccessMessage] = useState('');
   const [viewMode, setViewMode] = useState('standard'); // 'standard' or 'customizable'
   const [showComparison, setShowComparison] = useState(false);
+  const selectedIdRef = useRef(null);
   const navigate = useNavigate();
   const location = useLocation();
   const user = getUser();
@@ -45,13 +46,24 @@ const Dashboard = () => {
   };
 
   const loadDatasetDetails = async (id) => {
+    selectedIdRef.current = id;
     try {
       const [datasetData, summaryData] = await Promise.all([
         datasetAPI.get(id),
         datasetAPI.getSummary(id),
       ]);
+      // A dataset picked meanwhile wins
+      if (selectedIdRef.current !== id) return;
       setSelectedDataset(datasetData);
       setSummary(summaryData);
+
+      // The detail embeds only the first page of equipment; show it right
+      // away, then give the charts and tables every row
+      if (datasetData.equipment_next) {
+        const equipmentItems = await datasetAPI.getAllEquipment(datasetData);
+        if (selectedIdRef.current !== id) return;
+        setSelectedDataset({ ...datasetData, equipment_items: equipmentItems });
+      }
     } catch (error) {
       console.error('Failed to load dataset details:', error);
     }
@@ -2,6 +2,12 @@ import axios from 'axios';
 
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
+// Stop waiting for a background job after this many milliseconds
+const JOB_WAIT_TIMEOUT = 30 * 60 * 1000;
+
+// Rows per request when fetching a whole dataset (the server's EQUIPMENT_MAX_PAGE_SIZE)
+const EQUIPMENT_FETCH_PAGE_SIZE = 1000;
+
 // Create axios instance
 const api = axios.create({
   baseURL: API_BASE_URL,
@@ -63,11 +69,40 @@ export const datasetAPI = {
     return response.data;
   },
 
+  // Dataset detail with the first page of equipment_items;
+  // follow equipment_next (or use getEquipment) for more rows
   get: async (id) => {
     const response = await api.get(`/datasets/${id}/`);
     return response.data;
   },
 
+  // One page of equipment: params may include cursor, page_size, ordering,
+  // fields (comma-separated), type and min_/max_<parameter> filters
+  getEquipment: async (id, params = {}) => {
+    const response = await api.get(`/datasets/${id}/equipment/`, { params });
+    return response.data;
+  },
+
+  getEquipmentPage: async (url) => {
+    const response = await api.get(url);
+    return response.data;
+  },
+
+  // Every equipment row of a dataset: the detail's embedded first page
+  // followed by the remaining pages from equipment_next
+  getAllEquipment: async (dataset) => {
+    let rows = dataset.equipment_items;
+    let url = dataset.equipment_next;
+    while (url) {
+      const pageUrl = new URL(url);
+      pageUrl.searchParams.set('page_size', EQUIPMENT_FETCH_PAGE_SIZE);
+      const page = await datasetAPI.getEquipmentPage(pageUrl.toString());
+      rows = rows.concat(page.results);
+      url = page.next;
+    }
+    return rows;
+  },
+
   upload: async (file, onUploadProgress) => {
     const formData = new FormData();
     formData.append('file', file);
@@ -78,6 +113,13 @@ export const datasetAPI = {
       },
       onUploadProgress,
     });
+
+    // Large files are processed in the background: wait for the job
+    if (response.status === 202) {
+      const job = await jobAPI.waitFor(response.data.id);
+      const summary = await datasetAPI.getSummary(job.dataset);
+      return { id: job.dataset, file_name: job.file_name, summary, ...job.result };
+    }
     return response.data;
   },
 
@@ -86,11 +128,31 @@ export const datasetAPI = {
     return response.data;
   },
 
+  // Server-rendered chart PNG ('types', 'pie', 'histograms' or 'ranges'),
+  // shared with the PDF report; returns an object URL for an <img> src
+  getChartUrl: async (id, kind, size = {}) => {
+    const response = await api.get(`/datasets/${id}/charts/${kind}.png`, {
+      params: size,
+      responseType: 'blob',
+      headers: { Accept: 'image/png' },
+    });
+    return window.URL.createObjectURL(response.data);
+  },
+
   downloadReport: async (id, filename) => {
-    const response = await api.get(`/datasets/${id}/report/`, {
+    let response = await api.get(`/datasets/${id}/report/`, {
       responseType: 'blob',
     });
 
+    // Still rendering: wait for the report job, then fetch the file
+    if (response.status === 202) {
+      const job = JSON.parse(await response.data.text());
+      await jobAPI.waitFor(job.id);
+      response = await api.get(`/datasets/${id}/report/`, {
+        responseType: 'blob',
+      });
+    }
+
     // Create download link
     const url = window.URL.createObjectURL(new Blob([response.data]));
     const link = document.createElement('a');
@@ -103,4 +165,26 @@ export const datasetAPI = {
   },
 };
 
+// Background job APIs
+export const jobAPI = {
+  get: async (id) => {
+    const response = await api.get(`/jobs/${id}/`);
+    return response.data;
+  },
+
+  // Polls until the job finishes; gives up after timeout milliseconds
+  waitFor: async (id, pollInterval = 1000, timeout = JOB_WAIT_TIMEOUT) => {
+    const deadline = Date.now() + timeout;
+    for (;;) {
+      const job = await jobAPI.get(id);
+      if (job.status === 'succeeded') return job;
+      if (job.status === 'failed') throw new Error(job.error || 'Background job failed');
+      if (Date.now() > deadline) {
+        throw new Error(`Job ${id} did not finish within ${Math.round(timeout / 1000)} seconds`);
+      }
+      await new Promise((resolve) => setTimeout(resolve, pollInterval));
+    }
+  },
+};
+
 export default api;